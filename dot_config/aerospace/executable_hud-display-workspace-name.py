@@ -1,4 +1,12 @@
-#!/usr/bin/env -S /opt/homebrew/bin/uv run --script
+#!/bin/sh
+# Exec the environment chezmoi pre-materializes for this shim (see
+# .chezmoiscripts/run_onchange_after_install-shim-envs.sh.tmpl) while it's newer than this file,
+# else let uv build one from the inline metadata below. Python sees this sh part as a string.
+''':'
+env="${XDG_DATA_HOME:-$HOME/.local/share}/shim-envs/aerospace-workspaces"
+[ "$env/.stamp" -nt "$0" ] && [ -x "$env/bin/python" ] && exec "$env/bin/python" "$0" "$@"
+exec /opt/homebrew/bin/uv run --script "$0" "$@"
+'''
 # /// script
 # requires-python = ">=3.11"
 # dependencies = ["pyyaml"]
@@ -11,8 +19,10 @@ Called from ~/.aerospace.toml keybindings, e.g.:
                  'exec-and-forget ~/.config/aerospace/hud-display-workspace-name.py N "→ "']
 
 Resolves the workspace id to its icon/name/hint and shows a brief Hammerspoon HUD (or an osascript
-notification fallback). The real logic lives in the shared `aerospace_workspaces` package; pass
-`--dry-run` to print the would-be Hammerspoon URL / notification instead of firing it.
+notification fallback). The real logic lives in the shared `aerospace_workspaces` package: this
+shim hands the keypress to the long-lived aerospace-workspaces server when one is running, else
+runs it in-process and starts the server for next time (see `aerospace_workspaces.client`). Pass
+`--dry-run` to print the would-be socket frame / Hammerspoon URL / notification instead.
 """
 
 import os
@@ -27,7 +37,7 @@ sys.path.insert(
     os.environ.get("AEROSPACE_LIB_DIR", os.path.expanduser("~/.local/lib/aerospace-workspaces")),
 )
 
-from aerospace_workspaces.hud import main
+from aerospace_workspaces.client import run
 
 if __name__ == "__main__":
-    main()
+    run("hud")
@@ -1,4 +1,12 @@
-#!/usr/bin/env -S /opt/homebrew/bin/uv run --script
+#!/bin/sh
+# Exec the environment chezmoi pre-materializes for this shim (see
+# .chezmoiscripts/run_onchange_after_install-shim-envs.sh.tmpl) while it's newer than this file,
+# else let uv build one from the inline metadata below. Python sees this sh part as a string.
+''':'
+env="${XDG_DATA_HOME:-$HOME/.local/share}/shim-envs/aerospace-workspaces"
+[ "$env/.stamp" -nt "$0" ] && [ -x "$env/bin/python" ] && exec "$env/bin/python" "$0" "$@"
+exec /opt/homebrew/bin/uv run --script "$0" "$@"
+'''
 # /// script
 # requires-python = ">=3.11"
 # dependencies = ["pyyaml"]
@@ -8,7 +16,9 @@
 The real logic lives in the `aerospace_workspaces` package at ~/.local/lib/aerospace-workspaces,
 which the SwiftBar plugin and the workspace-switch HUD share. This file is just the entry point
 SwiftBar runs every 10s (its `.10s.` filename sets the interval; an aerospace
-`exec-on-workspace-change` push refreshes it instantly on switches).
+`exec-on-workspace-change` push refreshes it instantly on switches). Each run asks the long-lived
+aerospace-workspaces server for the menu, falling back to rendering in-process (and starting the
+server) when none is running; see `aerospace_workspaces.client`.
 
 The SwiftBar metadata directives below MUST live on this plugin file (SwiftBar reads them from the
 file it runs), not in the package.
@@ -32,7 +42,7 @@ sys.path.insert(
     os.environ.get("AEROSPACE_LIB_DIR", os.path.expanduser("~/.local/lib/aerospace-workspaces")),
 )
 
-from aerospace_workspaces.swiftbar import main
+from aerospace_workspaces.client import run
 
 if __name__ == "__main__":
-    main()
+    run("swiftbar")
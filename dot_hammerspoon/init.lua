@@ -20,19 +20,47 @@ local shortcutsHud = require("shortcuts_hud")
 hs.hotkey.bind({ "alt", "shift" }, "/", function() shortcutsHud.toggle() end)
 hs.urlevent.bind("shortcuts", function() shortcutsHud.toggle() end)
 
-hs.urlevent.bind("workspace", function(_, params)
+local function showWorkspace(name, hint)
     -- `name` already arrives with its emoji prepended (see hud-display-workspace-name.py). When a
     -- `hint` is present, show it as a smaller, dimmer second line below the name (and linger a bit
-    -- longer so it's readable); otherwise keep the original single-line flash.
-    local name = params.name or ""
-    if params.hint and params.hint ~= "" then
+    -- longer so it's readable); otherwise keep the original single-line flash. A newer switch
+    -- replaces the previous alert rather than stacking under it.
+    name = name or ""
+    hs.alert.closeAll(0)
+    if hint and hint ~= "" then
         local text = hs.styledtext.new(name, { font = { size = 36 }, color = { white = 1 } })
-            .. hs.styledtext.new("\n" .. params.hint, { font = { size = 20 }, color = { white = 0.6 } })
+            .. hs.styledtext.new("\n" .. hint, { font = { size = 20 }, color = { white = 0.6 } })
         hs.alert.show(text, { strokeWidth = 0 }, nil, 1.5)
     else
         hs.alert.show(name, { textSize = 36, strokeWidth = 0 }, nil, 0.8)
     end
+end
+
+-- Slow path: `open -g hammerspoon://workspace?name=…&hint=…` (LaunchServices URL routing).
+hs.urlevent.bind("workspace", function(_, params) showWorkspace(params.name, params.hint) end)
+
+-- Fast path: the HUD (aerospace_workspaces/hud.py) POSTs one JSON line,
+-- {"v":1,"name":…,"hint":…}, to /workspace on this loopback port and waits for the 200; with no
+-- answer it falls back to the URL above. hs.httpserver rather than hs.socket.server: the latter's
+-- read/write act on every client connected at once, so overlapping HUD calls could read each
+-- other's acks, while each callback here answers its own request on its own connection. The port
+-- must match hud.HUD_PORT. Global so the listener isn't garbage-collected.
+local hudPort = 27491
+workspaceHudListener = hs.httpserver.new(false, false)
+workspaceHudListener:setInterface("localhost")
+workspaceHudListener:setPort(hudPort)
+workspaceHudListener:setCallback(function(method, path, _, body)
+    if method ~= "POST" or path ~= "/workspace" then
+        return "", 404, {}
+    end
+    local ok, message = pcall(hs.json.decode, body)
+    if not (ok and type(message) == "table" and message.v == 1) then
+        return "", 400, {}
+    end
+    showWorkspace(message.name, message.hint)
+    return "ok", 200, {}
 end)
+workspaceHudListener:start()
 
 -- Resolution switching: 4K desk mode vs windowed Screen-Sharing mode.
 local alertStyle = { textSize = 36, strokeWidth = 0 }
@@ -0,0 +1,207 @@
+"""Window-manager backends: where workspace state comes from, and how to switch workspaces.
+
+Everything above this layer — the SwiftBar menu, the HUD, the server, workspaces.yaml labels —
+works on the same (focused, ids, windows_by_ws) state and workspace ids, whichever window
+manager produced them:
+
+  - `AeroSpaceBackend` (macOS): the `aerospace` CLI, through the query planner in
+    `aerospace_workspaces.query`. AeroSpace has no event stream; its `exec-on-workspace-change`
+    hook pokes the streaming plugin instead, so `wait_event` just sleeps (callers poll).
+  - `I3Backend` (Linux): native i3/sway IPC (`aerospace_workspaces.i3ipc`) over one persistent
+    Unix-socket connection — one GET_TREE per `collect`, and workspace/window events subscribed
+    on that same connection (once something waits for them) instead of polling.
+
+`current()` picks one: $AEROSPACE_WORKSPACES_BACKEND ("aerospace", "i3" or "sway") when set, else
+i3 when $SWAYSOCK or $I3SOCK is, else AeroSpace. It returns the same instance for as long as
+that choice holds, so a long-lived process keeps its IPC connection. Implementations are
+imported on first use, keeping this module's import cost to `os` and `time`.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aerospace_workspaces import i3ipc
+    from aerospace_workspaces.query import State
+
+BACKEND_ENV = "AEROSPACE_WORKSPACES_BACKEND"
+
+
+class Backend:
+    """What the menu, the bar and the HUD need from a window manager."""
+
+    name = ""
+
+    def collect(self, *, timeout: float, focused: str | None = None) -> State:
+        """(focused, ids, windows_by_ws), window dicts keyed as AeroSpace's windows query keys them.
+
+        `focused` is a known focused workspace id, trusted as is. Raises OSError, ValueError,
+        `subprocess.SubprocessError` and friends (see `swiftbar.COLLECT_ERRORS`) on failure.
+        """
+        raise NotImplementedError
+
+    def focused_workspace(self, *, timeout: float = 2.0) -> str:
+        """The focused workspace id (empty string on any failure)."""
+        raise NotImplementedError
+
+    def switch(self, workspace_id: str) -> None:
+        """Switch to `workspace_id` (best-effort)."""
+        raise NotImplementedError
+
+    def wait_event(self, timeout: float) -> str | None:
+        """Wait up to `timeout` seconds for the workspace state to change.
+
+        Returns what changed ("workspace", "window", ...) or None when nothing was reported in
+        time. Without an event stream this simply sleeps out `timeout` and returns None.
+        """
+        time.sleep(timeout)
+        return None
+
+    def event_fileno(self) -> int | None:
+        """A file descriptor that turns readable when `wait_event` has something (None: no stream).
+
+        For callers that `select` on other inputs too.
+        """
+        return None
+
+    def close(self) -> None:
+        """Release any connection this backend holds."""
+
+
+class AeroSpaceBackend(Backend):
+    name = "aerospace"
+
+    def collect(self, *, timeout: float, focused: str | None = None) -> State:
+        from aerospace_workspaces import query
+
+        return query.collect(timeout=timeout, focused=focused)
+
+    def focused_workspace(self, *, timeout: float = 2.0) -> str:
+        from aerospace_workspaces import query
+
+        return query.focused_workspace(timeout=timeout)
+
+    def switch(self, workspace_id: str) -> None:
+        import subprocess
+
+        from aerospace_workspaces.workspaces import aerospace_bin
+
+        try:
+            subprocess.run([aerospace_bin(), "workspace", workspace_id], check=False)
+        except OSError:
+            pass
+
+
+class I3Backend(Backend):
+    name = "i3"
+
+    # What can change the menu/bar: focus or workspace set, and windows opening/closing/retitling.
+    EVENTS = ["workspace", "window"]
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self._connection: i3ipc.Connection | None = None
+
+    def connection(self) -> i3ipc.Connection:
+        """The persistent connection, (re)opened on demand."""
+        if self._connection is None:
+            from aerospace_workspaces import i3ipc
+
+            self._connection = i3ipc.Connection(self.path)
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _request(self, msg_type: int, payload: str = "", *, timeout: float | None = None) -> object:
+        try:
+            return self.connection().request(msg_type, payload, timeout=timeout)
+        except (OSError, ValueError):
+            # Start over on the next call: the stream may be mid-message or the WM restarted.
+            self.close()
+            raise
+
+    def collect(self, *, timeout: float, focused: str | None = None) -> State:
+        from aerospace_workspaces import i3ipc
+
+        tree = self._request(i3ipc.GET_TREE, timeout=timeout)
+        if not isinstance(tree, dict):
+            raise ValueError(f"GET_TREE returned {type(tree).__name__}")
+        tree_focused, ids, windows_by_ws = i3ipc.parse_tree(tree)
+        return focused or tree_focused, ids, windows_by_ws
+
+    def focused_workspace(self, *, timeout: float = 2.0) -> str:
+        from aerospace_workspaces import i3ipc
+
+        try:
+            workspaces = self._request(i3ipc.GET_WORKSPACES, timeout=timeout)
+        except (OSError, ValueError):
+            return ""
+        if not isinstance(workspaces, list):
+            return ""
+        return next((str(ws.get("name", "")) for ws in workspaces if ws.get("focused")), "")
+
+    def switch(self, workspace_id: str) -> None:
+        from aerospace_workspaces import i3ipc
+
+        try:
+            self._request(i3ipc.RUN_COMMAND, f"workspace {i3ipc.command_quote(workspace_id)}")
+        except (OSError, ValueError):
+            pass
+
+    def wait_event(self, timeout: float) -> str | None:
+        """As `Backend.wait_event`, subscribing the connection to `EVENTS` on first use."""
+        try:
+            connection = self.connection()
+            if not connection.subscribed:
+                connection.subscribe(self.EVENTS)
+            event = connection.next_event(timeout)
+        except (OSError, ValueError):
+            self.close()
+            raise
+        return None if event is None else event.kind
+
+    def event_fileno(self) -> int | None:
+        """The IPC socket, once `wait_event` has subscribed it (None before).
+
+        Check `wait_event(0)` before blocking on it: events that arrived during a request are
+        already queued and won't make the socket readable.
+        """
+        connection = self._connection
+        return connection.fileno() if connection is not None and connection.subscribed else None
+
+
+BACKENDS: dict[str, type[Backend]] = {
+    "aerospace": AeroSpaceBackend,
+    "i3": I3Backend,
+    "sway": I3Backend,
+}
+
+# The live instance per selection key (at most one entry; see `current`).
+_CURRENT: dict[tuple[str, ...], Backend] = {}
+
+
+def backend_name() -> str:
+    """The configured backend (see the module docstring). Raises ValueError for an unknown one."""
+    explicit = os.environ.get(BACKEND_ENV, "").strip().lower()
+    if explicit:
+        if explicit not in BACKENDS:
+            raise ValueError(f"${BACKEND_ENV}={explicit!r}: expected one of {sorted(BACKENDS)}")
+        return explicit
+    return "i3" if os.environ.get("SWAYSOCK") or os.environ.get("I3SOCK") else "aerospace"
+
+
+def current() -> Backend:
+    """The process's backend, reused (with its connection) while the selection is unchanged."""
+    key = (backend_name(), os.environ.get("SWAYSOCK", ""), os.environ.get("I3SOCK", ""))
+    if key not in _CURRENT:
+        for stale in _CURRENT.values():
+            stale.close()
+        _CURRENT.clear()
+        _CURRENT[key] = BACKENDS[key[0]]()
+    return _CURRENT[key]
@@ -0,0 +1,256 @@
+"""Tiny client for the aerospace-workspaces server, plus the wire format both sides share.
+
+The HUD and SwiftBar shims call `run("hud" | "swiftbar", argv)`. It sends one request over the
+server's Unix stream socket and writes the reply — whatever the in-process entry point would have
+printed — to stdout. When no server answers, it runs `hud.main` / `swiftbar.main` in-process
+instead and starts a server in the background for next time ($AEROSPACE_WORKSPACES_SERVER=0
+disables the auto-start). This module imports only stdlib modules, so the server path never loads
+PyYAML or the rest of the package.
+
+Wire format: the client sends one JSON object ({"v", "cmd", "argv"}, plus "ticket" for a HUD
+request) and half-closes; the server answers with one JSON object ({"v", "ok", "out"}) and closes.
+
+The HUD's coalescing sequence (`take_ticket` / `is_latest`, see `hud`) lives here too, so the shim
+can take its ticket before the request waits in the server's queue.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import socket
+import sys
+
+PROTOCOL_VERSION = 1
+# "stats" is diagnostics (see `server.main`), not something the shims send.
+COMMANDS = ("hud", "swiftbar", "stats")
+
+# Covers a cold server's first SwiftBar render (usually one `aerospace` query, see `query`; its
+# deadline is `swiftbar.COLLECT_DEADLINE_SECONDS`) with room to spare.
+REQUEST_TIMEOUT_SECONDS = 5.0
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+SEQUENCE_NAME = "hud.seq"
+
+
+def _cache_dir() -> str:
+    # Same resolution as `workspaces.cache_dir`, duplicated to keep this module's imports minimal.
+    return os.environ.get("AEROSPACE_WORKSPACES_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "aerospace-workspaces",
+    )
+
+
+def socket_path() -> str:
+    """The server's per-user socket. $AEROSPACE_WORKSPACES_SOCKET overrides.
+
+    Defaults to server.sock in the package's cache dir.
+    """
+    return os.environ.get("AEROSPACE_WORKSPACES_SOCKET") or os.path.join(
+        _cache_dir(), "server.sock"
+    )
+
+
+def encode_request(command: str, argv: list[str], *, ticket: int | None = None) -> bytes:
+    message = {"v": PROTOCOL_VERSION, "cmd": command, "argv": argv}
+    if ticket is not None:
+        message["ticket"] = ticket
+    return json.dumps(message).encode("utf-8")
+
+
+def decode_request(data: bytes) -> tuple[str, list[str], int | None] | None:
+    """Decode a request into (command, argv, ticket), or None if it isn't a well-formed one."""
+    message = _decode(data)
+    if message is None:
+        return None
+    command, argv, ticket = message.get("cmd"), message.get("argv"), message.get("ticket")
+    if command not in COMMANDS:
+        return None
+    if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+        return None
+    if ticket is not None and (not isinstance(ticket, int) or isinstance(ticket, bool)):
+        return None
+    return command, argv, ticket
+
+
+def encode_reply(out: str | None) -> bytes:
+    """A reply carrying the command's output, or a failure (None) the client should fall back on."""
+    return json.dumps(
+        {"v": PROTOCOL_VERSION, "ok": out is not None, "out": out or ""}
+    ).encode("utf-8")
+
+
+def decode_reply(data: bytes) -> str | None:
+    """The output carried by a successful reply, or None."""
+    message = _decode(data)
+    if message is None or message.get("ok") is not True:
+        return None
+    out = message.get("out")
+    return out if isinstance(out, str) else None
+
+
+def _decode(data: bytes) -> dict | None:
+    try:
+        message = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(message, dict) or message.get("v") != PROTOCOL_VERSION:
+        return None
+    return message
+
+
+def read_all(sock: socket.socket) -> bytes:
+    """Read until EOF (or `MAX_MESSAGE_BYTES`)."""
+    chunks = []
+    size = 0
+    while size <= MAX_MESSAGE_BYTES:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    return b"".join(chunks)
+
+
+def request(
+    command: str,
+    argv: list[str],
+    *,
+    path: str | None = None,
+    timeout: float = REQUEST_TIMEOUT_SECONDS,
+    ticket: int | None = None,
+) -> str | None:
+    """Ask the server to run `command`; its output, or None if no server answered properly."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path or socket_path())
+        sock.sendall(encode_request(command, argv, ticket=ticket))
+        sock.shutdown(socket.SHUT_WR)
+        return decode_reply(read_all(sock))
+    except OSError:
+        # No socket file, nobody listening, or a stalled server: the caller runs in-process.
+        return None
+    finally:
+        sock.close()
+
+
+def run(command: str, argv: list[str] | None = None) -> None:
+    """Shim entry point: answer through the server, else in-process (and start a server)."""
+    args = list(sys.argv[1:] if argv is None else argv)
+    if command == "swiftbar" and "--stream" in args:
+        # Streaming is itself the long-lived process: nothing to gain from the server.
+        from aerospace_workspaces import swiftbar
+
+        swiftbar.main(args)
+        return
+    ticket = take_ticket() if command == "hud" and "--dry-run" not in args else None
+    out = request(command, args, ticket=ticket)
+    if out is not None:
+        sys.stdout.write(out)
+        sys.stdout.flush()
+        return
+
+    if command == "hud":
+        from aerospace_workspaces import hud
+
+        hud.main(args, ticket=ticket)
+    else:
+        from aerospace_workspaces import swiftbar
+
+        swiftbar.main(args)
+    if os.environ.get("AEROSPACE_WORKSPACES_SERVER") != "0":
+        spawn_server()
+
+
+def _sequence_fd(lock: int) -> int:
+    """Open the sequence file and take `lock` on it (the caller closes the fd, releasing it)."""
+    directory = _cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    fd = os.open(os.path.join(directory, SEQUENCE_NAME), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, lock)
+    except OSError:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _read_sequence(fd: int) -> int:
+    try:
+        return int(os.pread(fd, 32, 0) or 0)
+    except ValueError:
+        return 0
+
+
+def take_ticket() -> int | None:
+    """Bump the shared HUD sequence number (<cache_dir>/hud.seq) and return it.
+
+    None if the file is unusable, in which case the call is simply never coalesced.
+    """
+    try:
+        fd = _sequence_fd(fcntl.LOCK_EX)
+    except OSError:
+        return None
+    try:
+        ticket = _read_sequence(fd) + 1
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, str(ticket).encode(), 0)
+        return ticket
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+
+def is_latest(ticket: int | None) -> bool:
+    """True unless a newer HUD call has taken a ticket since `ticket` (None: never coalesced)."""
+    if ticket is None:
+        return True
+    try:
+        fd = _sequence_fd(fcntl.LOCK_SH)
+    except OSError:
+        return True
+    try:
+        return _read_sequence(fd) == ticket
+    finally:
+        os.close(fd)
+
+
+def spawn_server() -> None:
+    """Start the server in the background (best-effort).
+
+    Safe to call when one is already running: the new process sees the lock held and exits.
+    """
+    spawn_module("aerospace_workspaces.server")
+
+
+def spawn_module(module: str) -> None:
+    """Run `python -m <module>` from this package in the background, fully detached (best-effort).
+
+    Double-forks through /bin/sh so nothing waits on it and it outlives the caller.
+    """
+    import subprocess
+
+    lib_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        subprocess.run(
+            [
+                "/bin/sh",
+                "-c",
+                '"$@" </dev/null >/dev/null 2>&1 &',
+                "sh",
+                sys.executable,
+                "-m",
+                module,
+            ],
+            env=dict(os.environ, PYTHONPATH=lib_dir),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        pass
@@ -6,18 +6,62 @@
 the workspace's icon/name/hint from workspaces.yaml and shows a brief on-screen alert via
 Hammerspoon (preferred) or falls back to a macOS notification.
 
-The display/URL/notification builders are pure functions so they're unit-testable without firing a
-real alert. `--dry-run` prints the action that WOULD run (Hammerspoon URL or osascript body)
-instead of executing it — handy for manual checks; pytest exercises the pure builders directly.
+Delivery goes through `TRANSPORTS`, tried fastest first until one delivers:
+
+  - "socket": one JSON line (`build_socket_frame`) POSTed over a loopback TCP socket to the
+    `hs.httpserver` Hammerspoon runs on `hud_port()` (see ~/.hammerspoon/init.lua), which answers
+    200 on that same connection once the alert is up. No process is spawned. (Not
+    `hs.socket.server`: its reads and writes go to every connected client at once, so two HUD
+    calls overlapping could take each other's acks.)
+  - "url": `open -g hammerspoon://workspace?...` once `pgrep` finds Hammerspoon running — two
+    spawns plus LaunchServices routing, but works with an older config that lacks the listener.
+  - "notification": an osascript notification (launching Hammerspoon for next time).
+
+The display/frame/URL/notification builders are pure functions so they're unit-testable without
+firing a real alert. `--dry-run` prints what the chosen tier WOULD send (socket frame, Hammerspoon
+URL or osascript body) instead of sending it — handy for manual checks.
+
+Holding alt and tapping through workspaces starts one HUD per keypress, and without care their
+alerts land late and out of order. Each call therefore takes a ticket from a shared sequence file
+(`client.take_ticket`; the shim takes it before handing the keypress to the server, so requests
+queued there still count) and, after a `COALESCE_WINDOW_SECONDS` grace period, only dispatches if
+no newer call has taken one since: a burst shows just its last workspace, and the superseded
+calls exit without spawning anything.
+
+The socket tier is the common path, so nothing it doesn't use is imported up front: it writes
+its few lines of HTTP itself rather than pull in `http.client`, `subprocess` and `urllib.parse`
+load inside the URL/notification tiers, the window-manager backend only when no workspace id was
+given, and PyYAML only on a `workspaces` cache miss.
+tests/test_import_budget.py holds the line.
 """
 
 from __future__ import annotations
 
-import subprocess
+import json
+import os
+import socket
 import sys
-from urllib.parse import quote
+import time
+from collections.abc import Callable
+from typing import NamedTuple
+
+from aerospace_workspaces import client
+from aerospace_workspaces.workspaces import load_workspaces_cached, workspaces_yaml
+
+# Keep in sync with `hudPort` in ~/.hammerspoon/init.lua.
+HUD_PORT = 27491
+HUD_PATH = "/workspace"
+FRAME_VERSION = 1
+# Connect + write + ack from a live listener is well under a millisecond; past this, assume it's
+# wedged and fall through to the URL tier.
+SOCKET_TIMEOUT_SECONDS = 0.25
+
+# Long enough for the rest of a keyboard burst to land, short enough not to be seen as lag.
+COALESCE_WINDOW_SECONDS = 0.03
 
-from aerospace_workspaces.workspaces import aerospace_bin, load_workspaces, workspaces_yaml
+# When the window manager can't say which workspace is focused, a snapshot saved this recently
+# (by the menu, the bar or the server) says instead.
+FOCUS_SNAPSHOT_MAX_AGE_SECONDS = 5.0
 
 
 def resolve_display(workspace_id: str, prefix: str, records: dict[str, dict[str, str]]) -> tuple[str, str]:
@@ -37,6 +81,8 @@ def resolve_display(workspace_id: str, prefix: str, records: dict[str, dict[str,
 
 def build_hammerspoon_url(display: str, hint: str) -> str:
     """Build the hammerspoon://workspace URL, percent-encoding name (and hint when present)."""
+    from urllib.parse import quote
+
     url = f"hammerspoon://workspace?name={quote(display)}"
     if hint:
         url += f"&hint={quote(hint)}"
@@ -48,57 +94,202 @@ def build_osascript_body(display: str, hint: str) -> str:
     return f"{display} — {hint}" if hint else display
 
 
+def build_socket_frame(display: str, hint: str) -> bytes:
+    """Build the socket tier's message: one newline-terminated JSON object {v, name, hint}.
+
+    `json.dumps` escapes any newline inside the strings, so the frame is always exactly one line.
+    """
+    message = {"v": FRAME_VERSION, "name": display, "hint": hint}
+    return json.dumps(message, ensure_ascii=False).encode() + b"\n"
+
+
+def build_socket_request(frame: bytes) -> bytes:
+    """Wrap a frame in the HTTP/1.0 POST the listener expects (1.0: it closes once it answers)."""
+    head = (
+        f"POST {HUD_PATH} HTTP/1.0\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(frame)}\r\n\r\n"
+    )
+    return head.encode() + frame
+
+
+def hud_port() -> int:
+    """The Hammerspoon listener's loopback port. $AEROSPACE_WORKSPACES_HUD_PORT overrides."""
+    return int(os.environ.get("AEROSPACE_WORKSPACES_HUD_PORT") or HUD_PORT)
+
+
 def _focused_workspace() -> str:
-    """The currently focused workspace id (empty string on any failure)."""
+    """The currently focused workspace id (empty string on any failure).
+
+    Asks the window manager: a HUD call comes right after a switch, which a saved snapshot may
+    not have caught yet. Only when that fails does a recent one (`FOCUS_SNAPSHOT_MAX_AGE_SECONDS`)
+    stand in.
+    """
+    from aerospace_workspaces import backend, snapshot
+
     try:
-        return subprocess.run(
-            [aerospace_bin(), "list-workspaces", "--focused"],
-            capture_output=True,
-            text=True,
-            check=True,
-        ).stdout.strip()
-    except (subprocess.SubprocessError, OSError):
+        focused = backend.current().focused_workspace()
+    except ValueError:  # an unknown $AEROSPACE_WORKSPACES_BACKEND
+        focused = ""
+    if focused:
+        return focused
+    saved = snapshot.read()
+    if saved is None or saved.age() > FOCUS_SNAPSHOT_MAX_AGE_SECONDS:
         return ""
+    return saved.state[0]
 
 
 def _hammerspoon_running() -> bool:
     """True if the Hammerspoon app is running (so it can catch the URL event)."""
+    import subprocess
+
     return subprocess.run(["pgrep", "-xq", "Hammerspoon"]).returncode == 0
 
 
-def main(argv: list[str] | None = None) -> None:
+def send_socket(display: str, hint: str) -> bool:
+    """Hand the alert to the Hammerspoon listener; False unless it answered 200 on this socket."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(SOCKET_TIMEOUT_SECONDS)
+    try:
+        sock.connect(("127.0.0.1", hud_port()))
+        sock.sendall(build_socket_request(build_socket_frame(display, hint)))
+        reply = b""
+        while b"\r\n" not in reply:
+            chunk = sock.recv(256)
+            if not chunk:
+                break
+            reply += chunk
+        status = reply.split(b"\r\n", 1)[0].split()
+        return len(status) >= 2 and status[0].startswith(b"HTTP/") and status[1] == b"200"
+    except (OSError, ValueError):
+        return False
+    finally:
+        sock.close()
+
+
+def send_url(display: str, hint: str) -> bool:
+    import subprocess
+
+    subprocess.run(["open", "-g", build_hammerspoon_url(display, hint)], check=False)
+    return True
+
+
+def send_notification(display: str, hint: str) -> bool:
+    import subprocess
+
+    # Launch Hammerspoon so it's ready (and a login item) next time; it won't catch this event.
+    subprocess.run(["open", "-ga", "Hammerspoon"], check=False,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    body = build_osascript_body(display, hint)
+    subprocess.run(
+        ["osascript", "-e", f'display notification "{_osascript_escape(body)}" with title "Workspace"'],
+        check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return True
+
+
+def _listener_up() -> bool:
+    """True if something accepts connections on the listener's port.
+
+    Refused on loopback comes back in microseconds, and this is what lets `--dry-run` preview the
+    tier that would really be used.
+    """
+    try:
+        with socket.create_connection(("127.0.0.1", hud_port()), SOCKET_TIMEOUT_SECONDS):
+            return True
+    except (OSError, ValueError):
+        return False
+
+
+def _url_available() -> bool:
+    return _hammerspoon_running()
+
+
+def _always() -> bool:
+    return True
+
+
+def _socket_preview(display: str, hint: str) -> str:
+    return build_socket_frame(display, hint).decode().rstrip("\n")
+
+
+class Transport(NamedTuple):
+    """One delivery tier: whether it's worth trying, what it would send, and how to send it."""
+
+    name: str
+    available: Callable[[], bool]
+    preview: Callable[[str, str], str]
+    send: Callable[[str, str], bool]
+
+
+TRANSPORTS = (
+    Transport("socket", _listener_up, _socket_preview, send_socket),
+    Transport("url", _url_available, build_hammerspoon_url, send_url),
+    Transport("notification", _always, build_osascript_body, send_notification),
+)
+
+
+def dispatch(
+    display: str,
+    hint: str,
+    *,
+    dry_run: bool = False,
+    transports: tuple[Transport, ...] | None = None,
+) -> str | None:
+    """Deliver the alert through the first tier that is available and succeeds; return its name.
+
+    With `dry_run`, print the first available tier's payload instead of sending it. `transports`
+    defaults to `TRANSPORTS`.
+    """
+    for transport in TRANSPORTS if transports is None else transports:
+        if not transport.available():
+            continue
+        if dry_run:
+            print(transport.preview(display, hint))
+            return transport.name
+        if transport.send(display, hint):
+            return transport.name
+    return None
+
+
+def main(
+    argv: list[str] | None = None,
+    *,
+    records: dict[str, dict[str, str]] | None = None,
+    ticket: int | None = None,
+) -> None:
+    """Show the HUD for `argv` ([--dry-run] [<id> [<prefix>]]), unless a newer call supersedes it.
+
+    `records` is an already-loaded workspace map (the server passes its in-memory copy); without
+    one, workspaces.yaml is loaded through its compiled cache. `ticket` is one the caller already
+    took for this call (else one is taken here). `--dry-run` isn't coalesced.
+    """
     args = list(sys.argv[1:] if argv is None else argv)
     dry_run = False
     if "--dry-run" in args:
         dry_run = True
         args = [a for a in args if a != "--dry-run"]
+    if dry_run:
+        ticket = None
+    elif ticket is None:
+        ticket = client.take_ticket()
+    started = time.monotonic()
 
     workspace_id = args[0] if args else _focused_workspace()
     if not workspace_id:
         return
     prefix = args[1] if len(args) > 1 else ""
 
-    records, _ = load_workspaces(workspaces_yaml())
+    if records is None:
+        records, _ = load_workspaces_cached(workspaces_yaml())
     display, hint = resolve_display(workspace_id, prefix, records)
 
-    if _hammerspoon_running():
-        url = build_hammerspoon_url(display, hint)
-        if dry_run:
-            print(url)
+    if ticket is not None:
+        if not client.is_latest(ticket):
             return
-        subprocess.run(["open", "-g", url], check=False)
-    else:
-        body = build_osascript_body(display, hint)
-        if dry_run:
-            print(body)
+        time.sleep(max(0.0, started + COALESCE_WINDOW_SECONDS - time.monotonic()))
+        if not client.is_latest(ticket):
             return
-        # Launch Hammerspoon so it's ready (and a login item) next time; it won't catch this event.
-        subprocess.run(["open", "-ga", "Hammerspoon"], check=False,
-                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        subprocess.run(
-            ["osascript", "-e", f'display notification "{_osascript_escape(body)}" with title "Workspace"'],
-            check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-        )
+    dispatch(display, hint, dry_run=dry_run)
 
 
 def _osascript_escape(text: str) -> str:
@@ -0,0 +1,282 @@
+"""i3bar/swaybar status command: one block per workspace, redrawn only when something changed.
+
+`main()` is the entry point behind ~/.local/bin/workspace-bar, which i3's and sway's `bar {}`
+blocks run as their `status_command`. It speaks the i3bar JSON protocol: a header line
+(`HEADER`, with click events on), then an endless JSON array with one status line — an array of
+blocks — per update. Each workspace gets a block labeled by `workspaces.label` (so the icons and
+names in workspaces.yaml show up on the bar), the focused one at full brightness and the rest
+dimmed.
+
+The process is long-lived and event-driven rather than re-spawned on an interval: it waits on the
+window manager's event stream (`backend.current()`: the i3/sway IPC subscription), on the clicks
+i3bar writes to its stdin, and on the wrapped status command, and writes a line only when the
+blocks differ from the last one sent. A new line from the wrapped command (below) reuses the
+workspace blocks rather than asking the window manager again, and window events (titles, focus
+within a workspace) are drained without a redraw, since the blocks only show the workspace list
+and focus. A poll every `POLL_INTERVAL_SECONDS` picks up workspaces.yaml edits (and stands in for
+events under a backend that has none); while the window manager is unreachable it retries every
+`STALE_RETRY_SECONDS`.
+
+Every collect is also saved as the shared snapshot (`aerospace_workspaces.snapshot`), so on Linux
+this is the collector that prompt segments and the HUD read from.
+
+A left click on a workspace block switches to that workspace (`Backend.switch`).
+
+`--wrap <command...>` runs another i3bar-protocol status command (i3status, with
+`output_format = "i3bar"`) as a child and appends its latest blocks to every line, so the
+workspace blocks join the existing status bar instead of replacing it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import select
+import sys
+import time
+from typing import TextIO
+
+from aerospace_workspaces import backend, snapshot, swiftbar
+from aerospace_workspaces.workspaces import Record, label, load_workspaces_cached, workspaces_yaml
+
+HEADER = {"version": 1, "click_events": True}
+BLOCK_NAME = "workspace"
+
+# Slow fallback for changes no event reports (workspaces.yaml edits, or a backend without events).
+POLL_INTERVAL_SECONDS = 30.0
+STALE_RETRY_SECONDS = 5.0
+
+# The (left) mouse button that switches workspaces.
+SWITCH_BUTTON = 1
+
+Block = dict[str, object]
+
+
+def build_blocks(
+    focused: str, ids: list[str], records: dict[str, Record], declared_order: list[str]
+) -> list[Block]:
+    """One block per workspace, declared workspaces first (as in the SwiftBar menu). No I/O.
+
+    The focused block keeps the bar's default color; the others are dimmed. `short_text` (shown
+    when the bar runs out of room) drops the name. Only the last block keeps its separator, so
+    the workspaces read as one group next to any wrapped status blocks.
+    """
+    blocks: list[Block] = []
+    for workspace_id in swiftbar.ordered_ids(ids, declared_order):
+        icon = records.get(workspace_id, {}).get("icon")
+        block: Block = {
+            "name": BLOCK_NAME,
+            "instance": workspace_id,
+            "full_text": label(workspace_id, records),
+            "short_text": label(workspace_id, {workspace_id: {"icon": icon}} if icon else {}),
+            "separator": False,
+        }
+        if workspace_id != focused:
+            block["color"] = swiftbar.DIM_COLOR
+        blocks.append(block)
+    if blocks:
+        del blocks[-1]["separator"]
+    return blocks
+
+
+def unavailable_blocks() -> list[Block]:
+    """What the bar shows while the window manager can't be asked."""
+    return [{"name": BLOCK_NAME, "full_text": "workspaces?", "color": swiftbar.DIM_COLOR}]
+
+
+def parse_protocol_line(line: str) -> object | None:
+    """The JSON value on one line of an i3bar-protocol stream, or None for framing/garbage.
+
+    Both directions use the same framing: an opening "[" on its own line, then one value per line,
+    every one after the first prefixed with ",".
+    """
+    line = line.strip().lstrip(",").strip()
+    if not line or line == "[":
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def parse_click(line: str) -> str | None:
+    """The workspace a click-event line asks to switch to, or None."""
+    event = parse_protocol_line(line)
+    if (
+        isinstance(event, dict)
+        and event.get("name") == BLOCK_NAME
+        and event.get("button") == SWITCH_BUTTON
+        and isinstance(event.get("instance"), str)
+    ):
+        return event["instance"]
+    return None
+
+
+def parse_status_line(line: str) -> list[Block] | None:
+    """The blocks on one line of a wrapped status command's output (None for header/framing)."""
+    blocks = parse_protocol_line(line)
+    if isinstance(blocks, list) and all(isinstance(block, dict) for block in blocks):
+        return blocks
+    return None
+
+
+class _LineReader:
+    """Splits what arrives on a pipe fd into lines, across reads."""
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+        self._partial = b""
+
+    def read(self) -> tuple[list[str], bool]:
+        """(complete lines, eof) from one `os.read`; call when `select` says `fd` is readable."""
+        chunk = os.read(self.fd, 65536)
+        if not chunk:
+            lines, self._partial = [self._partial], b""
+            return [line.decode(errors="replace") for line in lines if line], True
+        *lines, self._partial = (self._partial + chunk).split(b"\n")
+        return [line.decode(errors="replace") for line in lines], False
+
+
+class Bar:
+    """The status command's inputs: the backend, i3bar's clicks, and the wrapped command."""
+
+    def __init__(self, clicks_fd: int, wrap: list[str] | None = None) -> None:
+        self.backend = backend.current()
+        self.clicks = _LineReader(clicks_fd)
+        self.status: list[Block] = []
+        self.child = None
+        self.child_lines: _LineReader | None = None
+        if wrap:
+            import subprocess
+
+            self.child = subprocess.Popen(wrap, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE)
+            self.child_lines = _LineReader(self.child.stdout.fileno())
+
+    def close(self) -> None:
+        if self.child is not None:
+            self.child.terminate()
+            self._reap_child()
+        self.backend.close()
+
+    def _reap_child(self) -> None:
+        """Wait for the wrapped command to exit and let go of it (so it never lingers a zombie)."""
+        self.child.wait()
+        self.child.stdout.close()
+        self.child = self.child_lines = None
+
+    def workspaces(self) -> tuple[list[Block], bool]:
+        """(blocks, stale): the workspace blocks as of now, or a placeholder when unreachable."""
+        started = time.time()
+        try:
+            state = self.backend.collect(timeout=swiftbar.COLLECT_DEADLINE_SECONDS)
+        except swiftbar.COLLECT_ERRORS:
+            return unavailable_blocks(), True
+        snapshot.save(state, taken_at=started)
+        focused, ids, _ = state
+        records, declared_order = load_workspaces_cached(workspaces_yaml())
+        return build_blocks(focused, ids, records, declared_order), False
+
+    def _drain_events(self) -> tuple[bool, int | None]:
+        """(changed, fd): consume pending window-manager events, and the fd to wait on for more.
+
+        `changed` is whether a drained event can change the blocks (anything but a window event);
+        `fd` is None when the backend has no event stream or can't be reached right now.
+        """
+        try:
+            changed = False
+            while (kind := self.backend.wait_event(0)) is not None:
+                changed = changed or kind != "window"
+            return changed, self.backend.event_fileno()
+        except (OSError, ValueError):
+            return False, None  # `workspaces` will report it; the stale retry comes back here
+
+    def wait(self, timeout: float) -> str | None:
+        """Block until the line may have changed; say what changed, or None once i3bar is gone.
+
+        Returns "workspaces" (a window-manager event, or `timeout` passed: collect again) or
+        "status" (the wrapped command printed a new line). Clicks are handled here: the switch
+        comes back as a workspace event.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            changed, event_fd = self._drain_events()
+            if changed:
+                return "workspaces"
+            fds = [self.clicks.fd]
+            if event_fd is not None:
+                fds.append(event_fd)
+            if self.child_lines is not None:
+                fds.append(self.child_lines.fd)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not (ready := select.select(fds, [], [], remaining)[0]):
+                return "workspaces"
+            if self.clicks.fd in ready:
+                lines, eof = self.clicks.read()
+                for workspace_id in filter(None, map(parse_click, lines)):
+                    self.backend.switch(workspace_id)
+                if eof:
+                    return None
+            if self.child_lines is not None and self.child_lines.fd in ready:
+                lines, eof = self.child_lines.read()
+                updates = [blocks for blocks in map(parse_status_line, lines) if blocks is not None]
+                if eof:
+                    # The wrapped command died; carry on with the workspace blocks alone.
+                    self._reap_child()
+                    self.status = []
+                    return "status"
+                if updates:
+                    self.status = updates[-1]
+                    return "status"
+
+
+def bar(
+    out: TextIO | None = None,
+    clicks: TextIO | None = None,
+    *,
+    wrap: list[str] | None = None,
+    poll_interval: float = POLL_INTERVAL_SECONDS,
+    max_lines: int | None = None,
+) -> None:
+    """Write the i3bar protocol to `out`, reading click events from `clicks`, until i3bar quits.
+
+    `max_lines` stops after that many status lines (for tests and benchmarks).
+    """
+    out = out or sys.stdout
+    state = Bar((clicks or sys.stdin).fileno(), wrap)
+    last = None
+    lines = 0
+    changed: str | None = "workspaces"
+    try:
+        out.write(json.dumps(HEADER) + "\n[\n")
+        while True:
+            if changed == "workspaces":
+                workspace_blocks, stale = state.workspaces()
+                interval = min(poll_interval, STALE_RETRY_SECONDS) if stale else poll_interval
+                refresh_at = time.monotonic() + interval
+            blocks = workspace_blocks + state.status
+            if blocks != last:
+                prefix = "," if last is not None else ""
+                out.write(prefix + json.dumps(blocks, ensure_ascii=False) + "\n")
+                out.flush()
+                last = blocks
+                lines += 1
+                if max_lines is not None and lines >= max_lines:
+                    return
+            # Status lines don't push the next poll back: it's due `interval` after the last one.
+            changed = state.wait(refresh_at - time.monotonic())
+            if changed is None:
+                return
+    except BrokenPipeError:
+        return  # i3bar stopped reading: the bar was reloaded.
+    finally:
+        state.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """`workspace-bar [--wrap <command> [args...]]`."""
+    args = list(sys.argv[1:] if argv is None else argv)
+    wrap = args[args.index("--wrap") + 1 :] if "--wrap" in args else None
+    try:
+        bar(wrap=wrap or None)
+    except KeyboardInterrupt:
+        pass
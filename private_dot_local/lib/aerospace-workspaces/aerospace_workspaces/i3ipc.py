@@ -0,0 +1,246 @@
+"""Native i3/sway IPC: the binary protocol, the window tree, and event subscription.
+
+Both window managers speak the same protocol on a Unix socket ($I3SOCK / $SWAYSOCK): every
+message is the 6-byte magic "i3-ipc", a native-endian uint32 payload length and uint32 message
+type, then a JSON payload. Replies carry the request's type; events carry the event's number with
+the high bit set and can arrive at any time once the connection has subscribed.
+
+`Connection` keeps one socket open for everything: requests (`request`) and events (`next_event`)
+share it, with events that arrive while a request waits for its reply queued rather than dropped.
+`parse_tree` turns one GET_TREE reply into the same (focused, ids, windows_by_ws) state the
+AeroSpace query planner produces, so a single round trip answers a whole menu/bar refresh.
+
+Workspaces are identified by their `name` — what `workspace <name>` switches to and what
+workspaces.yaml is keyed on — so the same labels apply under either window manager.
+"""
+
+from __future__ import annotations
+
+import collections
+import json
+import os
+import select
+import socket
+import struct
+import time
+from collections.abc import Iterator
+from typing import NamedTuple
+
+MAGIC = b"i3-ipc"
+HEADER = struct.Struct(f"={len(MAGIC)}sII")
+
+RUN_COMMAND = 0
+GET_WORKSPACES = 1
+SUBSCRIBE = 2
+GET_TREE = 4
+
+EVENT_BIT = 1 << 31
+# Event numbers (sans EVENT_BIT) -> the names SUBSCRIBE takes.
+EVENT_NAMES = {
+    0: "workspace",
+    1: "output",
+    2: "mode",
+    3: "window",
+    4: "barconfig_update",
+    5: "binding",
+    6: "shutdown",
+    7: "tick",
+}
+
+# Generous for a local socket; a window manager that doesn't answer in this long is wedged.
+REQUEST_TIMEOUT_SECONDS = 2.0
+
+# Events are "something changed" signals, so with nobody reading them the oldest can go.
+MAX_QUEUED_EVENTS = 64
+
+# i3 keeps the scratchpad in a hidden output; its workspace is never shown or switched to.
+_INTERNAL_OUTPUT = "__i3"
+
+# (focused, ids, windows_by_ws) — the same shape as `query.State`.
+State = tuple[str, list[str], dict[str, list[dict[str, object]]]]
+
+
+class Event(NamedTuple):
+    """One pushed event: its name ("workspace", "window", ...), its "change", and the payload."""
+
+    kind: str
+    change: str
+    payload: dict[str, object]
+
+
+def socket_path() -> str:
+    """The IPC socket: $SWAYSOCK or $I3SOCK, else what `sway`/`i3 --get-socketpath` report.
+
+    Raises FileNotFoundError when neither window manager can be found.
+    """
+    for var in ("SWAYSOCK", "I3SOCK"):
+        if os.environ.get(var):
+            return os.environ[var]
+    import subprocess  # deferred: only without the environment variable
+
+    for binary in ("sway", "i3"):
+        try:
+            found = subprocess.run(
+                [binary, "--get-socketpath"], capture_output=True, text=True, timeout=2
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            continue
+        if found:
+            return found
+    raise FileNotFoundError("no i3/sway IPC socket ($SWAYSOCK and $I3SOCK are unset)")
+
+
+def encode(msg_type: int, payload: str | bytes = b"") -> bytes:
+    """One framed message."""
+    body = payload.encode() if isinstance(payload, str) else payload
+    return HEADER.pack(MAGIC, len(body), msg_type) + body
+
+
+class Connection:
+    """One persistent IPC connection, shared by requests and subscribed events."""
+
+    def __init__(self, path: str | None = None, *, timeout: float = REQUEST_TIMEOUT_SECONDS):
+        self.path = path or socket_path()
+        self.timeout = timeout
+        self.subscribed: list[str] = []
+        self._events: collections.deque[Event] = collections.deque(maxlen=MAX_QUEUED_EVENTS)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.settimeout(timeout)
+            self._sock.connect(self.path)
+        except OSError:
+            self._sock.close()
+            raise
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def fileno(self) -> int:
+        """The socket's fd, for `select`. Check `pending()` first: queued events don't wake it."""
+        return self._sock.fileno()
+
+    def pending(self) -> bool:
+        """Whether an event is already queued (arrived while a request waited for its reply)."""
+        return bool(self._events)
+
+    def _read_exactly(self, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = self._sock.recv(size)
+            if not chunk:
+                raise ConnectionResetError("i3/sway IPC socket closed")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def _read_message(self) -> tuple[int, object]:
+        magic, length, msg_type = HEADER.unpack(self._read_exactly(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"not an i3 IPC message (magic {magic!r})")
+        return msg_type, json.loads(self._read_exactly(length))
+
+    def _queue_event(self, msg_type: int, payload: object) -> None:
+        kind = EVENT_NAMES.get(msg_type & ~EVENT_BIT, str(msg_type & ~EVENT_BIT))
+        change = payload.get("change", "") if isinstance(payload, dict) else ""
+        self._events.append(Event(kind, str(change), payload if isinstance(payload, dict) else {}))
+
+    def request(
+        self, msg_type: int, payload: str | bytes = b"", *, timeout: float | None = None
+    ) -> object:
+        """Send one message and return its decoded reply, queueing any events read meanwhile.
+
+        Raises OSError (including TimeoutError past `timeout`, default `self.timeout`) when the
+        socket fails, and ValueError when the reply isn't the protocol or isn't JSON.
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        self._sock.settimeout(max(0.001, deadline - time.monotonic()))
+        self._sock.sendall(encode(msg_type, payload))
+        while True:
+            self._sock.settimeout(max(0.001, deadline - time.monotonic()))
+            reply_type, reply = self._read_message()
+            if reply_type & EVENT_BIT:
+                self._queue_event(reply_type, reply)
+            elif reply_type == msg_type:
+                return reply
+
+    def subscribe(self, events: list[str]) -> None:
+        """Subscribe this connection to `events` (e.g. ["workspace", "window"])."""
+        reply = self.request(SUBSCRIBE, json.dumps(events))
+        if not (isinstance(reply, dict) and reply.get("success")):
+            raise ValueError(f"subscribe {events} refused: {reply!r}")
+        self.subscribed = sorted(set(self.subscribed) | set(events))
+
+    def next_event(self, timeout: float | None = None) -> Event | None:
+        """The next subscribed event: a queued one, else one read within `timeout` (None: wait).
+
+        Returns None when `timeout` passes without an event.
+        """
+        if self._events:
+            return self._events.popleft()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self._sock], [], [], remaining)
+            if not ready:
+                return None
+            self._sock.settimeout(self.timeout)
+            msg_type, payload = self._read_message()
+            if msg_type & EVENT_BIT:
+                self._queue_event(msg_type, payload)
+                return self._events.popleft()
+
+
+def _is_window(node: dict) -> bool:
+    # i3 (and sway's Xwayland clients) set an X11 `window` id; native Wayland clients a `pid`.
+    return node.get("window") is not None or node.get("pid") is not None
+
+
+def _windows(node: dict, workspace_id: str, out: list[dict[str, object]]) -> bool:
+    """Append `node`'s windows (tiling, then floating) to `out`; True if focus is among them."""
+    focused = bool(node.get("focused"))
+    if node.get("type") in ("con", "floating_con") and _is_window(node):
+        properties = node.get("window_properties") or {}
+        out.append(
+            {
+                "workspace": workspace_id,
+                "window-id": node.get("id"),
+                "app-name": node.get("app_id") or properties.get("class") or "",
+                "window-title": node.get("name") or "",
+            }
+        )
+    for child in (*node.get("nodes", ()), *node.get("floating_nodes", ())):
+        focused = _windows(child, workspace_id, out) or focused
+    return focused
+
+
+def _workspaces(node: dict) -> Iterator[dict]:
+    """Yield every workspace node under `node`, skipping i3's internal scratchpad output."""
+    if node.get("type") == "workspace":
+        yield node
+    elif not (node.get("type") == "output" and node.get("name") == _INTERNAL_OUTPUT):
+        for child in node.get("nodes", ()):
+            yield from _workspaces(child)
+
+
+def parse_tree(tree: dict) -> State:
+    """(focused, ids, windows_by_ws) from a GET_TREE reply.
+
+    ids are in tree order (output by output); window dicts have the keys AeroSpace's windows query
+    returns ("workspace", "window-id" — the container id, "app-name", "window-title").
+    """
+    focused, ids = "", []
+    windows_by_ws: dict[str, list[dict[str, object]]] = {}
+    for workspace in _workspaces(tree):
+        workspace_id = str(workspace.get("name", ""))
+        ids.append(workspace_id)
+        windows: list[dict[str, object]] = []
+        if _windows(workspace, workspace_id, windows):
+            focused = workspace_id
+        if windows:
+            windows_by_ws[workspace_id] = windows
+    return focused, ids, windows_by_ws
+
+
+def command_quote(text: str) -> str:
+    """`text` as a double-quoted i3 command argument."""
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
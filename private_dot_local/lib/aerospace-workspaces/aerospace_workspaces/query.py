@@ -0,0 +1,195 @@
+"""Query planner: the AeroSpace state `swiftbar.collect` needs, in as few `aerospace` calls as can be.
+
+The menu needs three things: the focused workspace, the ids of all workspaces (including empty
+persistent ones), and every window by workspace. Asked naively that is three subprocesses. The
+planner gets them from one in the common case:
+
+  - The windows query's `--format` also carries `%{workspace-is-focused}`, so the focused
+    workspace falls out of it whenever that workspace has a window.
+  - Whoever knows the focused workspace already can say so: AeroSpace runs
+    `exec-on-workspace-change` with $AEROSPACE_FOCUSED_WORKSPACE set (read by `env_focused`), and
+    the streaming plugin forwards the id the hook pokes it with.
+  - The workspace id list barely changes, so it is cached (<cache_dir>/workspace-ids.marshal) and
+    re-listed — with `%{workspace-is-focused}` too, covering an empty focused workspace — only
+    when the cache is missing or older than `IDS_MAX_AGE_SECONDS`, or when the windows or the
+    focus mention a workspace the cache doesn't know. An emptied non-persistent workspace can
+    therefore linger in the menu (as "(empty)") for up to that long.
+
+Queries that are needed together run concurrently (`run_concurrently`) under one shared deadline.
+"""
+
+from __future__ import annotations
+
+import json
+import marshal
+import os
+import subprocess
+import time
+
+from aerospace_workspaces.workspaces import aerospace_bin, cache_dir
+
+# (focused, ids, windows_by_ws) — the same shape as `snapshot.Snapshot`.
+State = tuple[str, list[str], dict[str, list[dict[str, object]]]]
+
+FOCUSED_FIELD = "workspace-is-focused"
+FOCUSED_ENV = "AEROSPACE_FOCUSED_WORKSPACE"
+
+# Every window, plus whether its workspace is the focused one. The explicit --format adds the
+# "workspace" field to the JSON.
+WINDOWS_QUERY = [
+    "list-windows",
+    "--all",
+    "--format",
+    "%{workspace}%{workspace-is-focused}%{window-id}%{app-name}%{window-title}",
+    "--json",
+]
+# Every workspace id, plus which one is focused (even when it has no windows).
+WORKSPACES_QUERY = [
+    "list-workspaces",
+    "--all",
+    "--format",
+    "%{workspace}%{workspace-is-focused}",
+    "--json",
+]
+FOCUSED_QUERY = ["list-workspaces", "--focused"]
+
+IDS_NAME = "workspace-ids.marshal"
+IDS_VERSION = 1
+IDS_MAX_AGE_SECONDS = 60.0
+
+
+def run_concurrently(queries: list[list[str]], *, timeout: float) -> list[str]:
+    """Run `aerospace <args>` for every query at once and return their stdouts, in query order.
+
+    All queries share one deadline `timeout` seconds out, so the wait is that of the slowest one
+    rather than the sum. Raises `subprocess.CalledProcessError` for the first query (in order)
+    that exits non-zero and `subprocess.TimeoutExpired` when the deadline passes; either way any
+    still-running queries are killed and reaped.
+    """
+    deadline = time.monotonic() + timeout
+    procs: list[subprocess.Popen[str]] = []
+    try:
+        for args in queries:
+            procs.append(
+                subprocess.Popen(
+                    [aerospace_bin(), *args],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                )
+            )
+        outputs = []
+        for proc in procs:
+            out, err = proc.communicate(timeout=max(0.0, deadline - time.monotonic()))
+            if proc.returncode:
+                raise subprocess.CalledProcessError(proc.returncode, proc.args, out, err)
+            outputs.append(out)
+        return outputs
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            # Close rather than drain: a killed query's own children may still hold the pipes.
+            for pipe in (proc.stdout, proc.stderr):
+                if pipe is not None:
+                    pipe.close()
+
+
+def env_focused() -> str | None:
+    """The focused workspace AeroSpace passed to an `exec-on-workspace-change` hook, if any."""
+    return os.environ.get(FOCUSED_ENV, "").strip() or None
+
+
+def load_ids(*, max_age: float = IDS_MAX_AGE_SECONDS) -> list[str] | None:
+    """The cached workspace id list, or None when absent, unreadable, or older than `max_age`."""
+    try:
+        with open(os.path.join(cache_dir(), IDS_NAME), "rb") as handle:
+            version, listed_at, ids = marshal.loads(handle.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != IDS_VERSION or not 0 <= time.time() - listed_at <= max_age:
+        return None
+    return ids
+
+
+def save_ids(ids: list[str]) -> None:
+    """Atomically replace the cached workspace id list (best-effort)."""
+    import tempfile  # deferred: a warm cache never writes
+
+    directory = cache_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix=f".{IDS_NAME}.", dir=directory)
+        with os.fdopen(tmp_fd, "wb") as out:
+            out.write(marshal.dumps((IDS_VERSION, time.time(), ids)))
+        os.replace(tmp_path, os.path.join(directory, IDS_NAME))
+    except (OSError, ValueError):
+        pass
+
+
+def _is_focused(entry: dict[str, object]) -> bool:
+    return entry.pop(FOCUSED_FIELD, False) in (True, "true")
+
+
+def _parse_workspaces(output: str) -> tuple[list[str], str | None]:
+    """(ids, focused) from the WORKSPACES_QUERY output."""
+    ids, focused = [], None
+    for entry in json.loads(output):
+        workspace_id = str(entry["workspace"])
+        ids.append(workspace_id)
+        if _is_focused(entry):
+            focused = workspace_id
+    return ids, focused
+
+
+def collect(*, timeout: float, focused: str | None = None) -> State:
+    """(focused, ids, windows_by_ws) from the fewest queries the caches and hints allow.
+
+    `focused` (else $AEROSPACE_FOCUSED_WORKSPACE) is trusted as the focused workspace. Window dicts
+    come back exactly as the plain windows query returns them ("workspace", "window-id",
+    "app-name", "window-title"). Raises what `run_concurrently` and JSON parsing raise.
+    """
+    deadline = time.monotonic() + timeout
+    focused = focused or env_focused()
+    ids = load_ids()
+
+    queries = [WINDOWS_QUERY] if ids is not None else [WINDOWS_QUERY, WORKSPACES_QUERY]
+    outputs = run_concurrently(queries, timeout=timeout)
+    listed = ids is None
+    if listed:
+        ids, listed_focused = _parse_workspaces(outputs[1])
+        focused = focused or listed_focused
+
+    windows_by_ws: dict[str, list[dict[str, object]]] = {}
+    for window in json.loads(outputs[0]):
+        workspace_id = str(window["workspace"])
+        if _is_focused(window) and focused is None:
+            focused = workspace_id
+        windows_by_ws.setdefault(workspace_id, []).append(window)
+
+    known = set(ids)
+    if not listed and (
+        focused is None or focused not in known or not known.issuperset(windows_by_ws)
+    ):
+        # Focus on an empty workspace, or a workspace the cache doesn't know: list afresh.
+        (output,) = run_concurrently(
+            [WORKSPACES_QUERY], timeout=max(0.0, deadline - time.monotonic())
+        )
+        ids, listed_focused = _parse_workspaces(output)
+        focused = focused or listed_focused
+        listed = True
+    if listed:
+        save_ids(ids)
+    return focused or "", ids, windows_by_ws
+
+
+def focused_workspace(*, timeout: float = 2.0) -> str:
+    """The focused workspace id: from the hook environment if set, else asked (empty on failure)."""
+    focused = env_focused()
+    if focused:
+        return focused
+    try:
+        return run_concurrently([FOCUSED_QUERY], timeout=timeout)[0].strip()
+    except (subprocess.SubprocessError, OSError):
+        return ""
@@ -0,0 +1,219 @@
+"""Long-lived aerospace-workspaces server shared by the HUD and the SwiftBar plugin.
+
+The shims (`client.run`) send each HUD keypress and SwiftBar tick here over a Unix stream socket
+instead of starting an interpreter, importing PyYAML, and re-reading workspaces.yaml every time.
+The server keeps warm state (`ServerState`): the parsed workspace records, reloaded only when the
+file's mtime/size/inode change, and the latest AeroSpace snapshot (focused workspace, ids, windows
+by workspace), reused for `STATE_MAX_AGE_SECONDS` so the SwiftBar refresh that a workspace switch
+triggers alongside the HUD doesn't query AeroSpace twice. A HUD request means a switch just
+happened, so it drops the snapshot.
+
+Requests are handled one at a time by the very same `hud.main` / `swiftbar.render` the in-process
+path uses, with stdout captured into the reply, so both paths print identical output. Environment
+seams ($AEROSPACE_BIN, $AEROSPACE_WORKSPACES_YAML) come from whichever shim started the server.
+Because the process persists, `swiftbar.render`'s memo pays off here: a tick whose inputs haven't
+changed returns the previous menu as is. `python -m aerospace_workspaces.server --stats` prints
+its hit/miss counters.
+
+One server per socket: a lock file next to the socket is held for the server's lifetime, so a
+second instance exits immediately. The server exits on its own after `IDLE_TIMEOUT_SECONDS`
+without requests, and — since SwiftBar's ticks never let it idle that long — as soon as it
+notices its own package changed on disk (`package_stamp`, compared after every request): the
+request that finds `chezmoi apply` rewrote the files is the old server's last, and the next one
+auto-starts the new code.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import io
+import json
+import os
+import socket
+import sys
+import time
+
+from aerospace_workspaces import client, hud, swiftbar
+from aerospace_workspaces.snapshot import Snapshot
+from aerospace_workspaces.workspaces import Record, load_workspaces_cached, workspaces_yaml
+
+IDLE_TIMEOUT_SECONDS = 3600
+STATE_MAX_AGE_SECONDS = 1.0
+
+# This package's source dir, whose files an update rewrites (see `package_stamp`).
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def package_stamp() -> tuple[tuple[str, int, int], ...]:
+    """(name, mtime_ns, size) of each .py file in `PACKAGE_DIR`: changes when the package does."""
+    files = []
+    try:
+        with os.scandir(PACKAGE_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith(".py"):
+                    st = entry.stat()
+                    files.append((entry.name, st.st_mtime_ns, st.st_size))
+    except OSError:
+        return ()
+    return tuple(sorted(files))
+
+
+class ServerState:
+    """State the server keeps in memory between requests."""
+
+    def __init__(self, *, yaml_path: str | None = None) -> None:
+        self.yaml_path = yaml_path
+        self._workspaces: tuple[dict[str, Record], list[str]] = ({}, [])
+        self._workspaces_key: tuple[str, int, int, int] | None = None
+        self._snapshot: Snapshot | None = None
+        self._snapshot_at = 0.0
+
+    def workspaces(self) -> tuple[dict[str, Record], list[str]]:
+        """(records, declared_order), reloaded only when the YAML file changes."""
+        path = self.yaml_path or workspaces_yaml()
+        try:
+            st = os.stat(path)
+            key = (path, st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            key = None
+        if key is None or key != self._workspaces_key:
+            self._workspaces = load_workspaces_cached(path)
+            self._workspaces_key = key
+        return self._workspaces
+
+    def snapshot(self) -> tuple[Snapshot | None, float | None]:
+        """(state, stale_since) as `swiftbar.collect_or_last_known` returns it.
+
+        A fresh collection is reused until older than `STATE_MAX_AGE_SECONDS`; a stale fallback
+        is never reused, so the next request tries AeroSpace again.
+        """
+        now = time.monotonic()
+        if self._snapshot is None or now - self._snapshot_at > STATE_MAX_AGE_SECONDS:
+            state, stale_since = swiftbar.collect_or_last_known()
+            if stale_since is not None or state is None:
+                return state, stale_since
+            self._snapshot = state
+            self._snapshot_at = now
+        return self._snapshot, None
+
+    def invalidate_snapshot(self) -> None:
+        self._snapshot = None
+
+    def stats(self) -> dict[str, object]:
+        """Diagnostics: the render memo's counters and how much state is warm."""
+        return {
+            "render": swiftbar.render_stats(),
+            "snapshot_age_seconds": (
+                None if self._snapshot is None else round(time.monotonic() - self._snapshot_at, 3)
+            ),
+            "workspace_records": len(self._workspaces[0]),
+        }
+
+    def handle(self, command: str, argv: list[str], ticket: int | None = None) -> str:
+        """Run one request and return what the in-process entry point would have printed.
+
+        `ticket` is the HUD coalescing ticket the shim took (see `hud`).
+        """
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            if command == "stats":
+                print(json.dumps(self.stats(), sort_keys=True))
+            elif command == "hud":
+                self.invalidate_snapshot()
+                records, _ = self.workspaces()
+                hud.main(argv, records=records, ticket=ticket)
+            else:
+                state, stale_since = self.snapshot()
+                if state is None:
+                    print(swiftbar.render_unavailable())
+                else:
+                    records, declared_order = self.workspaces()
+                    print(
+                        swiftbar.render(*state, records, declared_order, stale_since=stale_since)
+                    )
+        return out.getvalue()
+
+
+def serve(path: str | None = None, *, idle_timeout: float = IDLE_TIMEOUT_SECONDS) -> None:
+    """Bind the socket and answer requests until idle for `idle_timeout` seconds, or until the
+    package is updated underneath it.
+
+    Returns immediately if another server already holds this socket's lock.
+    """
+    path = path or client.socket_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock = open(f"{path}.lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        # We hold the lock, so any existing socket file is a stale leftover.
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o177)  # owner-only socket
+        try:
+            sock.bind(path)
+        finally:
+            os.umask(old_umask)
+        sock.listen(8)
+        sock.settimeout(idle_timeout)
+
+        state = ServerState()
+        stamp = package_stamp()
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except TimeoutError:
+                break
+            with conn:
+                _answer(conn, state)
+            if package_stamp() != stamp:
+                break  # updated: make way for an auto-start of the new code
+    finally:
+        sock.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        lock.close()
+
+
+def _answer(conn: socket.socket, state: ServerState) -> None:
+    """Read one request from `conn` and send the reply (a failure reply if anything goes wrong)."""
+    try:
+        conn.settimeout(client.REQUEST_TIMEOUT_SECONDS)
+        request = client.decode_request(client.read_all(conn))
+        out = None
+        if request is not None:
+            try:
+                out = state.handle(*request)
+            except Exception:
+                # e.g. AeroSpace not running: the client falls back to running in-process.
+                out = None
+        conn.sendall(client.encode_reply(out))
+    except OSError:
+        pass
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Serve (`python -m aerospace_workspaces.server`), or print a running server's `--stats`."""
+    args = sys.argv[1:] if argv is None else argv
+    if "--stats" not in args:
+        serve()
+        return
+    out = client.request("stats", [])
+    if out is None:
+        print("no aerospace-workspaces server is running", file=sys.stderr)
+        raise SystemExit(1)
+    print(json.dumps(json.loads(out), indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
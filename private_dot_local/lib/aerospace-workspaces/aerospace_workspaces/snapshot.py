@@ -0,0 +1,211 @@
+"""The shared workspace-state snapshot: last-known-good for the menu, and cheap reads for everyone.
+
+Every successful collect (the SwiftBar plugin's, the streaming plugin's, the server's via
+`swiftbar.collect_or_last_known`, and workspace-bar's on Linux) is saved here as one marshaled
+(version, generation, taken_at, records_version, focused, ids, windows_by_ws) tuple in
+`cache_dir()`. Writers serialize on an flock of snapshot.lock and bump `generation` under it, so
+it increases by exactly one per save; the file itself is replaced by rename, never rewritten in
+place, so a reader always sees one whole snapshot.
+
+Several collectors can be running at once (a periodic plugin tick next to the streaming plugin or
+the server), so the rule is by observation, not by writer: `taken_at` is when the collect began,
+and `save` drops a state whose collect began before the saved one's. A slow collect that finishes
+last can't replace what a later one saw; the generation only counts states that were kept. A saved
+`taken_at` that is later than the clock can only mean the clock stepped back since, so it no
+longer counts as newer: otherwise every save would be dropped until the clock caught up again.
+
+`read()` costs an open and one read of a few KB — no window-manager query, no YAML, nothing
+beyond `marshal` imported — which is what the HUD's focus fallback uses. Readers judge staleness
+by `taken_at` (`Saved.age`), compare `generation` to notice a change without diffing the state,
+and `records_version` (see `workspaces.records_version`) says which revision of workspaces.yaml
+was current at the time.
+
+Prompt segments (starship, zellij) can't afford a Python start per prompt, so each save also
+writes segment.txt next to it, under the same lock: one line, "<generation> <taken_at> <label>",
+with `taken_at` in whole seconds and the focused workspace's label already rendered from
+workspaces.yaml. A shell reads it with no process at all:
+  read -r generation taken_at label < ~/.cache/aerospace-workspaces/segment.txt
+and compares `taken_at` with the clock to skip a label no collector has refreshed lately.
+
+When a later collect misses its deadline or fails (AeroSpace wedged, restarting, or answering
+garbage), the menu is drawn from this snapshot instead — marked stale — and `spawn_refresh`
+starts a detached worker (`python -m aerospace_workspaces.snapshot`) that retries with a longer
+deadline, saves the result, and asks SwiftBar to redraw.
+
+The worker takes an flock on refresh.lock, so the refreshes a wedged AeroSpace triggers every
+tick collapse into one in-flight attempt instead of piling up.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import marshal
+import os
+import sys
+import time
+
+from aerospace_workspaces.workspaces import (
+    RecordsVersion,
+    cache_dir,
+    records_version,
+    workspaces_yaml,
+)
+
+# (focused, ids, windows_by_ws), as returned by `swiftbar.collect`.
+Snapshot = tuple[str, list[str], dict[str, list[dict[str, object]]]]
+
+SNAPSHOT_NAME = "snapshot.marshal"
+SNAPSHOT_VERSION = 2
+WRITE_LOCK_NAME = "snapshot.lock"
+REFRESH_LOCK_NAME = "refresh.lock"
+
+# The shell-readable sidecar for prompt segments (see the module docstring).
+SEGMENT_NAME = "segment.txt"
+
+# The background refresh can afford to wait longer than the menu draw does.
+REFRESH_DEADLINE_SECONDS = 10.0
+
+# SwiftBar names a plugin after its file, minus the `.10s.py` suffix.
+SWIFTBAR_REFRESH_URL = "swiftbar://refreshplugin?name=aerospace-workspaces"
+
+
+class Saved:
+    """One saved snapshot, as `read` returns it.
+
+    A plain class rather than a NamedTuple, so that `read` stays nothing but `marshal` (see the
+    module docstring): `typing` alone would cost more to import than the rest of this module.
+    """
+
+    __slots__ = ("generation", "taken_at", "records_version", "state")
+
+    def __init__(
+        self,
+        generation: int,
+        taken_at: float,
+        records_version: RecordsVersion | None,
+        state: Snapshot,
+    ) -> None:
+        self.generation = generation
+        self.taken_at = taken_at
+        self.records_version = records_version
+        self.state = state
+
+    def age(self, now: float | None = None) -> float:
+        """Seconds since the state was collected."""
+        return (time.time() if now is None else now) - self.taken_at
+
+
+def save(state: Snapshot, *, taken_at: float | None = None) -> int | None:
+    """Atomically replace the snapshot with `state`; its generation, or None if it wasn't saved.
+
+    `taken_at` is when the collect that produced `state` began (default: now). A state observed
+    before the saved one is dropped, unless the saved one claims to be from the future (a clock
+    step back; see the module docstring). Best-effort: a failed write leaves
+    the previous snapshot (and generation) in place.
+    """
+    directory = cache_dir()
+    records = records_version(workspaces_yaml())
+    focused_label = _segment_label(state[0])
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, WRITE_LOCK_NAME), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            stamp = time.time() if taken_at is None else taken_at
+            previous = read()
+            if previous is not None and stamp < previous.taken_at <= time.time():
+                return None
+            generation = 1 if previous is None else previous.generation + 1
+            _write_atomic(
+                directory,
+                SNAPSHOT_NAME,
+                marshal.dumps((SNAPSHOT_VERSION, generation, stamp, records, *state)),
+            )
+            _write_atomic(
+                directory,
+                SEGMENT_NAME,
+                f"{generation} {int(stamp)} {focused_label}\n".encode(),
+            )
+    except (OSError, ValueError):
+        return None
+    return generation
+
+
+def _segment_label(focused: str) -> str:
+    """The focused workspace's label on one line, for segment.txt ("" when nothing is focused)."""
+    if not focused:
+        return ""
+    from aerospace_workspaces.workspaces import label, load_workspaces_cached
+
+    records, _ = load_workspaces_cached(workspaces_yaml())
+    return " ".join(label(focused, records).split())
+
+
+def _write_atomic(directory: str, name: str, data: bytes) -> None:
+    import tempfile  # deferred: reading the snapshot doesn't need it
+
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", dir=directory)
+    with os.fdopen(tmp_fd, "wb") as out:
+        out.write(data)
+    os.replace(tmp_path, os.path.join(directory, name))
+
+
+def read() -> Saved | None:
+    """The saved snapshot, or None if there is none or it can't be read. One open, one read."""
+    try:
+        with open(os.path.join(cache_dir(), SNAPSHOT_NAME), "rb", buffering=0) as handle:
+            version, *fields = marshal.loads(handle.readall())
+        if version != SNAPSHOT_VERSION:
+            return None
+        generation, taken_at, records, focused, ids, windows_by_ws = fields
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return Saved(generation, taken_at, records, (focused, ids, windows_by_ws))
+
+
+def load() -> tuple[Snapshot, float] | None:
+    """The saved (snapshot, taken_at), or None if there is none or it can't be read."""
+    saved = read()
+    return None if saved is None else (saved.state, saved.taken_at)
+
+
+def refresh(*, deadline: float = REFRESH_DEADLINE_SECONDS) -> bool:
+    """Collect afresh and save the snapshot; False if another refresh holds the lock or it failed.
+
+    On success, wakes a streaming plugin and asks SwiftBar (macOS only) to redraw a periodic one.
+    """
+    from aerospace_workspaces import stream, swiftbar
+
+    directory = cache_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        lock = open(os.path.join(directory, REFRESH_LOCK_NAME), "w")
+    except OSError:
+        return False
+    with lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        try:
+            started = time.time()
+            save(swiftbar.collect(timeout=deadline), taken_at=started)
+        except swiftbar.COLLECT_ERRORS:
+            return False
+    if stream.poke():
+        return True
+    if sys.platform == "darwin":
+        import subprocess
+
+        subprocess.run(["open", "-g", SWIFTBAR_REFRESH_URL], check=False)
+    return True
+
+
+def spawn_refresh() -> None:
+    """Start `refresh` in a detached background process (best-effort)."""
+    from aerospace_workspaces import client
+
+    client.spawn_module("aerospace_workspaces.snapshot")
+
+
+if __name__ == "__main__":
+    refresh()
@@ -0,0 +1,153 @@
+"""Streamable SwiftBar mode: one long-running process that redraws only when the menu changes.
+
+Instead of SwiftBar re-running the plugin every 10s, a plugin file carrying the
+`<swiftbar.type>streamable</swiftbar.type>` directive runs `swiftbar.main(["--stream"])` once and
+keeps it alive. `stream()` prints a menu, then waits on a wake channel and re-renders; a frame —
+SwiftBar's `~~~` separator line followed by the menu — is written only when the rendered text
+differs from the last one sent.
+
+The wake channel is a Unix datagram socket (`wake_path()`, default <cache_dir>/wake.sock). Any
+datagram wakes the loop, so AeroSpace's `exec-on-workspace-change` can poke it without starting
+Python (`echo "$AEROSPACE_FOCUSED_WORKSPACE" | nc -Uu -w1 <path>`; from Python, `poke()`). A
+non-empty payload names the newly focused workspace, which spares `collect` asking for it. Pokes
+that arrive together are coalesced into one redraw, using the last one's payload. When nobody
+pokes — or the socket can't be bound — the loop still re-renders every `POLL_INTERVAL_SECONDS`,
+and sooner (`STALE_RETRY_SECONDS`) while it is showing a stale snapshot.
+"""
+
+from __future__ import annotations
+
+import os
+import select
+import socket
+import sys
+import time
+from typing import TextIO
+
+from aerospace_workspaces import swiftbar
+from aerospace_workspaces.workspaces import cache_dir, load_workspaces_cached, workspaces_yaml
+
+SEPARATOR = "~~~"
+WAKE_NAME = "wake.sock"
+
+# Slow fallback for changes nobody pokes about (e.g. a window opening on the focused workspace).
+POLL_INTERVAL_SECONDS = 30.0
+STALE_RETRY_SECONDS = 5.0
+# After a wake, how long to let further pokes (a burst of switches) arrive before redrawing once.
+DEBOUNCE_SECONDS = 0.05
+
+
+def wake_path() -> str:
+    """The wake socket path. $AEROSPACE_WORKSPACES_WAKE_SOCKET overrides."""
+    return os.environ.get("AEROSPACE_WORKSPACES_WAKE_SOCKET") or os.path.join(
+        cache_dir(), WAKE_NAME
+    )
+
+
+def poke(path: str | None = None, focused: str = "") -> bool:
+    """Wake a running stream, telling it the `focused` workspace if known; False if none listens."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.sendto(f"{focused}\n".encode(), path or wake_path())
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def render_menu(focused: str | None = None) -> tuple[str, bool]:
+    """(menu, stale): the menu `swiftbar.main` would print right now."""
+    state, stale_since = swiftbar.collect_or_last_known(focused=focused)
+    if state is None:
+        return swiftbar.render_unavailable(), True
+    records, declared_order = load_workspaces_cached(workspaces_yaml())
+    menu = swiftbar.render(*state, records, declared_order, stale_since=stale_since)
+    return menu, stale_since is not None
+
+
+def _bind_wake_socket(path: str) -> socket.socket | None:
+    """Bind the wake socket (replacing a leftover file); None if that isn't possible."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o177)  # owner-only socket
+        try:
+            sock.bind(path)
+        finally:
+            os.umask(old_umask)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _wait(wake: socket.socket | None, timeout: float) -> str | None:
+    """Block until poked or `timeout` elapses, then drain every pending poke.
+
+    Returns the focused workspace the last poke named, if any.
+    """
+    if wake is None:
+        time.sleep(timeout)
+        return None
+    readable, _, _ = select.select([wake], [], [], timeout)
+    if not readable:
+        return None
+    time.sleep(DEBOUNCE_SECONDS)
+    focused = None
+    wake.setblocking(False)
+    try:
+        while True:
+            focused = wake.recv(256).decode(errors="replace").strip() or None
+    except (BlockingIOError, InterruptedError):
+        pass
+    finally:
+        wake.setblocking(True)
+    return focused
+
+
+def stream(
+    out: TextIO | None = None,
+    *,
+    path: str | None = None,
+    poll_interval: float = POLL_INTERVAL_SECONDS,
+    max_frames: int | None = None,
+) -> None:
+    """Write a `~~~`-framed menu to `out` whenever it changes, until `out` closes.
+
+    `max_frames` stops after that many frames (for tests and benchmarks).
+    """
+    out = out or sys.stdout
+    path = path or wake_path()
+    wake = _bind_wake_socket(path)
+    bound_ino = os.stat(path).st_ino if wake is not None else None
+    last = focused = None
+    frames = 0
+    try:
+        while True:
+            menu, stale = render_menu(focused)
+            if menu != last:
+                out.write(f"{SEPARATOR}\n{menu}\n")
+                out.flush()
+                last = menu
+                frames += 1
+                if max_frames is not None and frames >= max_frames:
+                    return
+            focused = _wait(
+                wake, min(poll_interval, STALE_RETRY_SECONDS) if stale else poll_interval
+            )
+    except BrokenPipeError:
+        return  # SwiftBar stopped reading: the plugin was disabled or reloaded.
+    finally:
+        if wake is not None:
+            wake.close()
+            try:
+                # Leave the path alone if a newer stream has already re-bound it.
+                if os.stat(path).st_ino == bound_ino:
+                    os.unlink(path)
+            except OSError:
+                pass
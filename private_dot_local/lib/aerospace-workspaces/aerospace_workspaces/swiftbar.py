@@ -7,21 +7,33 @@
     doesn't overrun the bar);
   - a dropdown listing every workspace the same way (declared workspaces first, in file order),
     each switching to that workspace on click, with a hover tooltip when the workspace has a hint;
-  - under each workspace, its open windows as an indented submenu, each focusing that exact window.
+  - under each workspace, its open windows as an indented submenu, each focusing that exact window
+    (grouped per app, with "+N more" overflow, once a workspace has more than `WINDOW_LIMIT`).
 
-`render()` is pure (all inputs injected) so it's unit-testable without a live AeroSpace.
+`collect()` gets its state from the window-manager backend (`aerospace_workspaces.backend`). For
+AeroSpace that is as few `aerospace` calls as possible (usually one; see
+`aerospace_workspaces.query`), run together under one shared deadline; for i3/sway, one GET_TREE
+over a persistent socket.
+`main()` gives it at most `MENU_DEADLINE_SECONDS`; when it misses that or fails, the menu is drawn
+from the last-known-good snapshot (greyed, with a "stale" note) while a background refresh
+catches up — see `aerospace_workspaces.snapshot` — so the menu bar never goes blank.
+`main(["--stream"])` instead runs SwiftBar's streamable mode (`aerospace_workspaces.stream`).
+`render()` is pure (all inputs injected) so it's unit-testable without a live AeroSpace; in
+long-lived processes its `RenderCache` memo skips rebuilding output whose inputs haven't changed.
 """
 
 from __future__ import annotations
 
-import json
 import subprocess
+import time
 
+from aerospace_workspaces import backend, snapshot
+from aerospace_workspaces.snapshot import Snapshot
 from aerospace_workspaces.workspaces import (
     Record,
     aerospace_bin,
     label,
-    load_workspaces,
+    load_workspaces_cached,
     sanitize,
     workspaces_yaml,
 )
@@ -30,6 +42,13 @@ from aerospace_workspaces.workspaces import (
 # the dropdown always shows the full name.
 TITLE_NAME_LIMIT = 30
 
+DIM_COLOR = "#999999"
+
+# A workspace with more windows than this switches from one line per window to one submenu per
+# app ("Firefox (143)"), showing at most this many apps and this many windows in all; the rest
+# collapse into "+N more" entries. Keeps the menu's size — and SwiftBar's draw time — bounded.
+WINDOW_LIMIT = 25
+
 
 def truncate(text: str, limit: int = TITLE_NAME_LIMIT) -> str:
     """Cap text at `limit` characters, appending an ellipsis when shortened."""
@@ -50,95 +69,284 @@ def ordered_ids(ids: list[str], declared_order: list[str]) -> list[str]:
     return declared_live + remaining
 
 
+# A window's contribution to the menu: (window-id, app-name, window-title).
+WindowKey = tuple[object, object, object]
+
+RENDER_STAT_KEYS = ("hits", "misses", "section_hits", "section_misses")
+
+
+class RenderCache:
+    """Memo for `render` in long-lived processes (the server, the streaming mode).
+
+    `render` first builds a cheap fingerprint of everything the menu depends on — the aerospace
+    path, focused id, live ids, declared order, the records, each window's (id, app, title), and
+    the stale marker — and returns the previous output untouched when it matches. Otherwise the
+    menu is reassembled workspace by workspace: each workspace's section (its row plus window
+    submenu) is keyed on just the inputs it reads, so a switch rebuilds only the two rows whose
+    ✓ moved and a new window only its own workspace's section. `stats` counts both levels.
+    """
+
+    def __init__(self) -> None:
+        self.key: object = None
+        self.output = ""
+        self.sections: dict[str, tuple[object, list[str]]] = {}
+        self.stats = dict.fromkeys(RENDER_STAT_KEYS, 0)
+
+
+# The process-wide memo `render` uses unless told otherwise.
+RENDER_CACHE = RenderCache()
+
+
+def _window_keys(windows: list[dict[str, object]]) -> tuple[WindowKey, ...]:
+    return tuple(
+        (window.get("window-id"), window.get("app-name"), window.get("window-title"))
+        for window in windows
+    )
+
+
 def render(
     focused: str,
     ids: list[str],
     windows_by_ws: dict[str, list[dict[str, object]]],
     records: dict[str, Record],
     declared_order: list[str],
+    *,
+    stale_since: float | None = None,
+    window_limit: int | None = WINDOW_LIMIT,
+    cache: RenderCache | None = RENDER_CACHE,
 ) -> str:
-    """Build the full SwiftBar menu string from already-gathered data (pure: no I/O).
+    """Build the full SwiftBar menu string from already-gathered data (no I/O).
 
     `windows_by_ws` maps a workspace id to a list of {"window-id", "app-name",
-    "window-title"} dicts.
+    "window-title"} dicts. `stale_since` (a Unix time) marks the data as a last-known-good
+    snapshot taken then: the title is greyed and the dropdown opens with a note saying so.
+    Workspaces with more than `window_limit` windows are grouped by app (see `WINDOW_LIMIT`;
+    None always lists every window). Output depends only on the arguments; `cache` (None to
+    disable) just skips rebuilding it.
     """
     aerospace = aerospace_bin()
+    window_keys = {ws: _window_keys(windows) for ws, windows in windows_by_ws.items()}
+    if cache is not None:
+        key = (
+            aerospace,
+            focused,
+            tuple(ids),
+            tuple(declared_order),
+            tuple((ws, tuple(record.items())) for ws, record in records.items()),
+            tuple(window_keys.items()),
+            stale_since,
+            window_limit,
+        )
+        if key == cache.key:
+            cache.stats["hits"] += 1
+            return cache.output
+        cache.stats["misses"] += 1
+
     lines: list[str] = []
 
     # Menu-bar title: focused workspace, name truncated so it doesn't overrun the bar.
-    lines.append(truncate(label(focused, records)))
-    lines.append("---")
+    title = truncate(label(focused, records))
+    if stale_since is None:
+        lines.append(title)
+        lines.append("---")
+    else:
+        as_of = time.strftime("%H:%M:%S", time.localtime(stale_since))
+        lines.append(f"{title} | color={DIM_COLOR}")
+        lines.append("---")
+        lines.append(f"AeroSpace didn't answer — showing state from {as_of} | color={DIM_COLOR}")
 
+    sections: dict[str, tuple[object, list[str]]] = {}
     for workspace_id in ordered_ids(ids, declared_order):
-        marker = "✓ " if workspace_id == focused else ""
-        # A hint becomes a hover tooltip on the workspace row.
-        hint = records.get(workspace_id, {}).get("hint")
-        tooltip = f' tooltip="{sanitize(hint)}"' if hint else ""
-        lines.append(
-            f"{marker}{label(workspace_id, records)} | "
-            f'bash="{aerospace}" param0=workspace param1={workspace_id} '
-            f"terminal=false refresh=true{tooltip}"
-        )
-        windows = windows_by_ws.get(workspace_id, [])
-        if not windows:
-            lines.append("-- (empty) | color=#999999")
+        if cache is not None:
+            section_key = (
+                aerospace,
+                workspace_id == focused,
+                tuple(records.get(workspace_id, {}).items()),
+                window_keys.get(workspace_id, ()),
+                window_limit,
+            )
+            cached = cache.sections.get(workspace_id)
+            if cached is not None and cached[0] == section_key:
+                cache.stats["section_hits"] += 1
+                section = cached[1]
+            else:
+                cache.stats["section_misses"] += 1
+                section = _render_section(
+                    workspace_id, focused, windows_by_ws, records, aerospace, window_limit
+                )
+            sections[workspace_id] = (section_key, section)
+        else:
+            section = _render_section(
+                workspace_id, focused, windows_by_ws, records, aerospace, window_limit
+            )
+        lines.extend(section)
+
+    output = "\n".join(lines)
+    if cache is not None:
+        # Only the live workspaces' sections are kept, so the memo can't grow without bound.
+        cache.key, cache.output, cache.sections = key, output, sections
+    return output
+
+
+def _render_section(
+    workspace_id: str,
+    focused: str,
+    windows_by_ws: dict[str, list[dict[str, object]]],
+    records: dict[str, Record],
+    aerospace: str,
+    window_limit: int | None,
+) -> list[str]:
+    """One workspace's row and its window submenu."""
+    marker = "✓ " if workspace_id == focused else ""
+    # A hint becomes a hover tooltip on the workspace row.
+    hint = records.get(workspace_id, {}).get("hint")
+    tooltip = f' tooltip="{sanitize(hint)}"' if hint else ""
+    lines = [
+        f"{marker}{label(workspace_id, records)} | "
+        f'bash="{aerospace}" param0=workspace param1={workspace_id} '
+        f"terminal=false refresh=true{tooltip}"
+    ]
+    windows = windows_by_ws.get(workspace_id, [])
+    if not windows:
+        lines.append(f"-- (empty) | color={DIM_COLOR}")
+    elif window_limit is None or len(windows) <= window_limit:
+        lines.extend(_window_line(window, aerospace) for window in windows)
+    else:
+        lines.extend(_grouped_window_lines(windows, aerospace, window_limit))
+    return lines
+
+
+def _focus_params(aerospace: str, window: dict[str, object]) -> str:
+    window_id = window.get("window-id", "")
+    return (
+        f'bash="{aerospace}" param0=focus param1=--window-id param2={window_id} '
+        f"terminal=false refresh=true"
+    )
+
+
+def _window_line(window: dict[str, object], aerospace: str) -> str:
+    """A flat "-- App — Title" entry that focuses the window."""
+    app = sanitize(str(window.get("app-name", "")))
+    title = sanitize(str(window.get("window-title", "")))
+    entry = f"{app} — {title}" if title else app
+    return f"-- {entry} | {_focus_params(aerospace, window)}"
+
+
+def _grouped_window_lines(
+    windows: list[dict[str, object]], aerospace: str, limit: int
+) -> list[str]:
+    """Windows grouped into per-app submenus, busiest app first, with "+N more" overflow.
+
+    At most `limit` apps get a submenu, and at most `limit` windows are listed across them, handed
+    out round-robin so every shown app lists at least one. Only those windows are sanitized and
+    formatted, so the cost and the menu's length track `limit`, not the number of windows.
+    """
+    by_app: dict[str, list[dict[str, object]]] = {}
+    for window in windows:
+        by_app.setdefault(str(window.get("app-name", "")), []).append(window)
+    # Stable sort: apps with equal counts keep their first-seen order.
+    apps = sorted(by_app.items(), key=lambda item: -len(item[1]))
+    shown, hidden = apps[:limit], apps[limit:]
+
+    quota = [0] * len(shown)
+    budget = limit
+    while budget:
+        progressed = False
+        for i, (_, app_windows) in enumerate(shown):
+            if budget and quota[i] < len(app_windows):
+                quota[i] += 1
+                budget -= 1
+                progressed = True
+        if not progressed:
+            break
+
+    lines: list[str] = []
+    for (app, app_windows), count in zip(shown, quota):
+        if len(app_windows) == 1:
+            lines.append(_window_line(app_windows[0], aerospace))
             continue
-        for window in windows:
-            app = sanitize(str(window.get("app-name", "")))
-            title = sanitize(str(window.get("window-title", "")))
-            window_id = window.get("window-id", "")
-            entry = f"{app} — {title}" if title else app
+        name = sanitize(app)
+        lines.append(f"-- {name} ({len(app_windows)})")
+        for window in app_windows[:count]:
+            title = sanitize(str(window.get("window-title", ""))) or name
+            lines.append(f"---- {title} | {_focus_params(aerospace, window)}")
+        if len(app_windows) > count:
+            lines.append(f"---- +{len(app_windows) - count} more | color={DIM_COLOR}")
+
+    if hidden:
+        # The overflow submenu names the remaining apps; each entry focuses that app's first window.
+        lines.append(f"-- +{sum(len(app_windows) for _, app_windows in hidden)} more")
+        for app, app_windows in hidden[:limit]:
             lines.append(
-                f"-- {entry} | "
-                f'bash="{aerospace}" param0=focus param1=--window-id param2={window_id} '
-                f"terminal=false refresh=true"
+                f"---- {sanitize(app)} ({len(app_windows)}) | "
+                f"{_focus_params(aerospace, app_windows[0])}"
             )
+        if len(hidden) > limit:
+            lines.append(f"---- +{len(hidden) - limit} more apps | color={DIM_COLOR}")
+    return lines
 
-    return "\n".join(lines)
 
+def render_stats(cache: RenderCache = RENDER_CACHE) -> dict[str, int]:
+    """A copy of the memo's hit/miss counters (whole-menu and per-section)."""
+    return dict(cache.stats)
 
-def _run_json(args: list[str]) -> object:
-    """Run `aerospace <args>` and parse stdout as JSON."""
-    result = subprocess.run(
-        [aerospace_bin(), *args],
-        capture_output=True,
-        text=True,
-        check=True,
-    )
-    return json.loads(result.stdout)
-
-
-def collect() -> tuple[str, list[str], dict[str, list[dict[str, object]]]]:
-    """Query AeroSpace for the focused workspace, all workspace ids, and windows-by-workspace."""
-    focused = subprocess.run(
-        [aerospace_bin(), "list-workspaces", "--focused"],
-        capture_output=True,
-        text=True,
-        check=True,
-    ).stdout.strip()
-
-    workspaces = _run_json(["list-workspaces", "--all", "--json"])
-    ids = [str(entry["workspace"]) for entry in workspaces]  # type: ignore[index]
-
-    # One query for every window; the explicit --format adds the "workspace" field to the JSON.
-    windows = _run_json(
-        [
-            "list-windows",
-            "--all",
-            "--format",
-            "%{workspace}%{window-id}%{app-name}%{window-title}",
-            "--json",
-        ]
-    )
-    windows_by_ws: dict[str, list[dict[str, object]]] = {}
-    for window in windows:  # type: ignore[union-attr]
-        workspace_id = str(window["workspace"])  # type: ignore[index]
-        windows_by_ws.setdefault(workspace_id, []).append(window)  # type: ignore[arg-type]
 
-    return focused, ids, windows_by_ws
+def render_unavailable() -> str:
+    """The menu shown when AeroSpace didn't answer and there is no snapshot to fall back on."""
+    return f"AeroSpace | color={DIM_COLOR}\n---\nAeroSpace didn't answer | color={DIM_COLOR}"
+
+
+# Overall budget for one `collect`, shared by all its queries. Kept under the server client's
+# request timeout so a wedged AeroSpace yields a failure reply rather than a client-side timeout.
+COLLECT_DEADLINE_SECONDS = 3.0
+
+# How long the plugin waits on AeroSpace before drawing from the last-known-good snapshot instead.
+MENU_DEADLINE_SECONDS = 1.0
+
+# What a failed `collect` can raise: a query timing out or exiting non-zero, a missing binary, or
+# output that isn't the JSON shape we expect.
+COLLECT_ERRORS = (subprocess.SubprocessError, OSError, ValueError, KeyError, TypeError)
+
+
+def collect(*, timeout: float = COLLECT_DEADLINE_SECONDS, focused: str | None = None) -> Snapshot:
+    """Ask the window manager for the focused workspace, all workspace ids, and each one's windows.
+
+    Goes through `backend.current()`: under AeroSpace, planned by `aerospace_workspaces.query`
+    (usually a single `aerospace` call). `focused` is a known focused workspace id (e.g. from the
+    workspace-change hook), trusted as is.
+    """
+    return backend.current().collect(timeout=timeout, focused=focused)
+
+
+def collect_or_last_known(
+    *, timeout: float = MENU_DEADLINE_SECONDS, focused: str | None = None
+) -> tuple[Snapshot | None, float | None]:
+    """(state, stale_since): a fresh `collect`, or else the last-known-good snapshot.
+
+    A fresh result is saved as the new snapshot and comes back with stale_since None. If
+    collection misses `timeout` or fails, a background refresh is started and the saved snapshot
+    returned with the time it was taken — or (None, None) when there is none yet.
+    """
+    started = time.time()
+    try:
+        state = collect(timeout=timeout, focused=focused)
+    except COLLECT_ERRORS:
+        snapshot.spawn_refresh()
+        saved = snapshot.load()
+        return (None, None) if saved is None else saved
+    snapshot.save(state, taken_at=started)
+    return state, None
+
 
+def main(argv: list[str] | None = None) -> None:
+    if argv and "--stream" in argv:
+        from aerospace_workspaces import stream
 
-def main() -> None:
-    focused, ids, windows_by_ws = collect()
-    records, declared_order = load_workspaces(workspaces_yaml())
-    print(render(focused, ids, windows_by_ws, records, declared_order))
+        stream.stream()
+        return
+    state, stale_since = collect_or_last_known()
+    if state is None:
+        print(render_unavailable())
+        return
+    records, declared_order = load_workspaces_cached(workspaces_yaml())
+    print(render(*state, records, declared_order, stale_since=stale_since))
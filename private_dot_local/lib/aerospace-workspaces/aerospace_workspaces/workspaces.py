@@ -4,22 +4,35 @@ This module is consumed by both `aerospace_workspaces.swiftbar` (the SwiftBar me
 `aerospace_workspaces.hud` (the workspace-switch HUD), which is why it lives in a shared package
 rather than being duplicated in each entry-point script.
 
-Two environment seams double as runtime overrides and test seams:
+Three environment seams double as runtime overrides and test seams:
   - $AEROSPACE_BIN — the `aerospace` binary path (SwiftBar's launchd PATH omits Homebrew).
   - $AEROSPACE_WORKSPACES_YAML — the names file location.
-Both are read at call time (not import time) so tests can set them per-case.
+  - $AEROSPACE_WORKSPACES_CACHE_DIR — where derived data is cached (see `load_workspaces_cached`).
+All are read at call time (not import time) so tests can set them per-case.
+
+The entry points load the names file through `load_workspaces_cached`: a marshaled copy of the
+parsed result, so the common case (the file hasn't changed since the last keypress / tick) costs a
+stat and one small read, and PyYAML — the bulk of a cold HUD start — isn't imported at all.
+Likewise `tempfile` is imported only when the cache is rewritten, and paths are built with
+`os.path` rather than `pathlib`: the HUD's import budget (tests/test_import_budget.py) has no room
+for either on the warm path.
 """
 
 from __future__ import annotations
 
+import marshal
 import os
-from pathlib import Path
-
-import yaml
 
 # A per-workspace record: any of "icon" (emoji), "name", "hint" may be present.
 Record = dict[str, str]
 
+# Compiled workspaces.yaml cache (see `load_workspaces_cached`), kept in `cache_dir()`.
+CACHE_NAME = "workspaces.marshal"
+CACHE_VERSION = 1
+
+# Identifies one revision of workspaces.yaml: (absolute path, mtime_ns, size, inode).
+RecordsVersion = tuple[str, int, int, int]
+
 
 def aerospace_bin() -> str:
     """Path to the `aerospace` binary. $AEROSPACE_BIN overrides (default: Homebrew prefix)."""
@@ -30,10 +43,33 @@ def workspaces_yaml() -> str:
     """Path to workspaces.yaml. $AEROSPACE_WORKSPACES_YAML overrides (default: ~/.config/...)."""
     return os.environ.get(
         "AEROSPACE_WORKSPACES_YAML",
-        str(Path.home() / ".config" / "aerospace" / "workspaces.yaml"),
+        os.path.expanduser("~/.config/aerospace/workspaces.yaml"),
+    )
+
+
+def cache_dir() -> str:
+    """Derived-data cache dir. $AEROSPACE_WORKSPACES_CACHE_DIR overrides (default ~/.cache/...)."""
+    return os.environ.get(
+        "AEROSPACE_WORKSPACES_CACHE_DIR",
+        os.path.join(
+            os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+            "aerospace-workspaces",
+        ),
     )
 
 
+def records_version(path: str) -> RecordsVersion | None:
+    """The current revision of the names file at `path` (None if it can't be stat'ed).
+
+    An in-place edit changes the mtime/size, an editor's save-by-rename changes the inode.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size, st.st_ino
+
+
 def load_workspaces(path: str) -> tuple[dict[str, Record], list[str]]:
     """Parse the `workspaces:` map from workspaces.yaml.
 
@@ -44,11 +80,15 @@ def load_workspaces(path: str) -> tuple[dict[str, Record], list[str]]:
     Tolerates the older flat shape (`id: "Name"`) by coercing a bare string to {"name": ...}.
     Returns ({}, []) if the file is absent or malformed.
     """
+    import yaml  # deferred: only a cache miss in `load_workspaces_cached` pays for it
+
     try:
         with open(path, encoding="utf-8") as handle:
             data = yaml.safe_load(handle)
     except FileNotFoundError:
         return {}, []
+    except yaml.YAMLError:
+        return {}, []
     if not isinstance(data, dict):
         return {}, []
     workspaces = data.get("workspaces")
@@ -75,20 +115,54 @@ def load_workspaces(path: str) -> tuple[dict[str, Record], list[str]]:
     return records, order
 
 
+def load_workspaces_cached(path: str) -> tuple[dict[str, Record], list[str]]:
+    """`load_workspaces(path)` through a compiled cache at <cache_dir>/workspaces.marshal.
+
+    The cache is a marshaled (version, source path, mtime_ns, size, inode, records, order) tuple,
+    used only while the file's `records_version` still matches. Otherwise (or if the cache is
+    missing or unreadable) the file is parsed and the cache rewritten atomically. Same results as
+    `load_workspaces`, including ({}, []) for an absent or malformed file.
+    """
+    source = records_version(path)
+    if source is None:
+        return {}, []
+    directory = cache_dir()
+    cache_path = os.path.join(directory, CACHE_NAME)
+
+    try:
+        with open(cache_path, "rb") as handle:
+            version, *cached_source, records, order = marshal.loads(handle.read())
+        if version == CACHE_VERSION and tuple(cached_source) == source:
+            return records, order
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    records, order = load_workspaces(path)
+    try:
+        import tempfile  # deferred: only a cache miss writes
+
+        os.makedirs(directory, exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix=f".{CACHE_NAME}.", dir=directory)
+        with os.fdopen(tmp_fd, "wb") as out:
+            out.write(marshal.dumps((CACHE_VERSION, *source, records, order)))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return records, order
+
+
+_SANITIZE_TABLE = str.maketrans({"|": "¦", '"': "”", "\n": " ", "\r": " "})
+
+
 def sanitize(text: str) -> str:
     """Neutralize characters that would break SwiftBar's "title | params" line grammar.
 
     Free text (window titles, hints) can contain `|` (which SwiftBar reads as the param
     separator), newlines (which split the menu line), or `"` (which would close a quoted param
-    value early, e.g. tooltip="..."). Swap each for a harmless look-alike / space.
+    value early, e.g. tooltip="..."). Swap each for a harmless look-alike / space, in a single
+    `str.translate` pass (menus with thousands of window titles call this a lot).
     """
-    return (
-        text.replace("|", "¦")
-        .replace('"', "”")
-        .replace("\n", " ")
-        .replace("\r", " ")
-        .strip()
-    )
+    return text.translate(_SANITIZE_TABLE).strip()
 
 
 def label(workspace_id: str, records: dict[str, Record]) -> str:
@@ -0,0 +1,124 @@
+"""Benchmark: `swiftbar.collect`'s planned queries vs the three round-trips it used to make.
+
+Every mode runs against a fake `aerospace` ($AEROSPACE_BIN) that sleeps a fixed latency per call
+before answering from canned JSON, at several latencies. "sequential" issues the old three queries
+(focused, workspaces, windows) one after another with `subprocess.run`; "concurrent" runs the same
+three at once. "planned cold" is `collect` without a cached workspace list (two concurrent
+queries); "planned warm" is the common case, one query.
+
+    python benchmarks/bench_collect.py [--runs N] [--delays MS,MS,...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LIB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LIB_DIR))
+
+from aerospace_workspaces import query, swiftbar  # noqa: E402
+from aerospace_workspaces.workspaces import aerospace_bin, cache_dir  # noqa: E402
+
+WORKSPACES = [{"workspace": ws, "workspace-is-focused": ws == "1"} for ws in "123456789"]
+WINDOWS = [
+    {
+        "workspace": str(n % 9 + 1),
+        "workspace-is-focused": n % 9 == 0,
+        "window-id": n,
+        "app-name": f"App {n}",
+        "window-title": "t",
+    }
+    for n in range(30)
+]
+
+LEGACY_QUERIES = [
+    query.FOCUSED_QUERY,
+    ["list-workspaces", "--all", "--json"],
+    ["list-windows", "--all", "--format", "%{workspace}%{window-id}%{app-name}%{window-title}"]
+    + ["--json"],
+]
+
+
+def _sequential() -> None:
+    for args in LEGACY_QUERIES:
+        subprocess.run([aerospace_bin(), *args], capture_output=True, text=True, check=True)
+
+
+def _concurrent() -> None:
+    query.run_concurrently(LEGACY_QUERIES, timeout=10)
+
+
+def _planned_cold() -> None:
+    try:
+        os.unlink(os.path.join(cache_dir(), query.IDS_NAME))
+    except FileNotFoundError:
+        pass
+    swiftbar.collect()
+
+
+def _time_call(fn, runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _median_ms(samples: list[float]) -> str:
+    return f"{statistics.median(samples) * 1000:8.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--delays", default="0,10,50", help="per-call latencies, ms")
+    opts = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="aw-bench-"))
+    try:
+        (work / "workspaces.json").write_text(json.dumps(WORKSPACES), encoding="utf-8")
+        (work / "windows.json").write_text(json.dumps(WINDOWS), encoding="utf-8")
+        script = work / "aerospace"
+        script.write_text(
+            f"""#!/bin/sh
+sleep "$FAKE_AEROSPACE_DELAY"
+case "$*" in
+  "list-workspaces --focused") echo 1 ;;
+  "list-workspaces --all"*) cat "{work}/workspaces.json" ;;
+  list-windows*) cat "{work}/windows.json" ;;
+esac
+""",
+            encoding="utf-8",
+        )
+        script.chmod(0o755)
+        os.environ["AEROSPACE_BIN"] = str(script)
+        os.environ["AEROSPACE_WORKSPACES_CACHE_DIR"] = str(work / "cache")
+
+        print(f"{opts.runs} runs, median:")
+        for delay_ms in (int(d) for d in opts.delays.split(",")):
+            os.environ["FAKE_AEROSPACE_DELAY"] = str(delay_ms / 1000)
+            modes = (
+                ("sequential", _sequential),
+                ("concurrent", _concurrent),
+                ("planned cold", _planned_cold),
+                ("planned warm", swiftbar.collect),
+            )
+            for name, fn in modes:
+                samples = _time_call(fn, opts.runs)
+                print(f"  {delay_ms:4d} ms/call  {name:<12} : {_median_ms(samples)}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark: `swiftbar.render` with thousands of windows, flat vs grouped, plus memo hits.
+
+Feeds `render()` synthetic data (no AeroSpace involved): N windows spread over 9 workspaces and a
+browser-heavy mix of apps, and reports the median build time and the menu's line count — the
+latter being what SwiftBar has to parse and draw. "flat" is one line per window
+(`window_limit=None`); "grouped" is the default per-app grouping with "+N more" overflow; "memo
+hit" re-renders unchanged inputs through a warm `RenderCache`.
+
+    python benchmarks/bench_render.py [--runs N] [--sizes 1000,5000,10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+LIB_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(LIB_DIR))
+
+from aerospace_workspaces import swiftbar  # noqa: E402
+
+WORKSPACE_IDS = [str(n) for n in range(1, 10)]
+# Weighted so a few apps dominate, as browsers and terminals do.
+APPS = ["Firefox"] * 6 + ["Google Chrome"] * 3 + ["iTerm2"] * 2 + [f"App {n}" for n in range(40)]
+RECORDS = {ws: {"name": f"Workspace {ws}", "hint": 'a "hint" | here'} for ws in "123"}
+
+
+def synthetic(windows: int) -> dict[str, list[dict[str, object]]]:
+    by_ws: dict[str, list[dict[str, object]]] = {ws: [] for ws in WORKSPACE_IDS}
+    for n in range(windows):
+        app = APPS[(n * 7) % len(APPS)]
+        by_ws[WORKSPACE_IDS[n % len(WORKSPACE_IDS)]].append(
+            {"window-id": n, "app-name": app, "window-title": f"{app} | page {n}\n"}
+        )
+    return by_ws
+
+
+def _median_ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--sizes", default="1000,5000,10000")
+    opts = parser.parse_args()
+
+    print(f"{opts.runs} runs, median build time (menu lines):")
+    for size in (int(n) for n in opts.sizes.split(",")):
+        windows = synthetic(size)
+        args = ("1", WORKSPACE_IDS, windows, RECORDS, list(RECORDS))
+
+        def flat():
+            return swiftbar.render(*args, window_limit=None, cache=None)
+
+        def grouped():
+            return swiftbar.render(*args, cache=None)
+
+        cache = swiftbar.RenderCache()
+        swiftbar.render(*args, cache=cache)
+
+        def memo_hit():
+            return swiftbar.render(*args, cache=cache)
+
+        for name, fn in (("flat", flat), ("grouped", grouped), ("memo hit", memo_hit)):
+            lines = fn().count("\n") + 1
+            elapsed = _median_ms(fn, opts.runs)
+            print(f"  {size:6d} windows  {name:<8} : {elapsed:8.2f} ms  ({lines} lines)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark: per-invocation latency of the HUD and SwiftBar shims, cold vs warm vs server.
+
+Runs the real shims (with this interpreter, so `uv` resolution is excluded from every mode) against
+a fake `aerospace` that answers from canned JSON, and reports how long each invocation takes:
+
+  cold   — no server, empty cache dir: full PyYAML parse of workspaces.yaml every run.
+  warm   — no server, populated marshal cache: interpreter start + package import, no PyYAML.
+  server — a running aerospace-workspaces server: the shim only sends a request.
+
+    python benchmarks/bench_server.py [--runs N] [--aerospace-delay SECONDS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LIB_DIR = Path(__file__).resolve().parent.parent
+REPO_ROOT = LIB_DIR.parents[2]
+HUD_SHIM = REPO_ROOT / "dot_config" / "aerospace" / "executable_hud-display-workspace-name.py"
+SWIFTBAR_SHIM = (
+    REPO_ROOT / "dot_config" / "swiftbar" / "plugins" / "executable_aerospace-workspaces.10s.py"
+)
+WORKSPACES_YAML = REPO_ROOT / "dot_config" / "aerospace" / "create_workspaces.yaml"
+
+WORKSPACES = [{"workspace": ws} for ws in "123456789"]
+WINDOWS = [
+    {"workspace": str(n % 9 + 1), "window-id": n, "app-name": f"App {n}", "window-title": "t"}
+    for n in range(30)
+]
+
+
+def _median_ms(samples: list[float]) -> str:
+    return f"{statistics.median(samples) * 1000:8.2f} ms"
+
+
+def _time_shim(shim: Path, args: list[str], env: dict[str, str], runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(shim), *args],
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _fake_aerospace(work: Path, delay: float) -> Path:
+    (work / "workspaces.json").write_text(json.dumps(WORKSPACES), encoding="utf-8")
+    (work / "windows.json").write_text(json.dumps(WINDOWS), encoding="utf-8")
+    script = work / "aerospace"
+    script.write_text(
+        f"""#!/bin/sh
+sleep {delay}
+case "$*" in
+  "list-workspaces --focused") echo 1 ;;
+  "list-workspaces --all"*) cat "{work}/workspaces.json" ;;
+  list-windows*) cat "{work}/windows.json" ;;
+esac
+""",
+        encoding="utf-8",
+    )
+    script.chmod(0o755)
+    return script
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--aerospace-delay", type=float, default=0.01)
+    opts = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="aw-bench-"))
+    try:
+        sock = str(work / "s.sock")
+        cache = work / "cache"
+        env = dict(
+            os.environ,
+            AEROSPACE_BIN=str(_fake_aerospace(work, opts.aerospace_delay)),
+            AEROSPACE_LIB_DIR=str(LIB_DIR),
+            AEROSPACE_WORKSPACES_YAML=str(WORKSPACES_YAML),
+            AEROSPACE_WORKSPACES_CACHE_DIR=str(cache),
+            AEROSPACE_WORKSPACES_SOCKET=sock,
+            AEROSPACE_WORKSPACES_SERVER="0",
+        )
+        shims = {
+            "hud --dry-run": (HUD_SHIM, ["--dry-run", "1"]),
+            "swiftbar": (SWIFTBAR_SHIM, []),
+        }
+
+        results: dict[str, dict[str, list[float]]] = {name: {} for name in shims}
+        for name, (shim, args) in shims.items():
+            cold = []
+            for _ in range(opts.runs):
+                shutil.rmtree(cache, ignore_errors=True)
+                cold += _time_shim(shim, args, env, 1)
+            results[name]["cold"] = cold
+            results[name]["warm"] = _time_shim(shim, args, env, opts.runs)
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "aerospace_workspaces.server"],
+            env=dict(env, PYTHONPATH=str(LIB_DIR)),
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 5
+            while not os.path.exists(sock) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            for name, (shim, args) in shims.items():
+                results[name]["server"] = _time_shim(shim, args, env, opts.runs)
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(f"aerospace delay {opts.aerospace_delay:.3f}s per call, {opts.runs} runs, median:")
+        for name, modes in results.items():
+            for mode, samples in modes.items():
+                print(f"  {name:<14} {mode:<6} : {_median_ms(samples)}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: shim startup through the pre-materialized environment vs `uv run --script`.
+
+Runs the real HUD shim (`--dry-run`, no server, warm marshal cache) through its /bin/sh preamble
+both ways and reports the median wall time per invocation:
+
+  env    — <XDG_DATA_HOME>/shim-envs/aerospace-workspaces/.stamp is fresh: the preamble execs the
+           env's interpreter directly.
+  uv run — no stamp: the preamble falls back to `uv run --script`, which re-resolves the inline
+           dependencies before starting Python.
+
+The env is built the way .chezmoiscripts/run_onchange_after_install-shim-envs.sh.tmpl builds it
+when `uv` is available; without uv, a `python -m venv --system-site-packages` env stands in for it
+and the "uv run" mode is skipped.
+
+    python benchmarks/bench_startup.py [--runs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LIB_DIR = Path(__file__).resolve().parent.parent
+REPO_ROOT = LIB_DIR.parents[2]
+HUD_SHIM = REPO_ROOT / "dot_config" / "aerospace" / "executable_hud-display-workspace-name.py"
+# The HUD shim's fallback; `uv` on PATH stands in for it off macOS.
+SHIM_UV = "/opt/homebrew/bin/uv"
+
+
+def _median_ms(samples: list[float]) -> str:
+    return f"{statistics.median(samples) * 1000:8.2f} ms"
+
+
+def _time(command: list[str], env: dict[str, str], runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            command, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _materialize(env_dir: Path, uv: str | None) -> None:
+    if uv is None:
+        subprocess.run(
+            [sys.executable, "-m", "venv", "--system-site-packages", str(env_dir)], check=True
+        )
+    else:
+        subprocess.run([uv, "venv", "-q", "--python", sys.executable, str(env_dir)], check=True)
+        python = str(env_dir / "bin" / "python")
+        subprocess.run([uv, "pip", "install", "--quiet", "--python", python, "pyyaml"], check=True)
+    package = str(LIB_DIR / "aerospace_workspaces")
+    subprocess.run([str(env_dir / "bin" / "python"), "-m", "compileall", "-q", package], check=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    opts = parser.parse_args()
+
+    uv = SHIM_UV if os.access(SHIM_UV, os.X_OK) else shutil.which("uv")
+    work = Path(tempfile.mkdtemp(prefix="aw-bench-"))
+    try:
+        env_dir = work / "data" / "shim-envs" / "aerospace-workspaces"
+        _materialize(env_dir, uv)
+        (work / "ws.yaml").write_text("workspaces:\n  C:\n    name: Comms\n", encoding="utf-8")
+        env = {
+            **os.environ,
+            "XDG_DATA_HOME": str(work / "data"),
+            "AEROSPACE_LIB_DIR": str(LIB_DIR),
+            "AEROSPACE_WORKSPACES_YAML": str(work / "ws.yaml"),
+            "AEROSPACE_WORKSPACES_CACHE_DIR": str(work / "cache"),
+            "AEROSPACE_WORKSPACES_SOCKET": str(work / "none.sock"),
+            "AEROSPACE_WORKSPACES_SERVER": "0",
+        }
+        shim = ["/bin/sh", str(HUD_SHIM), "--dry-run", "C"]
+        stamp = env_dir / ".stamp"
+        stamp.touch()
+        os.utime(stamp, (time.time() + 60, time.time() + 60))  # newer than the shim, always
+        _time(shim, env, 1)  # prime the marshal cache
+
+        print(f"{opts.runs} runs, median:")
+        print(f"  hud --dry-run  env    : {_median_ms(_time(shim, env, opts.runs))}")
+
+        stamp.unlink()
+        if uv is None:
+            print("  hud --dry-run  uv run : skipped (uv not found)")
+        elif uv == SHIM_UV:
+            print(f"  hud --dry-run  uv run : {_median_ms(_time(shim, env, opts.runs))}")
+        else:
+            uv_run = [uv, "run", "--script", str(HUD_SHIM), "--dry-run", "C"]
+            print(f"  hud --dry-run  uv run : {_median_ms(_time(uv_run, env, opts.runs))}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Shared fixtures: a fake `aerospace` CLI, a fake i3/sway IPC server, and a short directory for
+Unix sockets."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import textwrap
+import threading
+
+import pytest
+
+WORKSPACES = [{"workspace": ws} for ws in ("C", "I", "9", "Z")]
+WINDOWS = [
+    {"workspace": "C", "window-id": 242, "app-name": "Firefox", "window-title": "Box | Login"},
+    {"workspace": "Z", "window-id": 264, "app-name": "Slack", "window-title": "general"},
+    {"workspace": "C", "window-id": 55672, "app-name": "Outlook", "window-title": "Inbox"},
+]
+
+
+class FakeAerospace:
+    """Handle on the fake: its call log and knobs (each read by the script at call time)."""
+
+    def __init__(self, directory, monkeypatch):
+        self.directory = directory
+        self.log = directory / "aerospace.log"
+        self._monkeypatch = monkeypatch
+
+    def calls(self) -> list[str]:
+        return self.log.read_text(encoding="utf-8").splitlines() if self.log.exists() else []
+
+    def set_delay(self, seconds: float) -> None:
+        """Sleep this long before answering each query."""
+        self._monkeypatch.setenv("FAKE_AEROSPACE_DELAY", str(seconds))
+
+    def fail(self, subcommand: str) -> None:
+        """Exit 3 for queries whose first argument is `subcommand` ("" to stop failing)."""
+        self._monkeypatch.setenv("FAKE_AEROSPACE_FAIL", subcommand)
+
+    def set_focused(self, workspace_id: str) -> None:
+        (self.directory / "focused").write_text(f"{workspace_id}\n", encoding="utf-8")
+
+    def set_workspaces(self, ids: list[str]) -> None:
+        payload = json.dumps([{"workspace": ws} for ws in ids])
+        (self.directory / "workspaces.json").write_text(payload, encoding="utf-8")
+
+    def set_windows(self, windows: list[dict[str, object]]) -> None:
+        (self.directory / "windows.json").write_text(json.dumps(windows), encoding="utf-8")
+
+    def calls_to(self, subcommand: str) -> int:
+        return sum(1 for call in self.calls() if call.split(" ", 1)[0] == subcommand)
+
+
+@pytest.fixture()
+def fake_aerospace(tmp_path, monkeypatch):
+    """An `aerospace` ($AEROSPACE_BIN) that answers collect's queries from canned JSON.
+
+    Like the real CLI, it adds "workspace-is-focused" to the JSON when `--format` asks for it. Also
+    points the YAML and cache-dir seams into tmp_path so nothing touches the real ones.
+    """
+    (tmp_path / "workspaces.json").write_text(json.dumps(WORKSPACES), encoding="utf-8")
+    (tmp_path / "windows.json").write_text(json.dumps(WINDOWS), encoding="utf-8")
+    (tmp_path / "focused").write_text("C\n", encoding="utf-8")
+    script = tmp_path / "aerospace"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        + textwrap.dedent(
+            f"""\
+            import json, os, sys, time
+            args = sys.argv[1:]
+            with open({str(tmp_path / "aerospace.log")!r}, "a") as log:
+                log.write(" ".join(args) + "\\n")
+            time.sleep(float(os.environ.get("FAKE_AEROSPACE_DELAY") or 0))
+            if args[:1] == [os.environ.get("FAKE_AEROSPACE_FAIL")]:
+                sys.exit(3)
+            focused = open({str(tmp_path / "focused")!r}).read().strip()
+            fmt = args[args.index("--format") + 1] if "--format" in args else ""
+            def emit(name):
+                entries = json.load(open(os.path.join({str(tmp_path)!r}, name)))
+                if "%{{workspace-is-focused}}" in fmt:
+                    for entry in entries:
+                        entry["workspace-is-focused"] = entry["workspace"] == focused
+                print(json.dumps(entries))
+            if args == ["list-workspaces", "--focused"]:
+                print(focused)
+            elif args[:2] == ["list-workspaces", "--all"]:
+                emit("workspaces.json")
+            elif args[:1] == ["list-windows"]:
+                emit("windows.json")
+            else:
+                sys.exit(1)
+            """
+        ),
+        encoding="utf-8",
+    )
+    script.chmod(0o755)
+    yaml_path = tmp_path / "ws.yaml"
+    yaml_path.write_text("workspaces:\n  C:\n    icon: 💬\n    name: Comms\n", encoding="utf-8")
+    monkeypatch.setenv("AEROSPACE_BIN", str(script))
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_YAML", str(yaml_path))
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("FAKE_AEROSPACE_DELAY", raising=False)
+    monkeypatch.delenv("FAKE_AEROSPACE_FAIL", raising=False)
+    monkeypatch.delenv("AEROSPACE_FOCUSED_WORKSPACE", raising=False)
+    for var in ("AEROSPACE_WORKSPACES_BACKEND", "SWAYSOCK", "I3SOCK"):
+        monkeypatch.delenv(var, raising=False)
+    return FakeAerospace(tmp_path, monkeypatch)
+
+
+@pytest.fixture()
+def sock_dir():
+    # AF_UNIX paths are capped at ~104 bytes, which pytest's tmp_path can exceed.
+    path = tempfile.mkdtemp(prefix="aw-")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+# --- fake i3/sway IPC ------------------------------------------------------------------------
+
+I3_HEADER = struct.Struct("=6sII")
+I3_EVENT_BIT = 1 << 31
+
+
+def i3_window(
+    con_id: int, app: str, title: str, *, focused=False, wayland=True, floating=False
+) -> dict:
+    """A window container as sway (`app_id`) or i3 (`window_properties.class`) reports it."""
+    con = {"id": con_id, "type": "con", "name": title, "focused": focused, "nodes": []}
+    if wayland:
+        con.update(app_id=app, pid=1000 + con_id)
+    else:
+        con.update(window=0x400000 + con_id, window_properties={"class": app})
+    if floating:
+        con["_floating"] = True
+    return con
+
+
+def _without(mapping: dict, key: str) -> dict:
+    return {k: v for k, v in mapping.items() if k != key}
+
+
+def i3_tree(outputs: dict[str, dict[str, list[dict]]], *, focused: str | None = None) -> dict:
+    """A GET_TREE reply: {output: {workspace name: [windows]}} plus i3's scratchpad output.
+
+    `focused` names an (empty) workspace that holds focus itself; otherwise focus is wherever a
+    window says `focused=True`. Floating windows are wrapped in a floating_con, as i3 does.
+    """
+    ids = iter(range(1, 1000))
+
+    def workspace(name, windows):
+        tiled = [w for w in windows if not w.get("_floating")]
+        floating = [
+            {"id": next(ids), "type": "floating_con", "nodes": [_without(w, "_floating")]}
+            for w in windows
+            if w.get("_floating")
+        ]
+        return {
+            "id": next(ids),
+            "type": "workspace",
+            "name": name,
+            "focused": name == focused,
+            "nodes": tiled,
+            "floating_nodes": floating,
+        }
+
+    def output(name, workspaces):
+        content = {
+            "id": next(ids),
+            "type": "con",
+            "name": "content",
+            "nodes": [workspace(ws, windows) for ws, windows in workspaces.items()],
+        }
+        return {"id": next(ids), "type": "output", "name": name, "nodes": [content]}
+
+    scratchpad = output("__i3", {"__i3_scratch": [i3_window(999, "Stash", "hidden")]})
+    return {
+        "id": 0,
+        "type": "root",
+        "name": "root",
+        "nodes": [scratchpad] + [output(name, wss) for name, wss in outputs.items()],
+    }
+
+
+class FakeI3:
+    """An i3 IPC server on a Unix socket, answering from `tree` and logging every request.
+
+    Speaks the binary protocol: GET_TREE, GET_WORKSPACES (derived from the tree), SUBSCRIBE and
+    RUN_COMMAND (recorded in `commands`; `workspace "<name>"` also emits a workspace event).
+    `push` sends an event to every subscribed connection, as the real server does.
+    """
+
+    def __init__(self, path: str, tree: dict):
+        self.path = path
+        self.tree = tree
+        self.requests: list[tuple[int, str]] = []
+        self.commands: list[str] = []
+        self.connections = 0
+        self.mute = False  # read requests but never answer them
+        self._clients: list[socket.socket] = []
+        self._subscribed: list[socket.socket] = []
+        self._lock = threading.Lock()
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self) -> None:
+        self._server.close()
+        self.drop_connections()
+
+    def requests_of(self, msg_type: int) -> int:
+        return sum(1 for kind, _ in self.requests if kind == msg_type)
+
+    def push(self, event: int, payload: dict) -> None:
+        with self._lock:
+            for conn in self._subscribed:
+                self._send(conn, I3_EVENT_BIT | event, payload)
+
+    def drop_connections(self) -> None:
+        """Close every client connection, as a restarting window manager would."""
+        with self._lock:
+            for conn in self._clients:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self._clients.clear()
+            self._subscribed.clear()
+
+    @staticmethod
+    def _send(conn: socket.socket, msg_type: int, payload: object) -> None:
+        body = json.dumps(payload).encode()
+        try:
+            conn.sendall(I3_HEADER.pack(b"i3-ipc", len(body), msg_type) + body)
+        except OSError:
+            pass
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            with self._lock:
+                self._clients.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _workspaces(self) -> list[dict]:
+        from aerospace_workspaces import i3ipc
+
+        focused, ids, _ = i3ipc.parse_tree(self.tree)
+        return [{"num": n, "name": ws, "focused": ws == focused} for n, ws in enumerate(ids, 1)]
+
+    def _reply(self, conn: socket.socket, msg_type: int, payload: str) -> object:
+        if msg_type == 4:  # GET_TREE
+            return self.tree
+        if msg_type == 1:  # GET_WORKSPACES
+            return self._workspaces()
+        if msg_type == 2:  # SUBSCRIBE
+            self._subscribed.append(conn)
+            return {"success": True}
+        if msg_type == 0:  # RUN_COMMAND
+            self.commands.append(payload)
+            return [{"success": True}]
+        return {"success": False}
+
+    def _serve(self, conn: socket.socket) -> None:
+        with conn, conn.makefile("rb") as stream:
+            while len(header := stream.read(I3_HEADER.size)) == I3_HEADER.size:
+                _, length, msg_type = I3_HEADER.unpack(header)
+                payload = stream.read(length).decode()
+                self.requests.append((msg_type, payload))
+                if self.mute:
+                    continue
+                with self._lock:
+                    self._send(conn, msg_type, self._reply(conn, msg_type, payload))
+                if msg_type == 0 and payload.startswith("workspace "):
+                    name = json.loads(payload.split(" ", 1)[1])
+                    self.push(0, {"change": "focus", "current": {"name": name}})
+
+
+@pytest.fixture()
+def fake_i3(sock_dir, monkeypatch):
+    """A FakeI3 on $SWAYSOCK (so `backend.current()` picks the i3 backend), closed afterwards.
+
+    Starts with workspaces "1" (focused, empty) and "2" on one output; tests swap in their own
+    `tree`. Also points the YAML and cache-dir seams into `sock_dir`.
+    """
+    from aerospace_workspaces import backend
+
+    path = os.path.join(sock_dir, "i3.sock")
+    server = FakeI3(path, i3_tree({"eDP-1": {"1": [], "2": []}}, focused="1"))
+    monkeypatch.setenv("SWAYSOCK", path)
+    monkeypatch.delenv("I3SOCK", raising=False)
+    monkeypatch.delenv("AEROSPACE_WORKSPACES_BACKEND", raising=False)
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_YAML", os.path.join(sock_dir, "ws.yaml"))
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_CACHE_DIR", os.path.join(sock_dir, "cache"))
+    yield server
+    for stale in backend._CURRENT.values():
+        stale.close()
+    backend._CURRENT.clear()
+    server.close()
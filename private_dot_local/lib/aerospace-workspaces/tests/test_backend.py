@@ -0,0 +1,129 @@
+"""Tests for backend selection and the i3/sway backend, against the FakeI3 server (conftest).
+
+The AeroSpace backend is the query planner behind an interface; test_query covers its behavior,
+so here it only has to prove the delegation.
+"""
+
+from __future__ import annotations
+
+import pytest
+from conftest import i3_tree, i3_window
+
+from aerospace_workspaces import backend, hud, i3ipc, swiftbar
+from aerospace_workspaces.workspaces import label, load_workspaces_cached, workspaces_yaml
+
+TIMEOUT = 2.0
+
+# --- selection -----------------------------------------------------------------------------
+
+
+@pytest.fixture()
+def no_backend_env(monkeypatch):
+    for var in ("AEROSPACE_WORKSPACES_BACKEND", "SWAYSOCK", "I3SOCK"):
+        monkeypatch.delenv(var, raising=False)
+    yield
+    backend._CURRENT.clear()
+
+
+def test_defaults_to_aerospace(no_backend_env):
+    assert backend.backend_name() == "aerospace"
+    assert isinstance(backend.current(), backend.AeroSpaceBackend)
+
+
+@pytest.mark.parametrize("var", ["SWAYSOCK", "I3SOCK"])
+def test_ipc_socket_in_env_selects_i3(no_backend_env, monkeypatch, var):
+    monkeypatch.setenv(var, "/run/wm.sock")
+    assert backend.backend_name() == "i3"
+    assert isinstance(backend.current(), backend.I3Backend)
+
+
+def test_explicit_backend_wins(no_backend_env, monkeypatch):
+    monkeypatch.setenv("SWAYSOCK", "/run/wm.sock")
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_BACKEND", "AeroSpace")
+    assert backend.backend_name() == "aerospace"
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_BACKEND", "sway")
+    assert isinstance(backend.current(), backend.I3Backend)
+
+
+def test_unknown_backend_is_a_value_error(no_backend_env, monkeypatch):
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_BACKEND", "yabai")
+    with pytest.raises(ValueError):
+        backend.current()
+
+
+def test_current_is_reused_until_the_selection_changes(no_backend_env, monkeypatch):
+    first = backend.current()
+    assert backend.current() is first
+    monkeypatch.setenv("I3SOCK", "/run/i3.sock")
+    assert backend.current() is not first
+
+
+def test_aerospace_backend_delegates_to_the_query_planner(fake_aerospace):
+    state = backend.AeroSpaceBackend().collect(timeout=TIMEOUT)
+    assert state[:2] == ("C", ["C", "I", "9", "Z"])
+    assert backend.AeroSpaceBackend().focused_workspace() == "C"
+
+
+# --- i3 backend ----------------------------------------------------------------------------
+
+
+def test_collect_is_one_get_tree_over_one_connection(fake_i3):
+    fake_i3.tree = i3_tree({"eDP-1": {"1": [i3_window(11, "foot", "~", focused=True)], "2": []}})
+    for _ in range(3):
+        focused, ids, windows_by_ws = swiftbar.collect(timeout=TIMEOUT)
+    assert (focused, ids) == ("1", ["1", "2"])
+    assert windows_by_ws["1"][0]["app-name"] == "foot"
+    assert fake_i3.requests_of(i3ipc.GET_TREE) == 3
+    assert len(fake_i3.requests) == 3
+    assert fake_i3.connections == 1
+
+
+def test_collect_trusts_a_known_focus(fake_i3):
+    assert swiftbar.collect(timeout=TIMEOUT, focused="2")[0] == "2"
+
+
+def test_workspaces_yaml_labels_apply_unchanged(fake_i3, sock_dir):
+    with open(f"{sock_dir}/ws.yaml", "w", encoding="utf-8") as handle:
+        handle.write("workspaces:\n  1:\n    icon: 💬\n    name: Comms\n")
+    focused, _, _ = swiftbar.collect(timeout=TIMEOUT)
+    records, _ = load_workspaces_cached(workspaces_yaml())
+    assert label(focused, records) == "💬 1: Comms"
+
+
+def test_hud_asks_the_backend_for_focus(fake_i3):
+    assert hud._focused_workspace() == "1"
+    assert fake_i3.requests_of(i3ipc.GET_WORKSPACES) == 1
+
+
+def test_switch_runs_a_workspace_command(fake_i3):
+    backend.current().switch('2: "Mail"')
+    assert fake_i3.commands == ['workspace "2: \\"Mail\\""']
+
+
+def test_wait_event_subscribes_once_and_reports_changes(fake_i3):
+    current = backend.current()
+    assert current.wait_event(0.05) is None
+    fake_i3.push(3, {"change": "new"})
+    assert current.wait_event(1.0) == "window"
+    current.switch("2")
+    assert current.wait_event(1.0) == "workspace"
+    assert fake_i3.requests_of(i3ipc.SUBSCRIBE) == 1
+    assert fake_i3.connections == 1
+
+
+def test_a_dropped_connection_fails_once_then_reconnects(fake_i3):
+    current = backend.current()
+    swiftbar.collect(timeout=TIMEOUT)
+    fake_i3.drop_connections()
+    with pytest.raises(swiftbar.COLLECT_ERRORS):
+        swiftbar.collect(timeout=TIMEOUT)
+    assert swiftbar.collect(timeout=TIMEOUT)[1] == ["1", "2"]
+    assert fake_i3.connections == 2
+    assert backend.current() is current
+
+
+def test_unresponsive_wm_times_out_as_a_collect_error(fake_i3):
+    fake_i3.mute = True
+    with pytest.raises(swiftbar.COLLECT_ERRORS):
+        swiftbar.collect(timeout=0.1)
+    assert backend.current().focused_workspace(timeout=0.1) == ""
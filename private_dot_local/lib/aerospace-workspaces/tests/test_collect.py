@@ -0,0 +1,62 @@
+"""Tests for `swiftbar.collect`: concurrent AeroSpace queries under a shared deadline.
+
+The fake `aerospace` (conftest) sleeps a settable delay per call, so the tests can tell concurrent
+queries (total ≈ one delay) from sequential ones, and can fail a chosen query. How few queries a
+collect needs is covered in test_query.py.
+"""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import time
+
+import pytest
+from conftest import WINDOWS
+
+from aerospace_workspaces import query, swiftbar
+
+
+def test_collect_returns_the_same_shape_as_before(fake_aerospace):
+    focused, ids, windows_by_ws = swiftbar.collect()
+    assert focused == "C"
+    assert ids == ["C", "I", "9", "Z"]
+    assert [w["window-id"] for w in windows_by_ws["C"]] == [242, 55672]
+    assert windows_by_ws["Z"] == [WINDOWS[1]]
+    assert "I" not in windows_by_ws
+
+
+def test_queries_run_concurrently(fake_aerospace):
+    fake_aerospace.set_delay(0.4)
+    started = time.monotonic()
+    swiftbar.collect()
+    # A cold collect lists windows and workspaces at once; back to back would be ≥ 0.8s.
+    assert time.monotonic() - started < 0.7
+
+
+def test_deadline_is_shared_and_kills_stragglers(fake_aerospace):
+    fake_aerospace.set_delay(5)
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        swiftbar.collect(timeout=0.3)
+    assert time.monotonic() - started < 2
+
+
+def test_failed_query_raises(fake_aerospace):
+    fake_aerospace.fail("list-windows")
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        swiftbar.collect()
+    assert excinfo.value.returncode == 3
+
+
+def test_missing_binary_raises_oserror(tmp_path, monkeypatch):
+    monkeypatch.setenv("AEROSPACE_BIN", str(tmp_path / "missing"))
+    with pytest.raises(OSError):
+        swiftbar.collect()
+
+
+def test_run_concurrently_keeps_query_order(fake_aerospace):
+    plain_windows = ["list-windows", "--all", "--json"]
+    outputs = query.run_concurrently([plain_windows, query.FOCUSED_QUERY], timeout=5)
+    assert json.loads(outputs[0]) == WINDOWS
+    assert outputs[1] == "C\n"
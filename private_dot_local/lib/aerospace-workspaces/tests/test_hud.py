@@ -1,13 +1,19 @@
-"""Unit tests for the workspace-switch HUD (pure builders + --dry-run path, no real alerts)."""
+"""Unit tests for the workspace-switch HUD (pure builders, --dry-run path, and the transport tiers
+against a stand-in Hammerspoon listener — no real alerts)."""
 
 from __future__ import annotations
 
+import json
+import socket
+import subprocess
 import textwrap
+import threading
+import time
 from urllib.parse import unquote
 
 import pytest
 
-from aerospace_workspaces import hud
+from aerospace_workspaces import client, hud
 
 RECORDS = {
     "V": {"icon": "📹", "name": "Meetings", "hint": 'the "v" is for "video calls"'},
@@ -95,6 +101,7 @@ def yaml_seam(tmp_path, monkeypatch):
         encoding="utf-8",
     )
     monkeypatch.setenv("AEROSPACE_WORKSPACES_YAML", str(path))
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_CACHE_DIR", str(tmp_path / "cache"))
     return path
 
 
@@ -131,3 +138,206 @@ def test_empty_workspace_id_is_noop(capsys, monkeypatch, yaml_seam):
     monkeypatch.setattr(hud, "_focused_workspace", lambda: "")
     hud.main(["--dry-run"])
     assert capsys.readouterr().out == ""
+
+
+# --- transports -----------------------------------------------------------------------------
+
+
+class Listener:
+    """Stand-in for the Hammerspoon listener: reads one POST per connection and answers it there.
+
+    `status=None` never answers (a wedged listener).
+    """
+
+    def __init__(self, port, *, status=200):
+        self.requests = []
+        self.frames = []
+        self._server = socket.create_server(("127.0.0.1", port))
+        self._status = status
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._answer, args=(conn,), daemon=True).start()
+
+    def _answer(self, conn):
+        with conn:
+            stream = conn.makefile("rb")
+            request_line = stream.readline()
+            if not request_line:
+                return  # `_listener_up`'s probe: connects, sends nothing
+            method, path, _ = request_line.split()
+            headers = {}
+            for line in iter(stream.readline, b"\r\n"):
+                name, _, value = line.decode().partition(":")
+                headers[name.lower()] = value.strip()
+            frame = stream.read(int(headers["content-length"]))
+            self.requests.append((method.decode(), path.decode()))
+            self.frames.append(json.loads(frame))
+            if self._status is None:
+                time.sleep(hud.SOCKET_TIMEOUT_SECONDS * 2)
+            else:
+                conn.sendall(f"HTTP/1.1 {self._status} X\r\nContent-Length: 2\r\n\r\nok".encode())
+
+    def close(self):
+        self._server.close()
+
+
+@pytest.fixture()
+def hud_port(monkeypatch):
+    """A free loopback port for the listener, with nothing on it until a test starts one."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_HUD_PORT", str(port))
+    return port
+
+
+@pytest.fixture()
+def spawns(monkeypatch):
+    """Record (instead of running) every subprocess the URL/notification tiers would start."""
+    calls = []
+    monkeypatch.setattr(subprocess, "run", lambda args, **kwargs: calls.append(args))
+    monkeypatch.setattr(hud, "_hammerspoon_running", lambda: True)
+    return calls
+
+
+def test_socket_frame_is_one_json_line():
+    frame = hud.build_socket_frame("📹 Meetings", 'two\nlines "quoted"')
+    assert frame.endswith(b"\n") and frame.count(b"\n") == 1
+    assert json.loads(frame) == {"v": 1, "name": "📹 Meetings", "hint": 'two\nlines "quoted"'}
+
+
+def test_socket_request_is_a_sized_post():
+    request = hud.build_socket_request(b"{}\n")
+    head, body = request.split(b"\r\n\r\n", 1)
+    assert head.startswith(b"POST /workspace HTTP/1.0\r\n")
+    assert b"Content-Length: 3" in head.split(b"\r\n")
+    assert body == b"{}\n"
+
+
+def test_socket_tier_delivers_without_spawning(hud_port, spawns):
+    listener = Listener(hud_port)
+    try:
+        assert hud.dispatch("📹 Meetings", "video calls") == "socket"
+    finally:
+        listener.close()
+    assert listener.requests == [("POST", "/workspace")]
+    assert listener.frames == [{"v": 1, "name": "📹 Meetings", "hint": "video calls"}]
+    assert spawns == []
+
+
+def test_overlapping_calls_each_get_their_own_answer(hud_port):
+    listener = Listener(hud_port)
+    results = []
+    try:
+        callers = [
+            threading.Thread(target=lambda n=n: results.append(hud.send_socket(f"W{n}", "")))
+            for n in range(8)
+        ]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+    finally:
+        listener.close()
+    assert results == [True] * 8
+    assert sorted(frame["name"] for frame in listener.frames) == [f"W{n}" for n in range(8)]
+
+
+def test_no_listener_falls_back_to_url(hud_port, spawns):
+    assert hud.dispatch("📝 Notes", "") == "url"
+    assert spawns == [["open", "-g", "hammerspoon://workspace?name=%F0%9F%93%9D%20Notes"]]
+
+
+def test_refused_frame_falls_back_to_url(hud_port, spawns):
+    listener = Listener(hud_port, status=400)
+    try:
+        assert hud.dispatch("📝 Notes", "") == "url"
+    finally:
+        listener.close()
+    assert len(spawns) == 1
+
+
+def test_unacknowledged_frame_falls_back_to_url(hud_port, spawns):
+    listener = Listener(hud_port, status=None)
+    try:
+        started = time.monotonic()
+        assert hud.dispatch("📝 Notes", "") == "url"
+        assert time.monotonic() - started < hud.SOCKET_TIMEOUT_SECONDS + 0.5
+    finally:
+        listener.close()
+    assert len(spawns) == 1
+
+
+def test_notification_is_the_last_tier(hud_port, spawns, monkeypatch):
+    monkeypatch.setattr(hud, "_hammerspoon_running", lambda: False)
+    assert hud.dispatch("📝 Notes", "") == "notification"
+    assert [args[0] for args in spawns] == ["open", "osascript"]
+
+
+def test_dry_run_previews_the_socket_frame(hud_port, capsys, yaml_seam):
+    listener = Listener(hud_port)
+    try:
+        hud.main(["--dry-run", "N"])
+    finally:
+        listener.close()
+    assert json.loads(capsys.readouterr().out) == {"v": 1, "name": "📝 Notes", "hint": ""}
+    assert listener.frames == []  # previewed, not sent
+
+
+# --- coalescing -----------------------------------------------------------------------------
+
+
+@pytest.fixture()
+def dispatched(monkeypatch, yaml_seam):
+    """Record the display of every alert `hud.main` actually dispatches."""
+    displays = []
+    monkeypatch.setattr(hud, "dispatch", lambda display, hint, **kw: displays.append(display))
+    return displays
+
+
+def test_burst_dispatches_only_the_latest(dispatched, monkeypatch):
+    monkeypatch.setattr(hud, "COALESCE_WINDOW_SECONDS", 0.5)
+    workspace_ids = ["V", "N", "9", "V", "N", "9", "V", "N"]
+    threads = []
+    for workspace_id in workspace_ids:
+        thread = threading.Thread(target=hud.main, args=([workspace_id],))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)  # keypresses in order, well within the window
+    for thread in threads:
+        thread.join(timeout=5)
+    assert dispatched == ["📝 Notes"]
+
+
+def test_spaced_calls_each_dispatch(dispatched):
+    hud.main(["V"])
+    hud.main(["N"])
+    assert dispatched == ["📹 Meetings", "📝 Notes"]
+
+
+def test_superseded_call_spawns_nothing(spawns, monkeypatch, yaml_seam):
+    monkeypatch.setattr(client, "take_ticket", lambda: 1)
+    monkeypatch.setattr(client, "is_latest", lambda ticket: False)
+    hud.main(["V"])
+    assert spawns == []
+
+
+def test_tickets_increase(yaml_seam):
+    first = client.take_ticket()
+    assert client.take_ticket() == first + 1
+    assert client.is_latest(first + 1) and not client.is_latest(first)
+
+
+def test_unusable_sequence_file_never_coalesces(dispatched, monkeypatch, tmp_path):
+    (tmp_path / "file").write_text("", encoding="utf-8")
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_CACHE_DIR", str(tmp_path / "file" / "cache"))
+    assert client.take_ticket() is None
+    hud.main(["V"])
+    assert dispatched == ["📹 Meetings"]
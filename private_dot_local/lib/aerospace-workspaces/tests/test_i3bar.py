@@ -0,0 +1,251 @@
+"""Tests for the i3bar/swaybar status command: block building, protocol parsing, and the
+event-driven loop against the FakeI3 server (conftest), with a pipe standing in for i3bar's
+clicks."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+from conftest import i3_tree, i3_window
+
+from aerospace_workspaces import i3bar, i3ipc, snapshot
+
+RECORDS = {"1": {"icon": "💬", "name": "Comms"}, "2": {"name": "Code"}}
+
+# --- blocks --------------------------------------------------------------------------------
+
+
+def test_blocks_label_every_workspace_and_dim_all_but_the_focused():
+    blocks = i3bar.build_blocks("2", ["1", "2", "3"], RECORDS, ["1", "2"])
+    assert [b["full_text"] for b in blocks] == ["💬 1: Comms", "2: Code", "3"]
+    assert [b["instance"] for b in blocks] == ["1", "2", "3"]
+    assert [b.get("color") for b in blocks] == ["#999999", None, "#999999"]
+
+
+def test_blocks_put_declared_workspaces_first():
+    blocks = i3bar.build_blocks("1", ["7", "2", "1"], RECORDS, ["1", "2"])
+    assert [b["instance"] for b in blocks] == ["1", "2", "7"]
+
+
+def test_blocks_short_text_keeps_only_the_icon():
+    blocks = i3bar.build_blocks("1", ["1", "2"], RECORDS, [])
+    assert [b["short_text"] for b in blocks] == ["💬 1", "2"]
+
+
+def test_only_the_last_block_is_separated():
+    blocks = i3bar.build_blocks("1", ["1", "2", "3"], {}, [])
+    assert [b.get("separator", True) for b in blocks] == [False, False, True]
+    assert i3bar.build_blocks("", [], {}, []) == []
+
+
+# --- protocol parsing ----------------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        ("[", None),
+        ('{"name":"workspace","instance":"2","button":1,"x":10}', "2"),
+        (',{"name":"workspace","instance":"2: Mail","button":1}', "2: Mail"),
+        (',{"name":"workspace","instance":"2","button":3}', None),
+        (',{"name":"tztime","instance":"local","button":1}', None),
+        (",not json", None),
+    ],
+)
+def test_parse_click(line, expected):
+    assert i3bar.parse_click(line) == expected
+
+
+def test_parse_status_line_skips_the_header_and_framing():
+    assert i3bar.parse_status_line('{"version":1}') is None
+    assert i3bar.parse_status_line("[") is None
+    assert i3bar.parse_status_line('[{"full_text":"a"}]') == [{"full_text": "a"}]
+    assert i3bar.parse_status_line(',[{"full_text":"b"}]') == [{"full_text": "b"}]
+
+
+# --- the loop ------------------------------------------------------------------------------
+
+
+class Output:
+    """A text sink the bar writes to, with a way to wait for its status lines."""
+
+    def __init__(self):
+        self.text = ""
+        self._changed = threading.Condition()
+
+    def write(self, text: str) -> None:
+        with self._changed:
+            self.text += text
+            self._changed.notify_all()
+
+    def flush(self) -> None:
+        pass
+
+    def lines(self) -> list[list[dict]]:
+        """The status lines written so far, decoded (header and "[" skipped)."""
+        return [
+            blocks
+            for blocks in map(i3bar.parse_status_line, self.text.splitlines()[1:])
+            if blocks is not None
+        ]
+
+    def wait_for(self, count: int, timeout: float = 2.0) -> list[list[dict]]:
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.lines()) >= count, timeout)
+        return self.lines()
+
+
+class Running:
+    """`i3bar.bar` on a thread, with the write end of its click pipe."""
+
+    def __init__(self, **kwargs):
+        self.out = Output()
+        read_fd, self.clicks_fd = os.pipe()
+        self._clicks = os.fdopen(read_fd, "rb")
+        self.thread = threading.Thread(
+            target=i3bar.bar, args=(self.out, self._clicks), kwargs=kwargs, daemon=True
+        )
+        self.thread.start()
+
+    def click(self, event: dict, *, first: bool = False) -> None:
+        os.write(self.clicks_fd, (("[\n" if first else ",") + json.dumps(event) + "\n").encode())
+
+    def stop(self) -> None:
+        os.close(self.clicks_fd)  # i3bar going away closes our stdin
+        self.thread.join(2.0)
+        self._clicks.close()
+
+
+def until(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def started(bar: Running, fake_i3) -> None:
+    """Wait for the first line and for the bar to subscribe (so no pushed event is missed)."""
+    bar.out.wait_for(1)
+    until(lambda: fake_i3.requests_of(i3ipc.SUBSCRIBE) >= 1)
+
+
+def focus_tree(focused_window: int) -> dict:
+    return i3_tree(
+        {
+            "eDP-1": {
+                "1": [i3_window(11, "foot", "~", focused=focused_window == 11)],
+                "2": [i3_window(12, "firefox", "Docs", focused=focused_window == 12)],
+            }
+        }
+    )
+
+
+def test_bar_writes_the_header_then_one_line(fake_i3):
+    fake_i3.tree = focus_tree(11)
+    bar = Running()
+    try:
+        lines = bar.out.wait_for(1)
+        assert json.loads(bar.out.text.splitlines()[0]) == {"version": 1, "click_events": True}
+        assert bar.out.text.splitlines()[1] == "["
+        assert [b["instance"] for b in lines[0]] == ["1", "2"]
+        assert "color" not in lines[0][0]
+        # The bar is the collector the shared snapshot comes from.
+        assert snapshot.read().state[:2] == ("1", ["1", "2"])
+    finally:
+        bar.stop()
+    assert not bar.thread.is_alive()
+
+
+def test_workspace_event_redraws_and_window_event_does_not(fake_i3):
+    fake_i3.tree = focus_tree(11)
+    bar = Running()
+    try:
+        started(bar, fake_i3)
+        fake_i3.push(3, {"change": "title"})
+        time.sleep(0.1)
+        fake_i3.tree = focus_tree(12)
+        fake_i3.push(0, {"change": "focus"})
+        lines = bar.out.wait_for(2)
+        assert len(lines) == 2
+        assert [b.get("color") for b in lines[1]] == ["#999999", None]
+        # One GET_TREE for the first line, one for the workspace event; none for the window one.
+        assert fake_i3.requests_of(i3ipc.GET_TREE) == 2
+    finally:
+        bar.stop()
+
+
+def test_unchanged_blocks_are_not_rewritten(fake_i3):
+    bar = Running()
+    try:
+        started(bar, fake_i3)
+        fake_i3.push(0, {"change": "init"})
+        until(lambda: fake_i3.requests_of(i3ipc.GET_TREE) >= 2)
+        time.sleep(0.05)
+        assert fake_i3.requests_of(i3ipc.GET_TREE) == 2
+        assert len(bar.out.lines()) == 1
+    finally:
+        bar.stop()
+
+
+def test_left_click_switches_workspace(fake_i3):
+    bar = Running()
+    try:
+        bar.out.wait_for(1)
+        bar.click({"name": "workspace", "instance": "2", "button": 1}, first=True)
+        bar.click({"name": "workspace", "instance": "1", "button": 3})
+        until(lambda: fake_i3.commands)
+        assert fake_i3.commands == ['workspace "2"']
+    finally:
+        bar.stop()
+
+
+def test_unreachable_window_manager_shows_a_placeholder(fake_i3, monkeypatch, sock_dir):
+    monkeypatch.setenv("SWAYSOCK", f"{sock_dir}/nobody.sock")
+    bar = Running()
+    try:
+        assert bar.out.wait_for(1)[0] == i3bar.unavailable_blocks()
+    finally:
+        bar.stop()
+
+
+STATUS_COMMAND = textwrap.dedent(
+    """\
+    import sys, time
+    print('{"version":1}')
+    print('[')
+    print('[{"name":"tztime","full_text":"12:00"}]', flush=True)
+    time.sleep(0.1)
+    print(',[{"name":"tztime","full_text":"12:01"}]', flush=True)
+    time.sleep(30)
+    """
+)
+
+
+def test_wrap_appends_the_status_commands_blocks(fake_i3):
+    bar = Running(wrap=[sys.executable, "-c", STATUS_COMMAND])
+    try:
+        lines = bar.out.wait_for(3)
+        assert [b["full_text"] for b in lines[-1]] == ["1", "2", "12:01"]
+        assert [b["full_text"] for b in lines[-2]] == ["1", "2", "12:00"]
+        # Status lines reuse the workspace blocks.
+        assert fake_i3.requests_of(i3ipc.GET_TREE) == 1
+    finally:
+        bar.stop()
+
+
+def test_a_wrapped_command_that_exits_is_reaped(fake_i3):
+    exits = 'import os; print("[", flush=True); print(f\'[{{"full_text":"{os.getpid()}"}}]\')'
+    bar = Running(wrap=[sys.executable, "-c", exits])
+    try:
+        lines = bar.out.wait_for(3)
+        assert [b["full_text"] for b in lines[-1]] == ["1", "2"]
+        pid = int(lines[-2][-1]["full_text"])
+        with pytest.raises(ChildProcessError):  # already waited for, not a zombie
+            os.waitpid(pid, os.WNOHANG)
+    finally:
+        bar.stop()
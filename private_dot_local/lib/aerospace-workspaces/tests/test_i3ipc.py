@@ -0,0 +1,177 @@
+"""Tests for the i3/sway IPC layer: framing, the window tree, and events on a shared connection.
+
+Runs against the FakeI3 server (conftest), which speaks the real binary protocol on a Unix socket.
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+import threading
+
+import pytest
+from conftest import i3_tree, i3_window
+
+from aerospace_workspaces import i3ipc
+
+# --- framing -------------------------------------------------------------------------------
+
+
+def test_encode_frames_magic_length_and_type():
+    frame = i3ipc.encode(i3ipc.RUN_COMMAND, 'workspace "1"')
+    magic, length, msg_type = i3ipc.HEADER.unpack(frame[: i3ipc.HEADER.size])
+    assert (magic, length, msg_type) == (b"i3-ipc", 13, 0)
+    assert frame[i3ipc.HEADER.size :] == b'workspace "1"'
+
+
+def test_command_quote_escapes_quotes_and_backslashes():
+    assert i3ipc.command_quote('1: "Mail" \\ misc') == '"1: \\"Mail\\" \\\\ misc"'
+
+
+def test_socket_path_prefers_swaysock(monkeypatch):
+    monkeypatch.setenv("SWAYSOCK", "/run/sway.sock")
+    monkeypatch.setenv("I3SOCK", "/run/i3.sock")
+    assert i3ipc.socket_path() == "/run/sway.sock"
+    monkeypatch.delenv("SWAYSOCK")
+    assert i3ipc.socket_path() == "/run/i3.sock"
+
+
+def test_bad_magic_is_a_value_error(sock_dir):
+    path = f"{sock_dir}/bad.sock"
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+
+    def answer():
+        conn, _ = server.accept()
+        with conn:
+            conn.recv(64)
+            conn.sendall(b"nope!!" + bytes(8))
+
+    threading.Thread(target=answer, daemon=True).start()
+    connection = i3ipc.Connection(path)
+    try:
+        with pytest.raises(ValueError):
+            connection.request(i3ipc.GET_TREE)
+    finally:
+        connection.close()
+        server.close()
+
+
+# --- parse_tree ----------------------------------------------------------------------------
+
+TREE = i3_tree(
+    {
+        "eDP-1": {
+            "1": [i3_window(11, "firefox", "Docs"), i3_window(12, "foot", "~", focused=True)],
+            "2: Mail": [],
+        },
+        "HDMI-A-1": {
+            "9": [
+                i3_window(13, "Slack", "general", wayland=False),
+                i3_window(14, "pavucontrol", "Volume", floating=True),
+            ]
+        },
+    }
+)
+
+
+def test_parse_tree_lists_workspaces_in_output_order_without_the_scratchpad():
+    focused, ids, _ = i3ipc.parse_tree(TREE)
+    assert ids == ["1", "2: Mail", "9"]
+    assert focused == "1"
+
+
+def test_parse_tree_windows_match_the_aerospace_shape():
+    _, _, windows_by_ws = i3ipc.parse_tree(TREE)
+    assert windows_by_ws == {
+        "1": [
+            {"workspace": "1", "window-id": 11, "app-name": "firefox", "window-title": "Docs"},
+            {"workspace": "1", "window-id": 12, "app-name": "foot", "window-title": "~"},
+        ],
+        "9": [
+            # An X11 client names its app by WM_CLASS; floating windows follow the tiled ones.
+            {"workspace": "9", "window-id": 13, "app-name": "Slack", "window-title": "general"},
+            {
+                "workspace": "9",
+                "window-id": 14,
+                "app-name": "pavucontrol",
+                "window-title": "Volume",
+            },
+        ],
+    }
+
+
+def test_parse_tree_focus_on_an_empty_workspace():
+    tree = i3_tree({"eDP-1": {"1": [i3_window(11, "foot", "~")], "2": []}}, focused="2")
+    assert i3ipc.parse_tree(tree)[0] == "2"
+
+
+# --- connection ----------------------------------------------------------------------------
+
+
+def test_requests_share_one_connection(fake_i3):
+    connection = i3ipc.Connection()
+    try:
+        assert connection.request(i3ipc.GET_TREE) == fake_i3.tree
+        assert [ws["name"] for ws in connection.request(i3ipc.GET_WORKSPACES)] == ["1", "2"]
+    finally:
+        connection.close()
+    assert fake_i3.connections == 1
+
+
+def test_events_arriving_during_a_request_are_queued(fake_i3):
+    connection = i3ipc.Connection()
+    try:
+        connection.subscribe(["workspace", "window"])
+        # The switch's reply and its workspace event race; either order must work.
+        connection.request(i3ipc.RUN_COMMAND, 'workspace "2"')
+        connection.request(i3ipc.GET_TREE)
+        event = connection.next_event(timeout=1.0)
+        assert event is not None
+        assert (event.kind, event.change) == ("workspace", "focus")
+        assert event.payload["current"] == {"name": "2"}
+        assert connection.next_event(timeout=0.05) is None
+    finally:
+        connection.close()
+
+
+def test_window_events_carry_their_kind(fake_i3):
+    connection = i3ipc.Connection()
+    try:
+        connection.subscribe(["window"])
+        fake_i3.push(3, {"change": "title", "container": {"id": 11}})
+        event = connection.next_event(timeout=1.0)
+        assert (event.kind, event.change) == ("window", "title")
+    finally:
+        connection.close()
+
+
+def test_unanswered_request_times_out(fake_i3):
+    fake_i3.mute = True
+    connection = i3ipc.Connection(timeout=0.1)
+    try:
+        with pytest.raises(TimeoutError):
+            connection.request(i3ipc.GET_TREE)
+    finally:
+        connection.close()
+
+
+def test_closed_socket_is_an_os_error(fake_i3):
+    connection = i3ipc.Connection()
+    try:
+        connection.request(i3ipc.GET_TREE)
+        fake_i3.drop_connections()
+        with pytest.raises(OSError):
+            connection.request(i3ipc.GET_TREE)
+    finally:
+        connection.close()
+
+
+def test_subscribe_payload_is_a_json_list(fake_i3):
+    connection = i3ipc.Connection()
+    try:
+        connection.subscribe(["workspace"])
+    finally:
+        connection.close()
+    assert [json.loads(p) for t, p in fake_i3.requests if t == i3ipc.SUBSCRIBE] == [["workspace"]]
@@ -0,0 +1,109 @@
+"""Import-time guard for the aerospace-workspaces entry points.
+
+The HUD runs on every workspace keypress and the SwiftBar plugin on every tick, so their load-time
+imports are latency the user sees. The gate is `FORBIDDEN`: each entry point, imported in a fresh
+interpreter, must not pull in the modules listed for it (PyYAML is for a `workspaces` cache miss,
+`tempfile` for cache writes, `subprocess`/`urllib.parse`/`http.client` for the HUD's slow tiers).
+
+`BUDGET_MS` times the same imports. Wall-clock numbers depend on the machine and its load, so that
+test is opt-in: set IMPORT_BUDGET_TIMING=1 (`mise run test-import-timing`).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3
+
+# Never on any warm load path.
+COLD_PATH = {"yaml", "tempfile", "pathlib"}
+
+FORBIDDEN = {
+    "aerospace_workspaces.client": COLD_PATH | {"subprocess", "urllib.parse"},
+    "aerospace_workspaces.hud": COLD_PATH | {"subprocess", "urllib.parse", "http.client"},
+    # The menu queries `aerospace` every tick, so subprocess is expected here.
+    "aerospace_workspaces.swiftbar": COLD_PATH | {"urllib.parse"},
+    "aerospace_workspaces.stream": COLD_PATH | {"urllib.parse"},
+    "aerospace_workspaces.server": COLD_PATH | {"urllib.parse"},
+    # Shares swiftbar's ordering/colors (and so its subprocess import).
+    "aerospace_workspaces.i3bar": COLD_PATH | {"urllib.parse"},
+    # The HUD's focus fallback reads the snapshot, so it stays as light as the HUD.
+    "aerospace_workspaces.snapshot": COLD_PATH | {"subprocess", "urllib.parse"},
+}
+
+# Milliseconds of summed self import time over a bare `python -c pass`, best of `RUNS`: a few
+# times what a laptop measures, so only a real regression trips them.
+BUDGET_MS = {
+    "aerospace_workspaces.client": 35,
+    "aerospace_workspaces.hud": 50,
+    "aerospace_workspaces.swiftbar": 50,
+    "aerospace_workspaces.stream": 50,
+    "aerospace_workspaces.server": 60,
+    "aerospace_workspaces.i3bar": 50,
+    "aerospace_workspaces.snapshot": 15,
+}
+
+# The harness below is shared with cmd-notify's tests/test_import_budget.py; the packages install
+# and test separately, so each carries its own copy.
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)")
+
+
+def import_times(code: str) -> dict[str, int]:
+    """{module: self µs} for every module `python -X importtime -c code` imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PACKAGE_ROOT,
+        env={**os.environ, "PYTHONPATH": PACKAGE_ROOT},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {
+        match[2]: int(match[1])
+        for match in map(_IMPORTTIME_LINE.match, result.stderr.splitlines())
+        if match
+    }
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return set(import_times("pass"))
+
+
+# --- forbidden modules ---------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("module", sorted(FORBIDDEN))
+def test_entry_point_does_not_load_heavy_modules(module):
+    loaded = set(import_times(f"import {module}"))
+    assert not loaded & FORBIDDEN[module], f"{module} loads {sorted(loaded & FORBIDDEN[module])}"
+
+
+def test_hud_url_tier_loads_its_modules_on_use():
+    # Guards the guard: the deferred imports are real and happen where they're used.
+    loaded = set(
+        import_times("from aerospace_workspaces import hud; hud.build_hammerspoon_url('1', '')")
+    )
+    assert "urllib.parse" in loaded
+
+
+# --- time budget ---------------------------------------------------------------------------
+
+
+@pytest.mark.skipif(
+    not os.environ.get("IMPORT_BUDGET_TIMING"), reason="timing is opt-in: IMPORT_BUDGET_TIMING=1"
+)
+@pytest.mark.parametrize("module", sorted(BUDGET_MS))
+def test_entry_point_import_time_within_budget(module, baseline):
+    best = min(
+        sum(us for name, us in import_times(f"import {module}").items() if name not in baseline)
+        for _ in range(RUNS)
+    )
+    assert best / 1000 <= BUDGET_MS[module], f"{module}: {best / 1000:.1f} ms"
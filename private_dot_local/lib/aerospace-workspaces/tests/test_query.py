@@ -0,0 +1,96 @@
+"""Tests for the query planner: how many `aerospace` calls a collect needs, and when it needs more.
+
+The fake `aerospace` (conftest) logs every call, so each test asserts the exact queries made.
+"""
+
+from __future__ import annotations
+
+import time
+
+from conftest import WINDOWS
+
+from aerospace_workspaces import query
+
+TIMEOUT = 5.0
+
+
+def _subcommands(fake) -> list[str]:
+    return [call.split(" ", 1)[0] for call in fake.calls()]
+
+
+def _warm(fake) -> int:
+    """Collect once (filling the ids cache) and return the call count so far."""
+    query.collect(timeout=TIMEOUT)
+    return len(fake.calls())
+
+
+def test_cold_collect_lists_windows_and_workspaces_together(fake_aerospace):
+    assert query.collect(timeout=TIMEOUT)[:2] == ("C", ["C", "I", "9", "Z"])
+    assert sorted(_subcommands(fake_aerospace)) == ["list-windows", "list-workspaces"]
+
+
+def test_warm_collect_is_one_query(fake_aerospace):
+    calls = _warm(fake_aerospace)
+    focused, ids, windows_by_ws = query.collect(timeout=TIMEOUT)
+    assert _subcommands(fake_aerospace)[calls:] == ["list-windows"]
+    assert (focused, ids) == ("C", ["C", "I", "9", "Z"])
+    # The focus flag is consumed, not passed on to render.
+    assert windows_by_ws["C"] == [WINDOWS[0], WINDOWS[2]]
+
+
+def test_focus_on_an_empty_workspace_asks_the_workspace_list(fake_aerospace):
+    calls = _warm(fake_aerospace)
+    fake_aerospace.set_focused("I")
+    assert query.collect(timeout=TIMEOUT)[0] == "I"
+    assert _subcommands(fake_aerospace)[calls:] == ["list-windows", "list-workspaces"]
+
+
+def test_focus_hint_spares_the_workspace_list(fake_aerospace, monkeypatch):
+    calls = _warm(fake_aerospace)
+    fake_aerospace.set_focused("I")
+    assert query.collect(timeout=TIMEOUT, focused="I")[0] == "I"
+    monkeypatch.setenv(query.FOCUSED_ENV, "I")
+    assert query.collect(timeout=TIMEOUT)[0] == "I"
+    assert _subcommands(fake_aerospace)[calls:] == ["list-windows", "list-windows"]
+
+
+def test_unknown_workspace_relists(fake_aerospace):
+    calls = _warm(fake_aerospace)
+    fake_aerospace.set_workspaces(["C", "I", "9", "Z", "N"])
+    fake_aerospace.set_windows([*WINDOWS, {**WINDOWS[0], "workspace": "N", "window-id": 7}])
+    _, ids, windows_by_ws = query.collect(timeout=TIMEOUT)
+    assert ids == ["C", "I", "9", "Z", "N"]
+    assert [w["window-id"] for w in windows_by_ws["N"]] == [7]
+    assert _subcommands(fake_aerospace)[calls:] == ["list-windows", "list-workspaces"]
+    # ...and the refreshed list is cached again.
+    query.collect(timeout=TIMEOUT)
+    assert _subcommands(fake_aerospace)[calls + 2 :] == ["list-windows"]
+
+
+def test_ids_cache_expires(fake_aerospace, monkeypatch):
+    calls = _warm(fake_aerospace)
+    assert query.load_ids() == ["C", "I", "9", "Z"]
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + query.IDS_MAX_AGE_SECONDS + 1)
+    query.collect(timeout=TIMEOUT)
+    assert sorted(_subcommands(fake_aerospace)[calls:]) == ["list-windows", "list-workspaces"]
+
+
+def test_corrupt_ids_cache_is_ignored(fake_aerospace, tmp_path):
+    (tmp_path / "cache").mkdir()
+    (tmp_path / "cache" / query.IDS_NAME).write_bytes(b"\x00garbage")
+    assert query.load_ids() is None
+    assert query.collect(timeout=TIMEOUT)[1] == ["C", "I", "9", "Z"]
+
+
+def test_focused_workspace_prefers_the_hook_environment(fake_aerospace, monkeypatch):
+    assert query.focused_workspace() == "C"
+    assert _subcommands(fake_aerospace) == ["list-workspaces"]
+    monkeypatch.setenv(query.FOCUSED_ENV, "Z")
+    assert query.focused_workspace() == "Z"
+    assert len(fake_aerospace.calls()) == 1
+
+
+def test_focused_workspace_is_empty_on_failure(fake_aerospace):
+    fake_aerospace.fail("list-workspaces")
+    assert query.focused_workspace() == ""
@@ -0,0 +1,202 @@
+"""Tests for the aerospace-workspaces server and its client: wire format, round-trips, warm state.
+
+AeroSpace is played by the fake `aerospace` from conftest, which logs every invocation, so the
+tests can check both the rendered output and how often AeroSpace was actually asked. The live
+tests run `server.serve` in a thread on a short-lived socket.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from aerospace_workspaces import client, hud, server, swiftbar
+
+
+@pytest.fixture(autouse=True)
+def _hammerspoon_up(monkeypatch):
+    monkeypatch.setattr(hud, "_hammerspoon_running", lambda: True)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture()
+def running_server(sock_dir):
+    path = os.path.join(sock_dir, "s.sock")
+    thread = threading.Thread(target=server.serve, args=(path,), kwargs={"idle_timeout": 0.5})
+    thread.start()
+    assert _wait_for(lambda: os.path.exists(path))
+    yield path
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+# --- wire format ----------------------------------------------------------------------------
+
+
+def test_request_round_trip():
+    data = client.encode_request("hud", ["--dry-run", "C", "→ "])
+    assert client.decode_request(data) == ("hud", ["--dry-run", "C", "→ "], None)
+    data = client.encode_request("hud", ["C"], ticket=7)
+    assert client.decode_request(data) == ("hud", ["C"], 7)
+
+
+def test_decode_request_rejects_garbage():
+    assert client.decode_request(b"\xff") is None
+    assert client.decode_request(b'{"v": 1, "cmd": "rm", "argv": []}') is None
+    assert client.decode_request(b'{"v": 1, "cmd": "hud", "argv": [1]}') is None
+    assert client.decode_request(b'{"v": 99, "cmd": "hud", "argv": []}') is None
+    assert client.decode_request(b'{"v": 1, "cmd": "hud", "argv": [], "ticket": "7"}') is None
+
+
+def test_reply_round_trip():
+    assert client.decode_reply(client.encode_reply("menu\n")) == "menu\n"
+    assert client.decode_reply(client.encode_reply("")) == ""
+    assert client.decode_reply(client.encode_reply(None)) is None
+
+
+def test_request_without_server_returns_none(sock_dir):
+    assert client.request("swiftbar", [], path=f"{sock_dir}/none.sock") is None
+
+
+# --- live server ----------------------------------------------------------------------------
+
+
+def test_swiftbar_via_server_matches_in_process(fake_aerospace, running_server, capsys):
+    swiftbar.main()
+    expected = capsys.readouterr().out
+    assert client.request("swiftbar", [], path=running_server) == expected
+
+
+def test_hud_via_server_matches_in_process(fake_aerospace, running_server, capsys):
+    hud.main(["--dry-run", "C", "→ "])
+    expected = capsys.readouterr().out
+    assert expected.startswith("hammerspoon://workspace?name=")
+    assert client.request("hud", ["--dry-run", "C", "→ "], path=running_server) == expected
+
+
+def test_stats_reports_render_memo(fake_aerospace, running_server):
+    before = swiftbar.render_stats()
+    client.request("swiftbar", [], path=running_server)
+    client.request("swiftbar", [], path=running_server)  # same snapshot: a memo hit
+    stats = json.loads(client.request("stats", [], path=running_server))
+    assert stats["render"]["hits"] > before["hits"]
+    assert stats["workspace_records"] == 1
+
+
+def test_second_server_exits_while_first_holds_lock(running_server):
+    started = time.monotonic()
+    server.serve(running_server, idle_timeout=30)
+    assert time.monotonic() - started < 1
+
+
+
+def test_server_exits_once_its_package_changes(fake_aerospace, sock_dir, tmp_path, monkeypatch):
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "swiftbar.py").write_text("OLD = 1\n", encoding="utf-8")
+    monkeypatch.setattr(server, "PACKAGE_DIR", str(package))
+    path = os.path.join(sock_dir, "s.sock")
+    # Busy enough never to idle out: only the update can end it.
+    thread = threading.Thread(target=server.serve, args=(path,), kwargs={"idle_timeout": 30})
+    thread.start()
+    assert _wait_for(lambda: os.path.exists(path))
+    assert client.request("stats", [], path=path) is not None
+    assert thread.is_alive()
+
+    (package / "swiftbar.py").write_text("NEW = 2 # updated\n", encoding="utf-8")
+    # The check after the first request may already see the update; else this one is the last.
+    client.request("stats", [], path=path)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert client.request("stats", [], path=path) is None
+
+
+# --- warm state -----------------------------------------------------------------------------
+
+
+def test_snapshot_is_reused_until_a_switch(fake_aerospace):
+    state = server.ServerState()
+    first = state.handle("swiftbar", [])
+    assert state.handle("swiftbar", []) == first
+    assert fake_aerospace.calls_to("list-windows") == 1  # one collect
+
+    state.handle("hud", ["--dry-run", "I"])  # a switch: the next render re-queries
+    state.handle("swiftbar", [])
+    assert fake_aerospace.calls_to("list-windows") == 2
+
+
+def test_snapshot_expires(fake_aerospace, monkeypatch):
+    monkeypatch.setattr(server, "STATE_MAX_AGE_SECONDS", 0.0)
+    state = server.ServerState()
+    state.handle("swiftbar", [])
+    time.sleep(0.01)
+    state.handle("swiftbar", [])
+    assert fake_aerospace.calls_to("list-windows") == 2
+
+
+def test_records_reload_when_yaml_changes(fake_aerospace, tmp_path):
+    state = server.ServerState()
+    assert "Comms" in state.handle("hud", ["--dry-run", "C"])
+    (tmp_path / "ws.yaml").write_text("workspaces:\n  C:\n    name: Chat\n", encoding="utf-8")
+    assert "Chat" in state.handle("hud", ["--dry-run", "C"])
+
+
+def test_unreachable_aerospace_still_draws_a_menu(tmp_path, monkeypatch, running_server):
+    monkeypatch.setenv("AEROSPACE_BIN", str(tmp_path / "missing-aerospace"))
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_CACHE_DIR", str(tmp_path / "cache"))
+    reply = client.request("swiftbar", [], path=running_server)
+    assert reply == swiftbar.render_unavailable() + "\n"
+
+
+def test_failure_replies_not_ok(monkeypatch, running_server):
+    def boom(self, command, argv, ticket=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(server.ServerState, "handle", boom)
+    assert client.request("swiftbar", [], path=running_server) is None
+
+
+# --- shim entry -----------------------------------------------------------------------------
+
+
+def test_run_uses_server(fake_aerospace, running_server, monkeypatch, capsys):
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_SOCKET", running_server)
+    client.run("hud", ["--dry-run", "C"])
+    assert capsys.readouterr().out.startswith("hammerspoon://workspace?name=")
+
+
+def test_queued_hud_requests_coalesce(fake_aerospace, running_server, monkeypatch):
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_SOCKET", running_server)
+    monkeypatch.setattr(hud, "COALESCE_WINDOW_SECONDS", 0.3)
+    dispatched = []
+    monkeypatch.setattr(hud, "dispatch", lambda display, hint, **kw: dispatched.append(display))
+    threads = []
+    for workspace_id in ["I", "9", "Z", "C"]:
+        # Each shim takes its ticket before its request queues behind the others at the server.
+        thread = threading.Thread(target=client.run, args=("hud", [workspace_id]))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert dispatched == ["💬 Comms"]
+
+
+def test_run_falls_back_in_process(fake_aerospace, sock_dir, monkeypatch, capsys):
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_SOCKET", f"{sock_dir}/none.sock")
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_SERVER", "0")
+    client.run("swiftbar", [])
+    assert "Comms" in capsys.readouterr().out
+    assert not os.path.exists(f"{sock_dir}/none.sock")
@@ -0,0 +1,258 @@
+"""Tests for the last-known-good snapshot: storage, fallback on a slow/failed collect, refresh."""
+
+from __future__ import annotations
+
+import fcntl
+import marshal
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+from aerospace_workspaces import hud, snapshot, swiftbar
+from aerospace_workspaces.workspaces import cache_dir, records_version, workspaces_yaml
+
+STATE = ("I", ["C", "I"], {"C": [{"window-id": 1, "app-name": "Firefox", "window-title": "x"}]})
+
+
+@pytest.fixture()
+def spawned(monkeypatch):
+    """Record background refreshes instead of starting them."""
+    calls = []
+    monkeypatch.setattr(snapshot, "spawn_refresh", lambda: calls.append(True))
+    return calls
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+# --- storage --------------------------------------------------------------------------------
+
+
+def test_save_load_round_trip(fake_aerospace):
+    snapshot.save(STATE, taken_at=1234.5)
+    assert snapshot.load() == (STATE, 1234.5)
+
+
+def test_load_without_snapshot_is_none(fake_aerospace):
+    assert snapshot.load() is None
+
+
+def test_load_rejects_garbage_and_other_versions(fake_aerospace):
+    os.makedirs(cache_dir())
+    with open(os.path.join(cache_dir(), snapshot.SNAPSHOT_NAME), "wb") as handle:
+        handle.write(b"not marshal")
+    assert snapshot.load() is None
+
+    with open(os.path.join(cache_dir(), snapshot.SNAPSHOT_NAME), "wb") as handle:
+        handle.write(marshal.dumps((snapshot.SNAPSHOT_VERSION + 1, 1, 1000.0, None, *STATE)))
+    assert snapshot.load() is None
+
+
+def test_each_save_bumps_the_generation(fake_aerospace):
+    assert snapshot.save(STATE, taken_at=1000.0) == 1
+    assert snapshot.save(STATE, taken_at=1001.0) == 2
+    saved = snapshot.read()
+    assert (saved.generation, saved.taken_at, saved.state) == (2, 1001.0, STATE)
+    assert saved.age(now=1031.0) == 30.0
+
+
+def test_a_state_observed_before_the_saved_one_is_dropped(fake_aerospace):
+    snapshot.save(STATE, taken_at=1001.0)
+    # A slow collect that began earlier but finished later doesn't replace the newer state.
+    assert snapshot.save(("C", ["C"], {}), taken_at=1000.0) is None
+    saved = snapshot.read()
+    assert (saved.generation, saved.taken_at, saved.state) == (1, 1001.0, STATE)
+    assert snapshot.save(("C", ["C"], {}), taken_at=1001.0) == 2
+
+
+def test_a_saved_state_from_the_future_does_not_block_saves(fake_aerospace):
+    # The clock stepped back since the last save: its stamp is ahead of every new collect's.
+    snapshot.save(STATE, taken_at=time.time() + 3600)
+    assert snapshot.save(("C", ["C"], {})) == 2
+    assert snapshot.read().state == ("C", ["C"], {})
+
+
+def test_a_collect_is_stamped_with_when_it_began(fake_aerospace, spawned):
+    fake_aerospace.set_delay(0.3)
+    before = time.time()
+    swiftbar.collect_or_last_known(timeout=5.0)
+    assert before <= snapshot.read().taken_at < before + 0.2
+
+
+def test_saves_record_the_workspaces_yaml_revision(fake_aerospace):
+    snapshot.save(STATE)
+    assert snapshot.read().records_version == records_version(workspaces_yaml())
+    with open(workspaces_yaml(), "a", encoding="utf-8") as handle:
+        handle.write("  I:\n    name: Inbox\n")
+    assert snapshot.read().records_version != records_version(workspaces_yaml())
+
+
+def test_concurrent_writers_never_reuse_a_generation_or_tear_a_read(fake_aerospace):
+    snapshot.save(STATE)
+    generations, torn = [], []
+
+    def write():
+        generations.extend(snapshot.save(STATE) for _ in range(25))
+
+    def watch():
+        while len(generations) < 100:
+            if snapshot.read() is None:
+                torn.append(True)
+
+    threads = [threading.Thread(target=write) for _ in range(4)] + [threading.Thread(target=watch)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10.0)
+    assert sorted(generations) == list(range(2, 102))
+    assert not torn
+
+
+# --- fallback -------------------------------------------------------------------------------
+
+
+def test_fresh_collect_is_saved(fake_aerospace, spawned):
+    state, stale_since = swiftbar.collect_or_last_known()
+    assert stale_since is None
+    assert snapshot.load()[0] == state
+    assert not spawned
+
+
+def test_failure_falls_back_to_snapshot_and_refreshes(fake_aerospace, spawned):
+    snapshot.save(STATE, taken_at=1000.0)
+    fake_aerospace.fail("list-windows")
+    assert swiftbar.collect_or_last_known() == (STATE, 1000.0)
+    assert spawned == [True]
+
+
+def test_slow_aerospace_falls_back_within_the_deadline(fake_aerospace, spawned):
+    snapshot.save(STATE, taken_at=1000.0)
+    fake_aerospace.set_delay(5)
+    started = time.monotonic()
+    assert swiftbar.collect_or_last_known(timeout=0.3) == (STATE, 1000.0)
+    assert time.monotonic() - started < 1.5
+
+
+def test_failure_without_snapshot(fake_aerospace, spawned):
+    fake_aerospace.fail("list-workspaces")
+    assert swiftbar.collect_or_last_known() == (None, None)
+    assert spawned == [True]
+
+
+def test_main_never_prints_nothing(fake_aerospace, spawned, capsys):
+    fake_aerospace.fail("list-workspaces")
+    swiftbar.main()
+    assert capsys.readouterr().out == swiftbar.render_unavailable() + "\n"
+
+    snapshot.save(STATE)
+    swiftbar.main()
+    out = capsys.readouterr().out
+    assert out.startswith("I | color=")
+    assert "AeroSpace didn't answer" in out
+
+
+def test_stale_render_marks_title_and_notes_age():
+    taken_at = time.mktime((2026, 1, 2, 9, 5, 7, 0, 0, -1))
+    menu = swiftbar.render(*STATE, {}, [], stale_since=taken_at).splitlines()
+    assert menu[0] == f"I | color={swiftbar.DIM_COLOR}"
+    assert menu[1] == "---"
+    assert menu[2].startswith("AeroSpace didn't answer — showing state from 09:05:07")
+    # The rest of the menu is unchanged.
+    assert menu[3:] == swiftbar.render(*STATE, {}, []).splitlines()[2:]
+
+
+# --- refresh --------------------------------------------------------------------------------
+
+
+def test_refresh_saves_a_fresh_snapshot(fake_aerospace):
+    snapshot.save(STATE)
+    assert snapshot.refresh()
+    assert snapshot.load()[0][0] == "C"
+
+
+def test_refresh_failure_keeps_the_old_snapshot(fake_aerospace):
+    snapshot.save(STATE, taken_at=1000.0)
+    fake_aerospace.fail("list-windows")
+    assert not snapshot.refresh()
+    assert snapshot.load() == (STATE, 1000.0)
+
+
+def test_refresh_is_single_flight(fake_aerospace):
+    os.makedirs(cache_dir(), exist_ok=True)
+    with open(os.path.join(cache_dir(), snapshot.REFRESH_LOCK_NAME), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert not snapshot.refresh()
+    assert fake_aerospace.calls() == []
+
+
+def test_background_refresh_catches_up_after_a_slow_draw(fake_aerospace, capsys):
+    # AeroSpace answers, but slower than the menu will wait: the draw uses the snapshot, and the
+    # detached refresh (with its longer deadline) replaces the snapshot shortly after.
+    snapshot.save(STATE, taken_at=1000.0)
+    fake_aerospace.set_delay(1.5)
+    started = time.monotonic()
+    swiftbar.main()
+    assert time.monotonic() - started < swiftbar.MENU_DEADLINE_SECONDS + 0.4
+    assert capsys.readouterr().out.startswith("I | color=")
+    assert _wait_for(lambda: snapshot.load()[1] != 1000.0)
+    assert snapshot.load()[0][0] == "C"
+
+
+# --- shared readers -------------------------------------------------------------------------
+
+
+def _segment() -> str:
+    with open(os.path.join(cache_dir(), snapshot.SEGMENT_NAME), encoding="utf-8") as handle:
+        return handle.read()
+
+
+def test_save_writes_a_shell_readable_segment_matching_the_snapshot(fake_aerospace):
+    snapshot.save(("I", ["C", "I"], {}), taken_at=1000.5)
+    snapshot.save(("C", ["C", "I"], {}), taken_at=1002.25)
+    saved = snapshot.read()
+    assert _segment() == f"{saved.generation} {int(saved.taken_at)} 💬 C: Comms\n"
+    assert _segment() == "2 1002 💬 C: Comms\n"
+
+    # A dropped (older) state leaves both files as they were.
+    assert snapshot.save(("I", ["C", "I"], {}), taken_at=1001.0) is None
+    assert _segment() == "2 1002 💬 C: Comms\n"
+
+
+def test_segment_reads_with_the_shell_alone(fake_aerospace):
+    snapshot.save(("C", ["C"], {}))
+    result = subprocess.run(
+        ["/bin/sh", "-c", 'read -r generation taken_at label < "$1" && echo "$label"', "sh"]
+        + [os.path.join(cache_dir(), snapshot.SEGMENT_NAME)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout == "💬 C: Comms\n"
+
+
+def test_segment_label_is_empty_without_focus(fake_aerospace):
+    snapshot.save(("", ["C"], {}), taken_at=1000.0)
+    assert _segment() == "1 1000 \n"
+
+
+def test_hud_focus_falls_back_to_a_recent_snapshot(fake_aerospace):
+    fake_aerospace.fail("list-workspaces")
+    assert hud._focused_workspace() == ""
+    snapshot.save(STATE, taken_at=time.time() - hud.FOCUS_SNAPSHOT_MAX_AGE_SECONDS - 1)
+    assert hud._focused_workspace() == ""
+    snapshot.save(STATE)
+    assert hud._focused_workspace() == "I"
+
+
+def test_hud_focus_asks_the_window_manager_first(fake_aerospace):
+    snapshot.save(STATE)
+    assert hud._focused_workspace() == "C"
@@ -0,0 +1,151 @@
+"""Tests for the streamable SwiftBar mode: `~~~` framing, wake-on-poke, change-only output."""
+
+from __future__ import annotations
+
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from aerospace_workspaces import snapshot, stream, swiftbar
+
+
+class _Out(io.StringIO):
+    """A stdout stand-in the test thread can watch while `stream` writes to it."""
+
+    def frames(self) -> list[str]:
+        return [f for f in self.getvalue().split(f"{stream.SEPARATOR}\n") if f]
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture()
+def no_refresh(monkeypatch):
+    monkeypatch.setattr(snapshot, "spawn_refresh", lambda: None)
+
+
+def _start(out, path, **kwargs):
+    thread = threading.Thread(target=stream.stream, args=(out,), kwargs={"path": path, **kwargs})
+    thread.start()
+    return thread
+
+
+def test_poke_without_listener(sock_dir):
+    assert not stream.poke(f"{sock_dir}/none.sock")
+
+
+def test_first_frame_is_the_current_menu(fake_aerospace, sock_dir):
+    out = _Out()
+    stream.stream(out, path=f"{sock_dir}/w.sock", max_frames=1)
+    assert out.getvalue() == f"~~~\n{stream.render_menu()[0]}\n"
+    assert not os.path.exists(f"{sock_dir}/w.sock")  # cleaned up on exit
+
+
+def test_poke_redraws_changed_menu(fake_aerospace, sock_dir):
+    out, path = _Out(), f"{sock_dir}/w.sock"
+    thread = _start(out, path, poll_interval=30, max_frames=2)
+    assert _wait_for(lambda: len(out.frames()) == 1)
+
+    fake_aerospace.set_focused("Z")
+    assert stream.poke(path)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert out.frames()[1].startswith("Z\n---\n")
+
+
+def test_unchanged_menu_is_not_resent(fake_aerospace, sock_dir):
+    out, path = _Out(), f"{sock_dir}/w.sock"
+    thread = _start(out, path, poll_interval=30, max_frames=2)
+    assert _wait_for(lambda: len(out.frames()) == 1)
+    for _ in range(3):
+        stream.poke(path)
+        time.sleep(0.2)
+    assert len(out.frames()) == 1
+    assert fake_aerospace.calls_to("list-windows") > 1  # it re-collected; nothing new to send
+
+    fake_aerospace.set_focused("I")
+    stream.poke(path)
+    thread.join(timeout=5)
+    assert len(out.frames()) == 2
+
+
+def test_burst_of_pokes_coalesces(fake_aerospace, sock_dir, monkeypatch):
+    monkeypatch.setattr(stream, "DEBOUNCE_SECONDS", 0.3)
+    out, path = _Out(), f"{sock_dir}/w.sock"
+    thread = _start(out, path, poll_interval=30, max_frames=2)
+    assert _wait_for(lambda: len(out.frames()) == 1)
+    before = fake_aerospace.calls_to("list-windows")
+
+    fake_aerospace.set_focused("Z")
+    for _ in range(10):
+        stream.poke(path)
+    thread.join(timeout=5)
+    assert fake_aerospace.calls_to("list-windows") - before == 1  # one collect for the burst
+
+
+def test_poke_names_the_focused_workspace(fake_aerospace, sock_dir):
+    out, path = _Out(), f"{sock_dir}/w.sock"
+    thread = _start(out, path, poll_interval=30, max_frames=2)
+    assert _wait_for(lambda: len(out.frames()) == 1)
+    calls = len(fake_aerospace.calls())
+
+    # Z has a window, but the poke is trusted over asking: no focus query, just the windows.
+    stream.poke(path, focused="I")
+    thread.join(timeout=5)
+    assert out.frames()[1].startswith("I\n---\n")
+    assert [c.split()[0] for c in fake_aerospace.calls()[calls:]] == ["list-windows"]
+
+
+def test_polls_when_the_wake_socket_is_unavailable(fake_aerospace, tmp_path):
+    (tmp_path / "file").write_text("", encoding="utf-8")
+    out = _Out()
+    thread = _start(out, str(tmp_path / "file" / "w.sock"), poll_interval=0.1, max_frames=2)
+    assert _wait_for(lambda: len(out.frames()) == 1)
+    fake_aerospace.set_focused("Z")
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert out.frames()[1].startswith("Z\n")
+
+
+def test_stale_menu_retries_sooner(fake_aerospace, sock_dir, monkeypatch, no_refresh):
+    monkeypatch.setattr(stream, "STALE_RETRY_SECONDS", 0.1)
+    fake_aerospace.fail("list-windows")
+    out = _Out()
+    thread = _start(out, f"{sock_dir}/w.sock", poll_interval=30, max_frames=2)
+    assert _wait_for(lambda: len(out.frames()) == 1)
+    assert out.frames()[0] == swiftbar.render_unavailable() + "\n"
+
+    fake_aerospace.fail("")
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert out.frames()[1].startswith("💬 C: Comms\n")
+
+
+def test_exits_when_swiftbar_stops_reading(fake_aerospace, sock_dir):
+    class Closed(io.StringIO):
+        def write(self, text):
+            raise BrokenPipeError
+
+    stream.stream(Closed(), path=f"{sock_dir}/w.sock")
+    assert not os.path.exists(f"{sock_dir}/w.sock")
+
+
+def test_refresh_wakes_the_stream(fake_aerospace, sock_dir, monkeypatch):
+    path = f"{sock_dir}/w.sock"
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_WAKE_SOCKET", path)
+    out = _Out()
+    thread = _start(out, path, poll_interval=30, max_frames=2)
+    assert _wait_for(lambda: len(out.frames()) == 1)
+    fake_aerospace.set_focused("I")
+    assert snapshot.refresh()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
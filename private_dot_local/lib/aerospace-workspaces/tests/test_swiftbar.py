@@ -2,7 +2,14 @@
 
 from __future__ import annotations
 
-from aerospace_workspaces.swiftbar import ordered_ids, render, truncate
+from aerospace_workspaces import swiftbar
+from aerospace_workspaces.swiftbar import (
+    RenderCache,
+    ordered_ids,
+    render,
+    render_stats,
+    truncate,
+)
 
 # Records used across the render tests (mirrors the former bats fixture).
 RECORDS = {
@@ -141,3 +148,161 @@ def test_empty_workspace_placeholder():
 def test_pipe_in_window_title_neutralized():
     out = render_default()
     assert "Box ¦ Login" in out and "Box | Login" not in out
+
+
+# --- large workspaces -----------------------------------------------------------------------
+
+
+def _windows(apps, per_app):
+    """Interleaved windows, `per_app` of each app, with sequential window ids."""
+    return [
+        {"window-id": n * len(apps) + i, "app-name": app, "window-title": f"{app} | tab {n}"}
+        for n in range(per_app)
+        for i, app in enumerate(apps)
+    ]
+
+
+def _submenu(out):
+    return [line for line in out.splitlines() if line.startswith("--") and line != "---"]
+
+
+def test_small_workspace_stays_flat_at_the_limit():
+    windows = _windows(["Firefox"], 3)
+    out = render("C", ["C"], {"C": windows}, {}, [], window_limit=3, cache=None)
+    assert [line.split(" | ")[0] for line in _submenu(out)] == [
+        "-- Firefox — Firefox ¦ tab 0",
+        "-- Firefox — Firefox ¦ tab 1",
+        "-- Firefox — Firefox ¦ tab 2",
+    ]
+
+
+def test_large_workspace_groups_by_app_busiest_first():
+    windows = _windows(["Slack", "Firefox"], 2) + _windows(["Firefox"], 2) + _windows(["Mail"], 1)
+    out = render("C", ["C"], {"C": windows}, {}, [], window_limit=3, cache=None)
+    assert [line.split(" | ")[0] for line in _submenu(out)] == [
+        "-- Firefox (4)",
+        "---- Firefox ¦ tab 0",
+        "---- +3 more",
+        "-- Slack (2)",
+        "---- Slack ¦ tab 0",
+        "---- +1 more",
+        "-- Mail — Mail ¦ tab 0",
+    ]
+    assert "---- Firefox ¦ tab 0 | bash=" in out and "param2=1 " in out
+
+
+def test_window_budget_goes_round_robin_across_apps():
+    windows = _windows(["Firefox"], 10) + _windows(["Slack"], 2)
+    out = render("C", ["C"], {"C": windows}, {}, [], window_limit=6, cache=None)
+    lines = [line.split(" | ")[0] for line in _submenu(out)]
+    # Slack's two windows fit; Firefox takes the rest of the budget of 6.
+    assert lines.count("---- Slack ¦ tab 0") + lines.count("---- Slack ¦ tab 1") == 2
+    assert sum(line.startswith("---- Firefox ¦") for line in lines) == 4
+    assert "---- +6 more" in lines
+
+
+def test_apps_beyond_the_limit_collapse_into_overflow():
+    apps = [f"App{i}" for i in range(6)]
+    windows = _windows(apps[:2], 3) + _windows(apps[2:], 1)
+    out = render("C", ["C"], {"C": windows}, {}, [], window_limit=2, cache=None)
+    lines = [line.split(" | ")[0] for line in _submenu(out)]
+    assert lines[:3] == ["-- App0 (3)", "---- App0 ¦ tab 0", "---- +2 more"]
+    assert "-- App1 (3)" in lines
+    overflow = lines.index("-- +4 more")
+    assert lines[overflow + 1 :] == ["---- App2 (1)", "---- App3 (1)", "---- +2 more apps"]
+    # Overflow entries focus the app's first window.
+    assert "---- App2 (1) | bash=" in out
+
+
+def test_grouped_menu_size_is_bounded():
+    windows = _windows([f"App{i}" for i in range(200)], 50)
+    out = render("C", ["C"], {"C": windows}, {}, [], cache=None)
+    limit = swiftbar.WINDOW_LIMIT
+    assert len(_submenu(out)) <= 4 * limit + 2
+
+
+def test_window_limit_none_lists_every_window():
+    windows = _windows(["Firefox"], 100)
+    out = render("C", ["C"], {"C": windows}, {}, [], window_limit=None, cache=None)
+    assert len(_submenu(out)) == 100
+
+
+def test_window_limit_is_part_of_the_memo_key():
+    cache = RenderCache()
+    windows = {"C": _windows(["Firefox"], 5)}
+    flat = render("C", ["C"], windows, {}, [], window_limit=None, cache=cache)
+    grouped = render("C", ["C"], windows, {}, [], window_limit=2, cache=cache)
+    assert flat != grouped
+    assert grouped == render("C", ["C"], windows, {}, [], window_limit=2, cache=None)
+
+
+# --- render memo ----------------------------------------------------------------------------
+
+LIVE = ["I", "9", "C", "Z"]
+
+
+def _memo_render(cache, focused="C", windows=WINDOWS, records=RECORDS, **kwargs):
+    return render(focused, LIVE, windows, records, DECLARED, cache=cache, **kwargs)
+
+
+def _uncached(focused="C", windows=WINDOWS, records=RECORDS, **kwargs):
+    return render(focused, LIVE, windows, records, DECLARED, cache=None, **kwargs)
+
+
+def test_memo_output_matches_uncached_render():
+    cache = RenderCache()
+    for focused in ("C", "Z", "C", "9"):
+        assert _memo_render(cache, focused) == _uncached(focused)
+    assert _memo_render(cache, stale_since=0.0) == _uncached(stale_since=0.0)
+
+
+def test_unchanged_inputs_reuse_output():
+    cache = RenderCache()
+    first = _memo_render(cache)
+    # Equal but freshly built inputs, as a new collect would produce.
+    copy = {ws: [dict(w) for w in wins] for ws, wins in WINDOWS.items()}
+    assert _memo_render(cache, windows=copy) is first
+    assert cache.stats == {"hits": 1, "misses": 1, "section_hits": 0, "section_misses": 4}
+
+
+def test_focus_change_rebuilds_only_the_two_affected_rows():
+    cache = RenderCache()
+    _memo_render(cache, "C")
+    _memo_render(cache, "Z")
+    assert cache.stats["misses"] == 2
+    assert (cache.stats["section_hits"], cache.stats["section_misses"]) == (2, 4 + 2)
+
+
+def test_window_change_rebuilds_only_its_workspace():
+    cache = RenderCache()
+    _memo_render(cache)
+    windows = dict(WINDOWS, Z=[{"window-id": 264, "app-name": "Slack", "window-title": "random"}])
+    out = _memo_render(cache, windows=windows)
+    assert "-- Slack — random" in out
+    assert out == _uncached(windows=windows)
+    assert (cache.stats["section_hits"], cache.stats["section_misses"]) == (3, 4 + 1)
+
+
+def test_record_change_rebuilds_title_and_section():
+    cache = RenderCache()
+    _memo_render(cache)
+    records = dict(RECORDS, C={"icon": "💬", "name": "Chat"})
+    out = _memo_render(cache, records=records)
+    assert out.splitlines()[0] == "💬 C: Chat"
+    assert out == _uncached(records=records)
+    assert cache.stats["section_misses"] == 4 + 1
+
+
+def test_vanished_workspaces_leave_the_memo():
+    cache = RenderCache()
+    _memo_render(cache)
+    render("C", ["C"], WINDOWS, RECORDS, DECLARED, cache=cache)
+    assert list(cache.sections) == ["C"]
+
+
+def test_render_stats_is_a_copy():
+    cache = RenderCache()
+    _memo_render(cache)
+    stats = render_stats(cache)
+    stats["hits"] = 99
+    assert render_stats(cache)["hits"] == 0
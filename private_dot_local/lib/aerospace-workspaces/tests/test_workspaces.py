@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import os
+import subprocess
+import sys
 import textwrap
 
 import pytest
@@ -10,10 +13,13 @@ from aerospace_workspaces.workspaces import (
     aerospace_bin,
     label,
     load_workspaces,
+    load_workspaces_cached,
     sanitize,
     workspaces_yaml,
 )
 
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 # A nested fixture exercising every field combination:
 #   C: icon + name, no hint.
 #   I: icon + name + hint (hint has quotes -> sanitization when used as a tooltip).
@@ -151,3 +157,88 @@ def test_sanitize_quotes():
 
 def test_sanitize_newlines():
     assert sanitize("a\nb\rc") == "a b c"
+
+
+def test_sanitize_everything_in_one_pass_and_strips():
+    assert sanitize(' |"a\n|\r"b ') == '¦”a ¦ ”b'
+    assert sanitize("plain") == "plain"
+
+
+# --- load_workspaces_cached -----------------------------------------------------------------
+
+
+@pytest.fixture()
+def cache_seam(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setenv("AEROSPACE_WORKSPACES_CACHE_DIR", str(path))
+    return path
+
+
+def test_cached_matches_uncached(nested_file, cache_seam):
+    expected = load_workspaces(nested_file)
+    assert load_workspaces_cached(nested_file) == expected  # miss: parses and writes the cache
+    assert (cache_seam / "workspaces.marshal").is_file()
+    assert load_workspaces_cached(nested_file) == expected  # hit
+
+
+def test_cached_hit_does_not_import_yaml(nested_file, cache_seam):
+    load_workspaces_cached(nested_file)
+    probe = (
+        "import sys; from aerospace_workspaces.workspaces import load_workspaces_cached as load; "
+        f"records, order = load({nested_file!r}); "
+        "print(order, 'yaml' in sys.modules)"
+    )
+    env = dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+    out = subprocess.run(
+        [sys.executable, "-c", probe], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    assert out.strip() == "['C', 'I', '9', 'V'] False"
+
+
+def test_cached_picks_up_edits(tmp_path, cache_seam):
+    path = tmp_path / "ws.yaml"
+    path.write_text("workspaces:\n  C: Comms\n", encoding="utf-8")
+    assert load_workspaces_cached(str(path)) == ({"C": {"name": "Comms"}}, ["C"])
+    path.write_text("workspaces:\n  C: Chat\n  I: IT\n", encoding="utf-8")
+    records, order = load_workspaces_cached(str(path))
+    assert records == {"C": {"name": "Chat"}, "I": {"name": "IT"}} and order == ["C", "I"]
+
+
+def test_cached_picks_up_replaced_file_with_same_mtime_and_size(tmp_path, cache_seam):
+    # A save-by-rename that happens to keep size and mtime is still caught by the inode.
+    path = tmp_path / "ws.yaml"
+    path.write_text("workspaces:\n  C: Comms\n", encoding="utf-8")
+    load_workspaces_cached(str(path))
+    st = os.stat(path)
+    replacement = tmp_path / "ws.yaml.new"
+    replacement.write_text("workspaces:\n  C: Chats\n", encoding="utf-8")
+    os.utime(replacement, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(replacement, path)
+    assert load_workspaces_cached(str(path)) == ({"C": {"name": "Chats"}}, ["C"])
+
+
+def test_cached_old_flat_shape_and_malformed(tmp_path, cache_seam):
+    flat = tmp_path / "flat.yaml"
+    flat.write_text("workspaces:\n  C: Comms\n", encoding="utf-8")
+    assert load_workspaces_cached(str(flat)) == ({"C": {"name": "Comms"}}, ["C"])
+    bad = tmp_path / "bad.yaml"
+    bad.write_text("just a string, not a mapping\n", encoding="utf-8")
+    assert load_workspaces_cached(str(bad)) == ({}, [])
+    assert load_workspaces_cached(str(bad)) == ({}, [])
+
+
+def test_cached_missing_file_writes_nothing(tmp_path, cache_seam):
+    assert load_workspaces_cached(str(tmp_path / "nope.yaml")) == ({}, [])
+    assert not cache_seam.exists()
+
+
+def test_cached_rebuilds_corrupt_cache(nested_file, cache_seam):
+    cache_seam.mkdir()
+    (cache_seam / "workspaces.marshal").write_bytes(b"\x00garbage")
+    assert load_workspaces_cached(nested_file) == load_workspaces(nested_file)
+
+
+def test_load_yaml_syntax_error_returns_empty(tmp_path):
+    path = tmp_path / "ws.yaml"
+    path.write_text("workspaces: [unclosed\n", encoding="utf-8")
+    assert load_workspaces(str(path)) == ({}, [])
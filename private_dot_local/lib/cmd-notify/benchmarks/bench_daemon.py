@@ -0,0 +1,107 @@
+"""Benchmark: per-prompt overhead of the daemon path vs the one-shot path.
+
+Runs the real shim (with this interpreter, so `uv` resolution is excluded from both sides) the way
+a shell hook would, against a fake `notify-send` that sleeps like a notifier on a loaded box, and
+reports how long the hook blocks in each mode. Also times the in-process work alone
+(`client.send_event` vs `notify.main`).
+
+    python benchmarks/bench_daemon.py [--runs N] [--notifier-delay SECONDS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LIB_DIR = Path(__file__).resolve().parent.parent
+SHIM = LIB_DIR.parents[1] / "bin" / "executable_cmd-notify"
+sys.path.insert(0, str(LIB_DIR))
+
+from cmd_notify import client, notify  # noqa: E402
+
+EVENT = ["cargo build --release", "120", "0", "/tmp/work"]
+
+
+def _median_ms(samples: list[float]) -> str:
+    return f"{statistics.median(samples) * 1000:8.2f} ms"
+
+
+def _time_shim(env: dict[str, str], runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, str(SHIM), *EVENT], env=env, check=True)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _time_call(fn, runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--notifier-delay", type=float, default=0.2)
+    opts = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="cn-bench-"))
+    try:
+        bin_dir = work / "bin"
+        bin_dir.mkdir()
+        notifier = bin_dir / "notify-send"
+        notifier.write_text(f"#!/bin/sh\nsleep {opts.notifier_delay}\n", encoding="utf-8")
+        notifier.chmod(0o755)
+        (work / "icons.txt").write_text("", encoding="utf-8")
+        sock = str(work / "d.sock")
+        env = dict(
+            os.environ,
+            PATH=f"{bin_dir}:{os.environ['PATH']}",
+            CMD_NOTIFY_LIB_DIR=str(LIB_DIR),
+            CMD_NOTIFY_PLATFORM="Linux",
+            CMD_NOTIFY_ICONS=str(work / "icons.txt"),
+            XDG_CACHE_HOME=str(work / "cache"),
+            CMD_NOTIFY_SOCKET=sock,
+            CMD_NOTIFY_DAEMON="0",
+        )
+        os.environ.update(env)
+
+        one_shot = _time_shim(env, opts.runs)
+        in_proc_one_shot = _time_call(lambda: notify.main(EVENT), opts.runs)
+
+        daemon = subprocess.Popen(
+            [sys.executable, "-m", "cmd_notify.daemon"], env=dict(env, PYTHONPATH=str(LIB_DIR))
+        )
+        try:
+            deadline = time.monotonic() + 5
+            while not os.path.exists(sock) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            via_daemon = _time_shim(env, opts.runs)
+            in_proc_send = _time_call(lambda: client.send_event(EVENT, None), opts.runs)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+        print(f"notifier delay {opts.notifier_delay:.3f}s, {opts.runs} runs, median:")
+        print(f"  hook (shim process), one-shot : {_median_ms(one_shot)}")
+        print(f"  hook (shim process), daemon   : {_median_ms(via_daemon)}")
+        print(f"  in-process notify.main        : {_median_ms(in_proc_one_shot)}")
+        print(f"  in-process client.send_event  : {_median_ms(in_proc_send)}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""Management of the icon cache directory: size cap, LRU eviction, expiring misses, and stats.
+
+Layout of <cache_dir> (see `icons`): <key>.png cached icons with their <key>.meta validators,
+<key>.miss negative entries, <key>.lock download leases, plus the .url-index and this module's
+.stats counters.
+
+LRU: a served icon has its atime bumped explicitly (`record_hit`) rather than trusting the
+filesystem — noatime/relatime mounts and APFS don't update it on reads — and eviction removes the
+least recently used PNGs until the total is under the cap ($CMD_NOTIFY_ICON_CACHE_MAX_BYTES,
+default `DEFAULT_MAX_BYTES`). The cap is enforced after every successful download and by
+`cmd-notify icons gc`.
+
+Cached icons are revalidated once they're older than the max-age
+($CMD_NOTIFY_ICON_MAX_AGE_SECONDS, default `DEFAULT_MAX_AGE_SECONDS`; see `icons.freshness`).
+
+Negative entries expire: a .miss file holds its key's consecutive failure count and stays in
+force for `miss_ttl(count)` seconds after its mtime (the last failure) — an hour, doubling per
+failure, capped at a week — so one transient network error no longer disables an icon forever.
+An empty .miss (written by older versions) counts as one failure.
+
+Stats are a small JSON object of counters, updated under an flock so concurrent shells and the
+daemon don't lose increments. Hits, the common case, are batched in memory (`record_hit`), so a
+served icon doesn't rewrite .stats every time. Everything here is best-effort: I/O errors are
+swallowed.
+"""
+
+from __future__ import annotations
+
+import atexit
+import fcntl
+import json
+import os
+import time
+from typing import NamedTuple
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+MISS_TTL_BASE_SECONDS = 3600
+MISS_TTL_MAX_SECONDS = 7 * 24 * 3600
+
+# Bump a hit icon's atime at most this often, so a busy key doesn't cost a write per notification.
+# Pending hit counts are written to .stats along with that touch (see `record_hit`).
+TOUCH_GRANULARITY_SECONDS = 60
+
+# Temp files (from atomic writes here and in `icons`) older than this were abandoned by a killed
+# process.
+STALE_TEMP_SECONDS = 3600
+TEMP_PREFIXES = (".fetch.", ".tmp.", ".url-index.")
+
+STATS_NAME = ".stats"
+STAT_KEYS = ("hits", "misses", "fetched", "revalidated", "failed", "evictions", "evicted_bytes")
+
+# Hits this process has counted but not yet added to .stats, per cache dir.
+_PENDING_HITS: dict[str, int] = {}
+
+
+class Usage(NamedTuple):
+    """What's in the cache right now."""
+
+    icons: int
+    icon_bytes: int
+    misses: int
+    expired_misses: int
+
+
+class GcResult(NamedTuple):
+    evicted: int
+    evicted_bytes: int
+    expired_misses: int
+    stale_temps: int
+    remaining_bytes: int
+
+
+def max_bytes() -> int:
+    """The byte cap for cached icons: $CMD_NOTIFY_ICON_CACHE_MAX_BYTES, else the default."""
+    raw = os.environ.get("CMD_NOTIFY_ICON_CACHE_MAX_BYTES", "")
+    return int(raw) if raw.isdigit() else DEFAULT_MAX_BYTES
+
+
+def max_age_seconds() -> int:
+    """How long a cached icon is served before revalidation: $CMD_NOTIFY_ICON_MAX_AGE_SECONDS."""
+    raw = os.environ.get("CMD_NOTIFY_ICON_MAX_AGE_SECONDS", "")
+    return int(raw) if raw.isdigit() else DEFAULT_MAX_AGE_SECONDS
+
+
+# --- negative entries ---------------------------------------------------------------------
+
+
+def miss_ttl(failures: int) -> float:
+    """How long a .miss with `failures` consecutive failures stays in force."""
+    return min(MISS_TTL_BASE_SECONDS * 2 ** max(failures - 1, 0), MISS_TTL_MAX_SECONDS)
+
+
+def miss_failures(miss_path: str) -> int:
+    """The failure count recorded in a .miss file: 0 if absent, 1 if empty or unreadable."""
+    try:
+        with open(miss_path, encoding="utf-8") as handle:
+            raw = handle.read().strip()
+    except FileNotFoundError:
+        return 0
+    except OSError:
+        return 1
+    return int(raw) if raw.isdigit() and int(raw) > 0 else 1
+
+
+def miss_active(miss_path: str, *, now: float | None = None) -> bool:
+    """True while `miss_path` exists and hasn't outlived its TTL."""
+    try:
+        mtime = os.stat(miss_path).st_mtime
+    except OSError:
+        return False
+    now = time.time() if now is None else now
+    return now - mtime < miss_ttl(miss_failures(miss_path))
+
+
+def record_miss(miss_path: str) -> None:
+    """Record one more failed download for the key (atomic rewrite; the mtime restarts the TTL)."""
+    failures = miss_failures(miss_path) + 1
+    write_atomic(miss_path, f"{failures}\n".encode())
+    bump(os.path.dirname(miss_path), failed=1)
+
+
+def clear_miss(miss_path: str) -> None:
+    try:
+        os.unlink(miss_path)
+    except OSError:
+        pass
+
+
+# --- hits, stats --------------------------------------------------------------------------
+
+
+def record_hit(icon_path: str) -> bool:
+    """Note that the cached icon was served: bump its atime (LRU) and count the hit.
+
+    The hit is counted in memory and reaches .stats with the next throttled atime touch, a
+    `read_stats` in this process, or at exit (`flush_hits`) — so the daemon serving a busy key
+    writes neither the icon nor .stats per notification. Returns False, recording nothing, if the
+    icon is no longer in the cache.
+    """
+    try:
+        st = os.stat(icon_path)
+    except OSError:
+        return False
+    cache_dir = os.path.dirname(icon_path)
+    _PENDING_HITS[cache_dir] = _PENDING_HITS.get(cache_dir, 0) + 1
+    now_ns = time.time_ns()
+    if now_ns - st.st_atime_ns > TOUCH_GRANULARITY_SECONDS * 1_000_000_000:
+        try:
+            os.utime(icon_path, ns=(now_ns, st.st_mtime_ns))
+        except OSError:
+            pass
+        flush_hits(cache_dir)
+    return True
+
+
+def flush_hits(cache_dir: str | None = None) -> None:
+    """Add the pending hit counts (for `cache_dir`, or every dir) to .stats."""
+    for directory in [cache_dir] if cache_dir is not None else list(_PENDING_HITS):
+        hits = _PENDING_HITS.pop(directory, 0)
+        if hits:
+            bump(directory, hits=hits)
+
+
+atexit.register(flush_hits)
+
+
+def bump(cache_dir: str, **deltas: int) -> None:
+    """Add `deltas` to the counters in <cache_dir>/.stats."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(os.path.join(cache_dir, STATS_NAME), "a+", encoding="utf-8") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            handle.seek(0)
+            counters = _parse_stats(handle.read())
+            for key, delta in deltas.items():
+                counters[key] = counters.get(key, 0) + delta
+            handle.seek(0)
+            handle.truncate()
+            handle.write(json.dumps(counters, sort_keys=True))
+    except OSError:
+        pass
+
+
+def read_stats(cache_dir: str) -> dict[str, int]:
+    """The counters (every key in `STAT_KEYS`, zero when never bumped).
+
+    This process's pending hits are flushed first, so they're included.
+    """
+    flush_hits(cache_dir)
+    try:
+        with open(os.path.join(cache_dir, STATS_NAME), encoding="utf-8") as handle:
+            counters = _parse_stats(handle.read())
+    except OSError:
+        counters = {}
+    return {key: counters.get(key, 0) for key in STAT_KEYS}
+
+
+def _parse_stats(raw: str) -> dict[str, int]:
+    try:
+        data = json.loads(raw) if raw else {}
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {key: value for key, value in data.items() if isinstance(value, int)}
+
+
+# --- usage, eviction ----------------------------------------------------------------------
+
+
+def usage(cache_dir: str, *, now: float | None = None) -> Usage:
+    icons, icon_bytes, misses, expired = 0, 0, 0, 0
+    for name, path, st in _entries(cache_dir):
+        if name.endswith(".png"):
+            icons += 1
+            icon_bytes += st.st_size
+        elif name.endswith(".miss"):
+            misses += 1
+            if not miss_active(path, now=now):
+                expired += 1
+    return Usage(icons, icon_bytes, misses, expired)
+
+
+def gc(cache_dir: str, *, limit: int | None = None, now: float | None = None) -> GcResult:
+    """Evict least-recently-used icons down to `limit` bytes and drop expired/stale files.
+
+    `limit` defaults to `max_bytes()`. Expired .miss files, .meta records whose icon is gone, and
+    abandoned temp files are removed too. Lock files are left alone: unlinking one another
+    process holds would let a second download of the same key start.
+    """
+    limit = max_bytes() if limit is None else limit
+    now = time.time() if now is None else now
+    pngs: list[tuple[int, str, int]] = []
+    metas: list[str] = []
+    expired_misses = stale_temps = 0
+    for name, path, st in _entries(cache_dir):
+        if name.endswith(".png"):
+            pngs.append((st.st_atime_ns, path, st.st_size))
+        elif name.endswith(".miss"):
+            if not miss_active(path, now=now) and _unlink(path):
+                expired_misses += 1
+        elif name.endswith(".meta"):
+            metas.append(path)
+        elif name.startswith(TEMP_PREFIXES) and now - st.st_mtime > STALE_TEMP_SECONDS:
+            if _unlink(path):
+                stale_temps += 1
+
+    total = sum(size for _, _, size in pngs)
+    evicted = evicted_bytes = 0
+    for _, path, size in sorted(pngs):
+        if total <= limit:
+            break
+        if _unlink(path):
+            total -= size
+            evicted += 1
+            evicted_bytes += size
+    for path in metas:
+        if not os.path.exists(path[: -len(".meta")] + ".png"):
+            _unlink(path)
+    if evicted:
+        bump(cache_dir, evictions=evicted, evicted_bytes=evicted_bytes)
+    return GcResult(evicted, evicted_bytes, expired_misses, stale_temps, total)
+
+
+def enforce_cap(cache_dir: str) -> None:
+    """Run `gc` only if the cached icons exceed the cap (called after each download)."""
+    limit = max_bytes()
+    total = sum(st.st_size for name, _, st in _entries(cache_dir) if name.endswith(".png"))
+    if total > limit:
+        gc(cache_dir, limit=limit)
+
+
+def _entries(cache_dir: str):
+    """(name, path, stat) for each regular file in the cache dir."""
+    try:
+        scan = os.scandir(cache_dir)
+    except OSError:
+        return
+    with scan:
+        for entry in scan:
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    yield entry.name, entry.path, entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+
+def _unlink(path: str) -> bool:
+    try:
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Replace `path` with `data` via a temp file in the same directory (best-effort)."""
+    import tempfile  # deferred: most lookups never write
+
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix=".tmp.", dir=directory)
+    except OSError:
+        return
+    try:
+        with os.fdopen(tmp_fd, "wb") as out:
+            out.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        _unlink(tmp_path)
+
+
+# --- reports ------------------------------------------------------------------------------
+
+
+def format_stats(cache_dir: str) -> str:
+    """The `cmd-notify icons stats` report."""
+    current = usage(cache_dir)
+    counters = read_stats(cache_dir)
+    lookups = counters["hits"] + counters["misses"]
+    hit_rate = f"{100 * counters['hits'] / lookups:.1f}%" if lookups else "n/a"
+    return "\n".join(
+        [
+            f"size:      {_human(current.icon_bytes)} of {_human(max_bytes())} "
+            f"({current.icons} icons)",
+            f"misses:    {current.misses} negative entries ({current.expired_misses} expired)",
+            f"hit rate:  {hit_rate} ({counters['hits']} hits, {counters['misses']} misses)",
+            f"downloads: {counters['fetched']} fetched, {counters['revalidated']} revalidated, "
+            f"{counters['failed']} failed",
+            f"evictions: {counters['evictions']} ({_human(counters['evicted_bytes'])})",
+        ]
+    )
+
+
+def format_gc(result: GcResult) -> str:
+    """The `cmd-notify icons gc` report."""
+    return (
+        f"evicted {result.evicted} icons ({_human(result.evicted_bytes)}), "
+        f"removed {result.expired_misses} expired misses and {result.stale_temps} stale temp "
+        f"files; {_human(result.remaining_bytes)} left"
+    )
+
+
+def _human(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KiB"
+    return f"{size / (1024 * 1024):.1f} MiB"
@@ -0,0 +1,101 @@
+"""Command-line entry point behind the ~/.local/bin/cmd-notify shim.
+
+Several call shapes share the one executable:
+  cmd-notify [--dry-run] <command_text> <duration_seconds> <exit_code> <cwd>   (shell hooks)
+  cmd-notify daemon                                                            (the service)
+  cmd-notify icons prefetch [--jobs N] [--retry-misses]                        (cache warm-up)
+  cmd-notify icons stats | gc [--max-bytes N]                                  (cache upkeep)
+
+A hook call is handed to a running daemon as one datagram (`client.send_event`) and returns at
+once; when no daemon is listening it runs the one-shot `notify.main` path instead and starts a
+daemon in the background for next time ($CMD_NOTIFY_DAEMON=0 disables the auto-start).
+`--dry-run` always runs in-process so its output lands on this process's stdout.
+
+Only `client` is imported up front; the heavier modules load on the paths that need them.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+from cmd_notify import client
+
+
+def is_subcommand(args: list[str], name: str) -> bool:
+    """Whether `args` invokes subcommand `name` rather than being a hook call.
+
+    A hook call always carries a digits-only duration as its second arg, so a command that
+    happens to be named like a subcommand is still treated as a hook call.
+    """
+    return bool(args) and args[0] == name and not (len(args) > 1 and args[1].isdigit())
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = list(sys.argv[1:] if argv is None else argv)
+
+    if is_subcommand(args, "daemon"):
+        from cmd_notify import daemon
+
+        daemon.serve()
+        return
+
+    if is_subcommand(args, "icons"):
+        icons_main(args[1:])
+        return
+
+    if os.environ.get("CMD_NOTIFY_DISABLE") == "1":
+        return
+
+    if args[:1] != ["--dry-run"] and client.send_event(
+        args, os.environ.get("CMD_NOTIFY_THRESHOLD")
+    ):
+        return
+
+    from cmd_notify import notify
+
+    notify.main(args)
+    if args[:1] != ["--dry-run"] and os.environ.get("CMD_NOTIFY_DAEMON") != "0":
+        client.spawn_daemon()
+
+
+def icons_main(argv: list[str]) -> None:
+    """`cmd-notify icons <action>`: maintenance of the icon cache."""
+    import argparse
+    import time
+
+    from cmd_notify import cache, notify, prefetch
+
+    parser = argparse.ArgumentParser(prog="cmd-notify icons")
+    actions = parser.add_subparsers(dest="action", required=True)
+    prefetch_parser = actions.add_parser(
+        "prefetch", help="download every mapped icon that isn't cached yet"
+    )
+    prefetch_parser.add_argument(
+        "--jobs", type=int, default=prefetch.DEFAULT_JOBS, help="concurrent downloads"
+    )
+    prefetch_parser.add_argument(
+        "--retry-misses", action="store_true", help="retry keys whose earlier fetch failed"
+    )
+    actions.add_parser("stats", help="show cache size, hit rate, and evictions")
+    gc_parser = actions.add_parser(
+        "gc", help="evict least-recently-used icons over the cap; drop expired misses"
+    )
+    gc_parser.add_argument(
+        "--max-bytes", type=int, default=None, help="cap to enforce (default: the configured one)"
+    )
+    opts = parser.parse_args(argv)
+
+    if opts.action == "prefetch":
+        started = time.monotonic()
+        results = prefetch.prefetch(
+            notify.icons_file_path(),
+            notify.icon_cache_dir(),
+            jobs=opts.jobs,
+            retry_misses=opts.retry_misses,
+        )
+        print(prefetch.format_summary(results, time.monotonic() - started))
+    elif opts.action == "stats":
+        print(cache.format_stats(notify.icon_cache_dir()))
+    elif opts.action == "gc":
+        print(cache.format_gc(cache.gc(notify.icon_cache_dir(), limit=opts.max_bytes)))
@@ -0,0 +1,93 @@
+"""Fire-and-forget client for the cmd-notify daemon, plus the datagram format both sides share.
+
+The shim calls `send_event` with the hook's (cmd, duration, exit, cwd) before anything heavier is
+imported: a single non-blocking `sendto` on the daemon's Unix datagram socket. It returns False
+when there's no daemon listening (or the event can't be sent as one datagram), and the caller
+falls back to the one-shot `notify.main` path. This module deliberately imports only stdlib
+socket/json/os so the daemon path stays cheap.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+
+PROTOCOL_VERSION = 1
+
+# macOS caps Unix datagrams at net.local.dgram.maxdgram (2048 bytes by default); anything larger
+# goes through the one-shot path instead of being truncated.
+MAX_DATAGRAM_BYTES = 2048
+
+
+def socket_path() -> str:
+    """The daemon's per-user socket. $CMD_NOTIFY_SOCKET overrides (default in the cache dir)."""
+    return os.environ.get("CMD_NOTIFY_SOCKET") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "cmd-notify",
+        "daemon.sock",
+    )
+
+
+def encode_event(fields: list[str], threshold: str | None) -> bytes | None:
+    """Encode one hook call as a datagram, or None when it doesn't fit in one.
+
+    `fields` is the hook's positional args (cmd, duration, exit, cwd); `threshold` is the caller's
+    raw $CMD_NOTIFY_THRESHOLD, so the daemon gates with the shell's setting rather than its own.
+    """
+    payload = json.dumps(
+        {"v": PROTOCOL_VERSION, "argv": fields[:4], "threshold": threshold},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    if len(payload) > MAX_DATAGRAM_BYTES:
+        return None
+    return payload
+
+
+def decode_event(data: bytes) -> tuple[list[str], str | None] | None:
+    """Decode a datagram into (argv, threshold), or None if it isn't a well-formed event."""
+    try:
+        event = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(event, dict) or event.get("v") != PROTOCOL_VERSION:
+        return None
+    argv = event.get("argv")
+    threshold = event.get("threshold")
+    if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+        return None
+    if threshold is not None and not isinstance(threshold, str):
+        return None
+    return argv, threshold
+
+
+def send_event(fields: list[str], threshold: str | None, *, path: str | None = None) -> bool:
+    """Send one event to the daemon without blocking. True only if the datagram was accepted."""
+    payload = encode_event(fields, threshold)
+    if payload is None:
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.setblocking(False)
+        sock.sendto(payload, path or socket_path())
+        return True
+    except OSError:
+        # No socket file, nobody bound to it, or its queue is full: the caller goes one-shot.
+        return False
+    finally:
+        sock.close()
+
+
+def spawn_daemon() -> None:
+    """Start the daemon in the background, fully detached (best-effort).
+
+    Safe to call when one is already running: the new process sees the lock held and exits.
+    """
+    from cmd_notify import detach
+
+    lib_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    detach.spawn(
+        [sys.executable, "-m", "cmd_notify.daemon"],
+        env=dict(os.environ, PYTHONPATH=lib_dir),
+    )
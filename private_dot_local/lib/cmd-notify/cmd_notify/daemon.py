@@ -0,0 +1,158 @@
+"""Long-lived cmd-notify service: receives hook events on a Unix datagram socket.
+
+Each event is handled exactly like a one-shot `notify.main` call, but with warm state kept across
+events (`WarmState`): the parsed icons.txt map (re-read only when the file changes) and the
+located notifier binaries. Icon paths themselves aren't memoized: each lookup goes through the
+on-disk cache (a couple of stats) so revalidation and URL changes are seen. The shell prompt
+never waits on any of it — the hook's only cost is the client's `sendto`.
+
+One daemon per socket: a lock file next to the socket is held for the daemon's lifetime, so a
+second instance (e.g. two shells auto-starting at once) exits immediately instead of stealing the
+socket. The daemon exits on its own after `IDLE_TIMEOUT_SECONDS` without events, and — since a
+terminal in use never lets it idle that long — as soon as it notices its own package changed on
+disk (`package_stamp`, compared after every event): `chezmoi apply` rewrites the files, and the
+next event after it is the old daemon's last, so the one after that auto-starts the new code.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import shutil
+import socket
+
+from cmd_notify import client, icons, notify
+
+IDLE_TIMEOUT_SECONDS = 3600
+
+# This package's source dir, whose files an update rewrites (see `package_stamp`).
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def package_stamp() -> tuple[tuple[str, int, int], ...]:
+    """(name, mtime_ns, size) of each .py file in `PACKAGE_DIR`: changes when the package does."""
+    files = []
+    try:
+        with os.scandir(PACKAGE_DIR) as entries:
+            for entry in entries:
+                if entry.name.endswith(".py"):
+                    st = entry.stat()
+                    files.append((entry.name, st.st_mtime_ns, st.st_size))
+    except OSError:
+        return ()
+    return tuple(sorted(files))
+
+
+class WarmState:
+    """State the daemon keeps in memory between events."""
+
+    def __init__(self, *, cache_dir: str, icons_file: str) -> None:
+        self.cache_dir = cache_dir
+        self.icons_file = icons_file
+        self._url_map: dict[str, str] = {}
+        self._url_map_key: tuple[int, int] | None = None
+        self._which: dict[str, str | None] = {}
+
+    def url_map(self) -> dict[str, str]:
+        """The icons.txt map, re-parsed only when the file's mtime or size changes."""
+        try:
+            st = os.stat(self.icons_file)
+            key = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            key = None
+        if key != self._url_map_key:
+            self._url_map = icons.read_url_map(self.icons_file)
+            self._url_map_key = key
+        return self._url_map
+
+    def resolve_icon(self, base: str) -> str | None:
+        """Resolve through the on-disk cache with the in-memory icons map."""
+        return icons.resolve(
+            base,
+            cache_dir=self.cache_dir,
+            icons_file=self.icons_file,
+            url_map=self.url_map(),
+            wait=notify.icon_wait_seconds(),
+        )
+
+    def which(self, name: str) -> str | None:
+        """`shutil.which`, memoized (a notifier that's missing now is looked up again)."""
+        path = self._which.get(name)
+        if path is None:
+            path = shutil.which(name)
+            self._which[name] = path
+        return path
+
+    def handle(self, argv: list[str], threshold: str | None) -> None:
+        cmd = argv[0] if len(argv) > 0 else ""
+        duration_raw = argv[1] if len(argv) > 1 else "0"
+        exit_code = argv[2] if len(argv) > 2 else "0"
+        cwd = argv[3] if len(argv) > 3 else "?"
+        notify.handle(
+            cmd,
+            duration_raw,
+            exit_code,
+            cwd,
+            threshold=notify.parse_threshold(threshold),
+            resolve_icon=self.resolve_icon,
+            which=self.which,
+        )
+
+
+def serve(path: str | None = None, *, idle_timeout: float = IDLE_TIMEOUT_SECONDS) -> None:
+    """Bind the socket and handle events until idle for `idle_timeout` seconds, or until the
+    package is updated underneath it.
+
+    Returns immediately if another daemon already holds this socket's lock.
+    """
+    path = path or client.socket_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock = open(f"{path}.lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        # We hold the lock, so any existing socket file is a stale leftover.
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        old_umask = os.umask(0o177)  # owner-only socket
+        try:
+            sock.bind(path)
+        finally:
+            os.umask(old_umask)
+        sock.settimeout(idle_timeout)
+
+        state = WarmState(cache_dir=notify.icon_cache_dir(), icons_file=notify.icons_file_path())
+        stamp = package_stamp()
+        while True:
+            try:
+                data = sock.recv(client.MAX_DATAGRAM_BYTES)
+            except TimeoutError:
+                break
+            event = client.decode_event(data)
+            if event is None:
+                continue
+            try:
+                state.handle(*event)
+            except Exception:
+                # One bad event (or a notifier hiccup) must not take the daemon down.
+                pass
+            if package_stamp() != stamp:
+                break  # updated: make way for an auto-start of the new code
+    finally:
+        sock.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        lock.close()
+
+
+if __name__ == "__main__":
+    serve()
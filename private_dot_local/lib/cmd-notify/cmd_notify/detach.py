@@ -0,0 +1,41 @@
+"""Fire-and-forget process launch, shared by every cmd-notify path that must not block a prompt.
+
+`spawn` double-forks through `/bin/sh`: the intermediate shell starts the real command in the
+background (in a new session, stdio on /dev/null) and exits at once, and we reap it. The command
+is then an orphan owned by init — nothing waits on it, no zombie is left behind in a long-lived
+caller like the daemon, and the shell's job control / terminal signals never reach it.
+
+`pass_fds` are inherited by the command at the same numbers, which is how an icon download lease
+(a held flock) is handed to its worker.
+"""
+
+from __future__ import annotations
+
+import subprocess
+from collections.abc import Mapping, Sequence
+
+# "$@" is the command to detach; `&` backgrounds it and the shell exits immediately.
+_TRAMPOLINE = '"$@" </dev/null >/dev/null 2>&1 &'
+
+
+def spawn(
+    args: list[str],
+    *,
+    env: Mapping[str, str] | None = None,
+    pass_fds: Sequence[int] = (),
+) -> bool:
+    """Launch `args` detached. True if the launcher ran; never raises OSError."""
+    try:
+        subprocess.run(
+            ["/bin/sh", "-c", _TRAMPOLINE, "sh", *args],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            pass_fds=pass_fds,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return True
@@ -1,12 +1,20 @@
-"""Optional per-command icons: cache lookup + lazy fetch.
+"""Optional per-command icons: cache lookup + lazy background fetch.
 
 Icons are keyed by a command's leading token (its basename). A URL map lives in a `key=url` file
-(default ~/.local/share/cmd-notify/icons.txt). The first successful fetch caches the image at
-<cache_dir>/<key>.png; a sibling <key>.miss sentinel prevents retrying a failed download.
+(default ~/.local/share/cmd-notify/icons.txt). The first sighting of a mapped key starts a detached
+download worker and shows no icon (or waits briefly for it, see `resolve`); concurrent sightings
+of the same key share that one download through a per-key lease. A successful fetch caches the
+image at <cache_dir>/<key>.png for every later notification, and a sibling <key>.miss sentinel
+holds off retrying a failed download (with exponential backoff). The directory's size cap, LRU
+eviction, miss expiry, and stats live in `cache`.
 
 This module holds the only network / filesystem-writing I/O in cmd-notify. The fetch uses stdlib
 urllib (no curl dependency), mirroring the old `curl --max-time 5 --fail --location` semantics: a
 5s timeout, redirects followed by default, and any non-2xx / error leaving a .miss sentinel.
+The body is streamed to a temp file in chunks under a byte budget (`MAX_ICON_BYTES`) and an
+overall deadline (`FETCH_DEADLINE_SECONDS`), and is only committed if it's a PNG or JPEG: SVG/ICO
+(which the notifiers won't render), HTML error pages, and runaway responses become a .miss
+instead of a useless cached file.
 
 TLS trust: urllib normally verifies against Python's bundled CA store, which omits
 corporate-MITM roots (e.g. Zscaler) that live in the OS keychain — so fetches would fail on such
@@ -14,17 +22,54 @@ machines where the old curl-based version (which trusts the system store) succee
 `truststore` to back urllib's verification with the OS trust store (macOS Keychain, Linux system
 certs). It's declared as a dep on the shim; if it's somehow unavailable we fall back to default
 verification rather than failing to import.
+
+A cache hit is the common case, so `ssl`/`urllib.request` are imported inside the fetch path and
+`tempfile` inside the writers; looking an icon up loads none of them.
 """
 
 from __future__ import annotations
 
+import fcntl
+import json
+import marshal
 import os
-import ssl
-import tempfile
-import urllib.request
+import sys
+import time
+from collections.abc import Callable, Mapping
+from typing import IO, TYPE_CHECKING, NamedTuple
+
+from cmd_notify import cache, detach
+
+if TYPE_CHECKING:
+    import ssl
 
 FETCH_TIMEOUT_SECONDS = 5
 
+# Whole-download limits, on top of the per-read timeout: a response larger or slower than this is
+# abandoned. (A single blocked read can still overrun the deadline by FETCH_TIMEOUT_SECONDS.)
+MAX_ICON_BYTES = 1024 * 1024
+FETCH_DEADLINE_SECONDS = 15
+_CHUNK_BYTES = 64 * 1024
+
+# How often `await_icon` re-checks an in-flight download.
+_AWAIT_POLL_SECONDS = 0.02
+
+# Raster formats the notifiers render, by leading bytes. Anything else is rejected.
+IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff")
+_SIGNATURE_BYTES = max(len(signature) for signature in IMAGE_SIGNATURES)
+# Declared types rejected before reading any of the body.
+REJECTED_CONTENT_TYPES = frozenset(
+    {"image/svg+xml", "image/x-icon", "image/vnd.microsoft.icon", "text/html"}
+)
+
+# Compiled icons-file index (see `load_url_index`), kept in the icon cache dir.
+URL_INDEX_NAME = ".url-index"
+URL_INDEX_VERSION = 1
+
+
+class IconRejected(Exception):
+    """A download that isn't a usable icon: wrong type, over the byte budget, or too slow."""
+
 
 def _ssl_context() -> ssl.SSLContext:
     """An SSL context that trusts the OS trust store when `truststore` is available.
@@ -32,6 +77,8 @@ def _ssl_context() -> ssl.SSLContext:
     Falls back to the stdlib default context (bundled CAs) if truststore can't be imported, so the
     module stays usable in environments where it isn't installed.
     """
+    import ssl
+
     try:
         import truststore
 
@@ -40,11 +87,15 @@ def _ssl_context() -> ssl.SSLContext:
         return ssl.create_default_context()
 
 
-def lookup_url(cmd_base: str, icons_file: str) -> str | None:
+def lookup_url(cmd_base: str, icons_file: str, *, index_dir: str | None = None) -> str | None:
     """Return the icon URL mapped to `cmd_base` in the `key=url` icons file, or None.
 
-    Lines are `key=url`; `#` comments and blank lines are ignored. First match wins.
+    Lines are `key=url`; `#` comments and blank lines are ignored. First match wins. With
+    `index_dir`, the lookup goes through the compiled index kept there (see `load_url_index`)
+    instead of scanning the file.
     """
+    if index_dir is not None:
+        return load_url_index(icons_file, index_dir).get(cmd_base)
     try:
         with open(icons_file, encoding="utf-8") as handle:
             for line in handle:
@@ -59,55 +110,443 @@ def lookup_url(cmd_base: str, icons_file: str) -> str | None:
     return None
 
 
-def _fetch(url: str, dest: str) -> bool:
-    """Download `url` to `dest` (atomic via temp file + replace). True on success.
+def read_url_map(icons_file: str) -> dict[str, str]:
+    """Parse the whole `key=url` icons file into a dict, with `lookup_url`'s exact semantics.
+
+    First match wins (later duplicates are ignored); comments, blank lines, and entries without a
+    URL are skipped. A missing file reads as an empty map.
+    """
+    url_map: dict[str, str] = {}
+    try:
+        with open(icons_file, encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                key, sep, url = line.partition("=")
+                if sep and url:
+                    url_map.setdefault(key, url)
+    except FileNotFoundError:
+        pass
+    return url_map
+
+
+def load_url_index(icons_file: str, index_dir: str) -> dict[str, str]:
+    """The icons file's map via a compiled index at <index_dir>/.url-index, rebuilt when stale.
+
+    The index is a marshaled (version, source path, mtime_ns, size, map) tuple: a hit costs a stat
+    of the icons file plus one small read, with no line parsing. It's rebuilt with `read_url_map`
+    (so ordering, comment, and blank-line handling match `lookup_url` exactly) whenever the source
+    path, mtime, or size differ, or the index is missing or unreadable; the rewrite is atomic.
+    A missing icons file reads as an empty map.
+    """
+    try:
+        st = os.stat(icons_file)
+    except OSError:
+        return {}
+    source = (os.path.abspath(icons_file), st.st_mtime_ns, st.st_size)
+    index_path = os.path.join(index_dir, URL_INDEX_NAME)
+
+    try:
+        with open(index_path, "rb") as handle:
+            version, *indexed_source, url_map = marshal.loads(handle.read())
+        if version == URL_INDEX_VERSION and tuple(indexed_source) == source:
+            return url_map
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    url_map = read_url_map(icons_file)
+    try:
+        import tempfile
+
+        os.makedirs(index_dir, exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(prefix=".url-index.", dir=index_dir)
+        with os.fdopen(tmp_fd, "wb") as out:
+            out.write(marshal.dumps((URL_INDEX_VERSION, *source, url_map)))
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+    return url_map
+
+
+def save_body(
+    response: IO[bytes],
+    dest: str,
+    *,
+    max_bytes: int = MAX_ICON_BYTES,
+    deadline: float | None = None,
+) -> None:
+    """Stream a successful response's body to `dest` atomically (temp file + replace).
+
+    Raises `IconRejected` when the declared content type is one the notifiers can't render, the
+    body doesn't start with a PNG/JPEG signature, it exceeds `max_bytes`, or reading runs past
+    `deadline` (a `time.monotonic()` value). Raises on any read/write error too; either way
+    neither a temp file nor a partial `dest` is left behind.
+    """
+    headers = getattr(response, "headers", None)
+    content_type = (headers.get("Content-Type", "") if headers is not None else "") or ""
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    if content_type in REJECTED_CONTENT_TYPES:
+        raise IconRejected(f"content type {content_type}")
+
+    import tempfile
+
+    tmp_fd, tmp_path = tempfile.mkstemp(prefix=".fetch.", dir=os.path.dirname(dest))
+    try:
+        with os.fdopen(tmp_fd, "wb") as out:
+            head = b""
+            total = 0
+            while chunk := response.read(_CHUNK_BYTES):
+                total += len(chunk)
+                if total > max_bytes:
+                    raise IconRejected(f"larger than {max_bytes} bytes")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise IconRejected("deadline exceeded")
+                if len(head) < _SIGNATURE_BYTES:
+                    head += chunk[: _SIGNATURE_BYTES - len(head)]
+                    if len(head) >= _SIGNATURE_BYTES:
+                        _check_signature(head)
+                out.write(chunk)
+            _check_signature(head)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _check_signature(head: bytes) -> None:
+    if not head.startswith(IMAGE_SIGNATURES):
+        raise IconRejected("not a PNG or JPEG")
+
+
+class Fetched(NamedTuple):
+    """A successful download: a new body saved to `dest`, or (`not_modified`) a 304.
+
+    A 304 confirms the cached body. Either way it carries the response's validators for the next
+    conditional request.
+    """
+
+    not_modified: bool
+    etag: str | None
+    last_modified: str | None
+
+
+# A download function: fetch(url, dest, *, etag=None, last_modified=None) -> Fetched | None.
+FetchFn = Callable[..., "Fetched | None"]
+
+
+def conditional_headers(etag: str | None, last_modified: str | None) -> dict[str, str]:
+    """Request headers that turn a GET into a revalidation of the cached body."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def _fetch(
+    url: str, dest: str, *, etag: str | None = None, last_modified: str | None = None
+) -> Fetched | None:
+    """Download `url` to `dest` (atomic via temp file + replace). None on failure.
 
     Mirrors curl `--fail` (non-2xx raises), `--location` (urllib follows redirects), and
-    `--max-time 5` (per-connection timeout). Any error is swallowed and reported as False.
+    `--max-time 5` (per-connection timeout), with the body streamed under `save_body`'s byte
+    budget, type check, and an overall `FETCH_DEADLINE_SECONDS` deadline. Given validators, the
+    request is conditional and a 304 leaves `dest` alone. Any error (including a rejected body) is
+    swallowed and reported as None.
     """
-    dest_dir = os.path.dirname(dest)
-    tmp_fd, tmp_path = tempfile.mkstemp(prefix=".fetch.", dir=dest_dir)
+    import urllib.error
+    import urllib.request
+
+    deadline = time.monotonic() + FETCH_DEADLINE_SECONDS
+    request = urllib.request.Request(url, headers=conditional_headers(etag, last_modified))
     try:
         with urllib.request.urlopen(
-            url, timeout=FETCH_TIMEOUT_SECONDS, context=_ssl_context()
+            request, timeout=FETCH_TIMEOUT_SECONDS, context=_ssl_context()
         ) as response:
-            # urlopen raises HTTPError for 4xx/5xx, so reaching here means a 2xx.
-            with os.fdopen(tmp_fd, "wb") as out:
-                out.write(response.read())
-        os.replace(tmp_path, dest)
-        return True
+            # urlopen raises HTTPError for 4xx/5xx (and 304), so reaching here means a 2xx.
+            save_body(response, dest, deadline=deadline)
+            return Fetched(False, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    except urllib.error.HTTPError as err:
+        with err:
+            if err.code == 304 and (etag or last_modified):
+                return Fetched(
+                    True,
+                    err.headers.get("ETag") or etag,
+                    err.headers.get("Last-Modified") or last_modified,
+                )
+        return None
     except Exception:
+        return None
+
+
+# --- entry metadata -------------------------------------------------------------------------
+
+
+def read_meta(cmd_base: str, cache_dir: str) -> dict | None:
+    """The <key>.meta record for a cached icon (url, etag, last_modified, validated_at), if any."""
+    try:
+        with open(_meta_path(cmd_base, cache_dir), encoding="utf-8") as handle:
+            meta = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    return meta if isinstance(meta, dict) else None
+
+
+def _write_meta(cmd_base: str, cache_dir: str, url: str, fetched: Fetched) -> None:
+    meta = {
+        "url": url,
+        "etag": fetched.etag,
+        "last_modified": fetched.last_modified,
+        "validated_at": time.time(),
+    }
+    cache.write_atomic(_meta_path(cmd_base, cache_dir), json.dumps(meta).encode())
+
+
+def freshness(
+    cmd_base: str, url: str | None, cache_dir: str, *, now: float | None = None
+) -> str:
+    """State of `cmd_base`'s cached icon relative to its current `url` (None when unmapped).
+
+    "absent": no PNG. "invalid": the PNG was fetched from a different URL (or its mapping was
+    removed) and must not be shown. "stale": due for revalidation — validated longer ago than the
+    max-age, or a PNG without a .meta record (from before validators were kept). "fresh":
+    everything else, including a PNG placed by hand for an unmapped key.
+    """
+    if not os.path.isfile(os.path.join(cache_dir, f"{cmd_base}.png")):
+        return "absent"
+    meta = read_meta(cmd_base, cache_dir)
+    if meta is None:
+        return "stale" if url else "fresh"
+    if meta.get("url") != url:
+        return "invalid"
+    validated_at = meta.get("validated_at")
+    if not isinstance(validated_at, (int, float)):
+        return "stale"
+    now = time.time() if now is None else now
+    return "stale" if now - validated_at > cache.max_age_seconds() else "fresh"
+
+
+def invalidate(cmd_base: str, cache_dir: str) -> None:
+    """Drop `cmd_base`'s cached icon and its metadata and miss records."""
+    for suffix in (".png", ".meta", ".miss"):
         try:
-            os.unlink(tmp_path)
+            os.unlink(os.path.join(cache_dir, f"{cmd_base}{suffix}"))
         except OSError:
             pass
-        return False
 
 
-def resolve(cmd_base: str, *, cache_dir: str, icons_file: str) -> str | None:
-    """Resolve an icon path for `cmd_base`, fetching once if needed.
+# --- resolution -----------------------------------------------------------------------------
+
+
+def resolve(
+    cmd_base: str,
+    *,
+    cache_dir: str,
+    icons_file: str,
+    url_map: Mapping[str, str] | None = None,
+    background: bool = True,
+    wait: float = 0.0,
+) -> str | None:
+    """Resolve an icon path for `cmd_base`, never waiting on the network by default.
 
-    Returns a cached PNG path, or None when there's no icon (no mapping, prior failed fetch
-    recorded by a .miss sentinel, or this fetch fails). Never raises on network/FS errors.
+    Returns a cached PNG path, or None when there's no icon (yet): no mapping, a recent failed
+    fetch recorded by an unexpired .miss sentinel, or a first sighting. Never raises on
+    network/FS errors. `url_map` is an already-parsed icons file (see `read_url_map`); without
+    one, `icons_file` is looked up through its compiled index in `cache_dir`.
+
+    A cached icon fetched from a URL other than the current mapping is dropped and treated as a
+    first sighting. A stale one (see `freshness`) is still returned, and a background worker
+    revalidates it with a conditional GET.
+
+    Downloads are single-flight per key: the caller that takes the key's lease (<key>.lock)
+    hands it, still held, to a detached worker (`fetch_icon` in a background process) — or, with
+    `background=False`, fetches inline — and every other concurrent caller finds the lease taken
+    and starts nothing. Any caller, the fetching one included, then waits up to `wait` seconds for
+    the download to land; with the default of 0 it goes ahead without an icon and a later
+    notification picks up the cached PNG.
     """
     icon_path = os.path.join(cache_dir, f"{cmd_base}.png")
     miss_path = os.path.join(cache_dir, f"{cmd_base}.miss")
 
+    def current_url() -> str | None:
+        if url_map is not None:
+            return url_map.get(cmd_base)
+        return lookup_url(cmd_base, icons_file, index_dir=cache_dir)
+
+    url = None
     if os.path.isfile(icon_path):
-        return icon_path
-    if os.path.isfile(miss_path):
+        url = current_url()
+        state = freshness(cmd_base, url, cache_dir)
+        if state == "invalid":
+            invalidate(cmd_base, cache_dir)
+        elif cache.record_hit(icon_path):
+            if state == "stale" and not cache.miss_active(miss_path):
+                lease = acquire_lease(cmd_base, cache_dir)
+                if lease is not None:
+                    with lease:
+                        _spawn_fetch(cmd_base, url, cache_dir, lease=lease)
+            return icon_path
+    elif cache.miss_active(miss_path):
+        cache.bump(cache_dir, misses=1)
         return None
-
-    url = lookup_url(cmd_base, icons_file)
+    else:
+        url = current_url()
     if not url:
         return None
 
-    os.makedirs(cache_dir, exist_ok=True)
-    if _fetch(url, icon_path):
+    cache.bump(cache_dir, misses=1)
+    lease = acquire_lease(cmd_base, cache_dir)
+    if lease is not None:
+        with lease:
+            if not background:
+                return _fetch_leased(cmd_base, url, cache_dir, fetch=_fetch)
+            if os.path.isfile(icon_path):  # a previous lease holder just finished
+                return icon_path
+            _spawn_fetch(cmd_base, url, cache_dir, lease=lease)
+        # Our copy of the lease is closed; the worker's keeps the lock held until it's done.
+    if wait > 0:
+        return await_icon(cmd_base, cache_dir, timeout=wait)
+    return None
+
+
+def fetch_icon(
+    cmd_base: str,
+    url: str,
+    cache_dir: str,
+    *,
+    fetch: FetchFn = _fetch,
+    lease: IO[str] | None = None,
+) -> str | None:
+    """Download or revalidate `cmd_base`'s icon, recording a .miss sentinel on failure.
+
+    Runs under the key's lease (see `acquire_lease`), so two downloads of the same key never
+    overlap: if the lease is taken, returns None without fetching. `lease` is one the caller
+    already holds (the background worker is handed its spawner's). A fresh cached icon is
+    returned as is; a stale one is revalidated with a conditional GET (a 304 just renews its
+    .meta); an absent or invalidated one is downloaded. Returns the PNG path when there is one
+    afterwards. A download clears any expired .miss and then enforces the cache's size cap.
+    `fetch` does the actual request (default `_fetch`; prefetch passes a connection-reusing one).
+    """
+    if lease is None:
+        lease = acquire_lease(cmd_base, cache_dir)
+        if lease is None:
+            return None
+    with lease:
+        return _fetch_leased(cmd_base, url, cache_dir, fetch=fetch)
+
+
+def _fetch_leased(cmd_base: str, url: str, cache_dir: str, *, fetch: FetchFn) -> str | None:
+    """`fetch_icon`'s body; the caller holds the key's lease."""
+    icon_path = os.path.join(cache_dir, f"{cmd_base}.png")
+    miss_path = os.path.join(cache_dir, f"{cmd_base}.miss")
+    # A previous lease holder may have finished between our caller's check and now.
+    state = freshness(cmd_base, url, cache_dir)
+    if state == "fresh":
         return icon_path
-    # Record the miss so we don't retry on every subsequent command.
+    if state == "invalid":
+        invalidate(cmd_base, cache_dir)
+    if cache.miss_active(miss_path):
+        return icon_path if state == "stale" else None
+
+    meta = (read_meta(cmd_base, cache_dir) or {}) if state == "stale" else {}
+    fetched = fetch(url, icon_path, etag=meta.get("etag"), last_modified=meta.get("last_modified"))
+    if fetched is not None and fetched.not_modified and not os.path.isfile(icon_path):
+        fetched = None  # evicted meanwhile: nothing left to confirm
+    if fetched is None:
+        # Record the miss so we don't retry on every subsequent command until it expires. A stale
+        # icon keeps being served meanwhile.
+        cache.record_miss(miss_path)
+        return icon_path if state == "stale" and os.path.isfile(icon_path) else None
+
+    _write_meta(cmd_base, cache_dir, url, fetched)
+    cache.clear_miss(miss_path)
+    if not fetched.not_modified:
+        cache.bump(cache_dir, fetched=1)
+        cache.enforce_cap(cache_dir)
+    else:
+        cache.bump(cache_dir, revalidated=1)
+    return icon_path
+
+
+def acquire_lease(cmd_base: str, cache_dir: str) -> IO[str] | None:
+    """Take `cmd_base`'s download lease: an exclusive flock on <key>.lock, without blocking.
+
+    Returns the open lock file (closing it releases the lease), or None if another process holds
+    it. The lock belongs to the open file, so a child that inherits the descriptor keeps the lease
+    after the parent closes its copy.
+    """
     try:
-        open(miss_path, "w").close()
+        os.makedirs(cache_dir, exist_ok=True)
+        lock = open(_lock_path(cmd_base, cache_dir), "w")
     except OSError:
-        pass
-    return None
+        return None
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+def await_icon(cmd_base: str, cache_dir: str, *, timeout: float) -> str | None:
+    """Wait up to `timeout` seconds for an in-flight download of `cmd_base` to land.
+
+    Returns the PNG path as soon as it exists, or None once the download finished without one
+    (or the time is up).
+    """
+    icon_path = os.path.join(cache_dir, f"{cmd_base}.png")
+    deadline = time.monotonic() + timeout
+    while True:
+        if os.path.isfile(icon_path):
+            return icon_path
+        if not fetch_in_progress(cmd_base, cache_dir):
+            return icon_path if os.path.isfile(icon_path) else None
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(_AWAIT_POLL_SECONDS)
+
+
+def fetch_in_progress(cmd_base: str, cache_dir: str) -> bool:
+    """True while some process holds `cmd_base`'s download lease."""
+    try:
+        with open(_lock_path(cmd_base, cache_dir)) as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return True
+    return False
+
+
+def _lock_path(cmd_base: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{cmd_base}.lock")
+
+
+def _meta_path(cmd_base: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{cmd_base}.meta")
+
+
+def _spawn_fetch(cmd_base: str, url: str, cache_dir: str, *, lease: IO[str]) -> None:
+    """Run `fetch_icon` in a detached background process (this module's `__main__`).
+
+    The worker inherits `lease`'s descriptor, and with it the held lock.
+    """
+    lib_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    fd = lease.fileno()
+    detach.spawn(
+        [sys.executable, "-m", "cmd_notify.icons", cmd_base, url, cache_dir, str(fd)],
+        env=dict(os.environ, PYTHONPATH=lib_dir),
+        pass_fds=(fd,),
+    )
+
+
+if __name__ == "__main__":
+    # Background worker entry point: python -m cmd_notify.icons <cmd_base> <url> <cache_dir>
+    # [<lease fd>]. Without an inherited lease the worker takes its own.
+    inherited = os.fdopen(int(sys.argv[4]), "w") if len(sys.argv) > 4 else None
+    fetch_icon(sys.argv[1], sys.argv[2], sys.argv[3], lease=inherited)
@@ -3,20 +3,22 @@
 The pure functions (`should_notify`, `command_base`, `format_duration`, `display_command`,
 `build_body`, `render_dispatch`) carry all the logic and are unit-tested directly. `dispatch` and
 `main` are the thin I/O layer: they read env seams, resolve the optional icon, and either print the
-would-be invocation (`--dry-run`) or shell out to the platform notifier.
+would-be invocation (`--dry-run`) or launch the platform notifier detached, so `main` returns as
+soon as gating and formatting are done.
 
 Mirrors the original bash helper's behavior exactly, including the dry-run output format the tests
 assert on.
+
+Nearly every call is a short command that `should_notify` turns away, so module load stays at
+`os`/`sys`: `icons` (urllib, ssl, tempfile behind it) loads only once an icon is looked up, and
+`shutil`/`subprocess`/`detach` only once a notifier is actually launched.
 """
 
 from __future__ import annotations
 
 import os
-import shutil
-import subprocess
 import sys
-
-from cmd_notify import icons
+from collections.abc import Callable
 
 # TUI/REPL commands whose foreground sessions don't want a completion notification.
 BLOCKLIST = frozenset(
@@ -130,30 +132,40 @@ def dispatch(
     icon: str | None,
     *,
     dry_run: bool,
+    which: Callable[[str], str | None] | None = None,
 ) -> None:
-    """Print the invocation (dry-run) or shell out to the platform notifier (best-effort)."""
+    """Print the invocation (dry-run) or shell out to the platform notifier (best-effort).
+
+    The notifier is located with `which` (default `shutil.which`; the daemon passes a memoized
+    one); a missing notifier makes this a silent no-op. The notifier is spawned detached and not
+    waited on, since notify-send / terminal-notifier can take a long time to hand off to the
+    notification service.
+    """
     if dry_run:
         print(render_dispatch(platform, title, body, group, icon))
         return
 
     if platform == "Darwin":
-        if not shutil.which("terminal-notifier"):
-            return
         args = ["terminal-notifier", "-title", title, "-message", body, "-group", group]
         if icon:
             args += ["-contentImage", icon]
     else:
-        if not shutil.which("notify-send"):
-            return
         args = ["notify-send", "-h", f"string:x-canonical-private-synchronous:cmd-notify-{group_suffix(group)}"]
         if icon:
             args += ["--icon", icon]
         args += [title, body]
+    if which is None:
+        import shutil  # deferred: see the module docstring
+
+        which = shutil.which
+    notifier = which(args[0])
+    if not notifier:
+        return
+    args[0] = notifier
+
+    from cmd_notify import detach
 
-    try:
-        subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
-    except OSError:
-        pass
+    detach.spawn(args)
 
 
 def main(argv: list[str] | None = None) -> None:
@@ -172,8 +184,27 @@ def main(argv: list[str] | None = None) -> None:
     exit_code = args[2] if len(args) > 2 else "0"
     cwd = args[3] if len(args) > 3 else "?"
 
-    threshold = _int_env("CMD_NOTIFY_THRESHOLD", DEFAULT_THRESHOLD_SECONDS)
+    threshold = parse_threshold(os.environ.get("CMD_NOTIFY_THRESHOLD"))
+    handle(cmd, duration_raw, exit_code, cwd, threshold=threshold, dry_run=dry_run)
+
+
+def handle(
+    cmd: str,
+    duration_raw: str,
+    exit_code: str,
+    cwd: str,
+    *,
+    threshold: int,
+    dry_run: bool = False,
+    resolve_icon: Callable[[str], str | None] | None = None,
+    which: Callable[[str], str | None] | None = None,
+) -> None:
+    """Gate, format, and dispatch one completed command (the body of `main`).
 
+    `resolve_icon` and `which` let a long-lived caller (the daemon) supply warm state: an
+    in-memory icon resolver and a memoized notifier lookup. Both default to the one-shot behavior
+    (resolve via the icon cache on disk, locate the notifier on PATH).
+    """
     if not should_notify(cmd, duration_raw, disabled=False, threshold=threshold):
         return
 
@@ -183,23 +214,45 @@ def main(argv: list[str] | None = None) -> None:
     body = build_body(exit_code, duration, cwd)
     group = f"cmd-notify:{base}"
 
-    cache_dir = os.path.join(
+    icon = (resolve_icon or _resolve_icon)(base)
+
+    platform = os.environ.get("CMD_NOTIFY_PLATFORM") or os.uname().sysname
+    dispatch(platform, title, body, group, icon, dry_run=dry_run, which=which)
+
+
+def icon_cache_dir() -> str:
+    """Where fetched icons are cached: $XDG_CACHE_HOME/cmd-notify/icons (default ~/.cache/...)."""
+    return os.path.join(
         os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
         "cmd-notify",
         "icons",
     )
-    icons_file = os.environ.get(
+
+
+def icons_file_path() -> str:
+    """The `key=url` icon map. $CMD_NOTIFY_ICONS overrides (default ~/.local/share/...)."""
+    return os.environ.get(
         "CMD_NOTIFY_ICONS", os.path.expanduser("~/.local/share/cmd-notify/icons.txt")
     )
-    icon = icons.resolve(base, cache_dir=cache_dir, icons_file=icons_file)
 
-    platform = os.environ.get("CMD_NOTIFY_PLATFORM") or os.uname().sysname
-    dispatch(platform, title, body, group, icon, dry_run=dry_run)
+
+def icon_wait_seconds() -> float:
+    """How long to wait for an in-flight icon download: $CMD_NOTIFY_ICON_WAIT_MS (default 0)."""
+    raw = os.environ.get("CMD_NOTIFY_ICON_WAIT_MS", "")
+    return int(raw) / 1000 if raw.isdigit() else 0.0
+
+
+def _resolve_icon(base: str) -> str | None:
+    """Resolve `base`'s icon through the on-disk cache (the one-shot path)."""
+    from cmd_notify import icons  # deferred: see the module docstring
+
+    return icons.resolve(
+        base, cache_dir=icon_cache_dir(), icons_file=icons_file_path(), wait=icon_wait_seconds()
+    )
 
 
-def _int_env(name: str, default: int) -> int:
-    """Read an int env var, falling back to `default` when unset or non-numeric."""
-    raw = os.environ.get(name)
+def parse_threshold(raw: str | None) -> int:
+    """A $CMD_NOTIFY_THRESHOLD value as seconds (the default when unset or non-numeric)."""
     if raw is None or not raw.isdigit():
-        return default
+        return DEFAULT_THRESHOLD_SECONDS
     return int(raw)
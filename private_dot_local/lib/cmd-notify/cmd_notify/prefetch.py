@@ -0,0 +1,202 @@
+"""Bulk warm-up of the icon cache (`cmd-notify icons prefetch`).
+
+Reads the whole icons file and downloads every icon that isn't cached yet (or revalidates one
+that's due), concurrently through a bounded thread pool, instead of one at a time on the first
+prompt that needs each. Each download goes through `icons.fetch_icon`, so it takes the same
+per-key lease, writes the PNG atomically, and records a .miss sentinel on failure exactly like the
+lazy path.
+
+HTTP(S) downloads reuse connections: every worker thread keeps one keep-alive connection per
+(scheme, host), so a map that points at a handful of hosts costs a handful of TLS handshakes
+rather than one per icon. Redirects and non-HTTP URLs (e.g. file://) go through the regular
+urllib fetch.
+"""
+
+from __future__ import annotations
+
+import http.client
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from cmd_notify import cache, icons
+
+DEFAULT_JOBS = 8
+
+_REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+_USER_AGENT = f"Python-urllib/{sys.version_info[0]}.{sys.version_info[1]}"  # same as the lazy path
+
+
+class Result(NamedTuple):
+    """Outcome for one icons-file key.
+
+    `status` is one of: "cached" (PNG already present and fresh), "fetched", "refreshed" (a stale
+    PNG revalidated or re-downloaded), "failed" (download failed; a .miss was recorded),
+    "skipped" (an earlier .miss is still in force), or "busy" (another process holds the key's
+    download lease).
+    """
+
+    key: str
+    status: str
+    seconds: float
+
+
+class _ConnectionPool:
+    """Per-thread keep-alive HTTP(S) connections, keyed by (scheme, host)."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._all: list[http.client.HTTPConnection] = []
+        self._all_lock = threading.Lock()
+        self._ssl_context = icons._ssl_context()
+
+    def _conns(self) -> dict[tuple[str, str], http.client.HTTPConnection]:
+        """This thread's connections."""
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        return conns
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        conns = self._conns()
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(
+                    netloc, timeout=icons.FETCH_TIMEOUT_SECONDS, context=self._ssl_context
+                )
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=icons.FETCH_TIMEOUT_SECONDS)
+            conns[(scheme, netloc)] = conn
+            with self._all_lock:
+                self._all.append(conn)
+        return conn
+
+    def _drop(self, scheme: str, netloc: str) -> None:
+        conn = self._conns().pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def fetch(
+        self, url: str, dest: str, *, etag: str | None = None, last_modified: str | None = None
+    ) -> icons.Fetched | None:
+        """Download `url` to `dest` over a reused connection. Same contract as `icons._fetch`."""
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return icons._fetch(url, dest, etag=etag, last_modified=last_modified)
+        deadline = time.monotonic() + icons.FETCH_DEADLINE_SECONDS
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+        headers = {"User-Agent": _USER_AGENT, **icons.conditional_headers(etag, last_modified)}
+
+        # A reused keep-alive connection may have been closed by the server since its last use;
+        # that shows up as an error on the request, so retry once on a fresh connection.
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", target, headers=headers)
+                response = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                self._drop(parts.scheme, parts.netloc)
+                if attempt == 0:
+                    continue
+                return None
+            try:
+                if 200 <= response.status < 300:
+                    icons.save_body(response, dest, deadline=deadline)
+                    return icons.Fetched(
+                        False, response.getheader("ETag"), response.getheader("Last-Modified")
+                    )
+                # Drain (a bounded amount) so the connection can be reused.
+                response.read(icons.MAX_ICON_BYTES)
+                if not response.isclosed():
+                    self._drop(parts.scheme, parts.netloc)
+                if response.status == 304 and (etag or last_modified):
+                    return icons.Fetched(
+                        True,
+                        response.getheader("ETag") or etag,
+                        response.getheader("Last-Modified") or last_modified,
+                    )
+                if response.status in _REDIRECT_STATUSES:
+                    # urllib follows the whole redirect chain.
+                    return icons._fetch(url, dest, etag=etag, last_modified=last_modified)
+                return None
+            except (http.client.HTTPException, OSError, icons.IconRejected):
+                # A rejected body was abandoned mid-stream, so the connection can't be reused.
+                self._drop(parts.scheme, parts.netloc)
+                return None
+            finally:
+                if response.will_close:
+                    self._drop(parts.scheme, parts.netloc)
+        return None
+
+    def close(self) -> None:
+        with self._all_lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+
+def prefetch(
+    icons_file: str,
+    cache_dir: str,
+    *,
+    jobs: int = DEFAULT_JOBS,
+    retry_misses: bool = False,
+) -> list[Result]:
+    """Download every mapped icon that isn't cached yet; one `Result` per key, in file order.
+
+    Keys with an unexpired .miss sentinel are left alone unless `retry_misses` is set, in which
+    case the sentinel is cleared and the download retried.
+    """
+    url_map = icons.read_url_map(icons_file)
+    os.makedirs(cache_dir, exist_ok=True)
+    pool = _ConnectionPool()
+
+    def one(key: str, url: str) -> Result:
+        started = time.monotonic()
+        miss_path = os.path.join(cache_dir, f"{key}.miss")
+        state = icons.freshness(key, url, cache_dir)
+        if state == "fresh":
+            return Result(key, "cached", 0.0)
+        if cache.miss_active(miss_path):
+            if not retry_misses:
+                # A stale icon whose revalidation failed recently is still served as is.
+                return Result(key, "cached" if state == "stale" else "skipped", 0.0)
+            cache.clear_miss(miss_path)
+        icon = icons.fetch_icon(key, url, cache_dir, fetch=pool.fetch)
+        if cache.miss_active(miss_path):
+            status = "failed"
+        elif icon:
+            status = "refreshed" if state == "stale" else "fetched"
+        else:
+            status = "busy"
+        return Result(key, status, time.monotonic() - started)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            return list(executor.map(lambda item: one(*item), url_map.items()))
+    finally:
+        pool.close()
+
+
+def format_summary(results: list[Result], elapsed: float) -> str:
+    """Per-key lines ("<key>  <status>  <ms>") plus a totals line."""
+    width = max((len(result.key) for result in results), default=0)
+    lines = [
+        f"{result.key:<{width}}  {result.status:<7}  {result.seconds * 1000:6.0f} ms"
+        for result in results
+    ]
+    counts: dict[str, int] = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    breakdown = ", ".join(f"{count} {status}" for status, count in counts.items())
+    lines.append(
+        f"{len(results)} icons" + (f": {breakdown}" if breakdown else "") + f" in {elapsed * 1000:.0f} ms"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,33 @@
+# shellcheck shell=sh
+# cmd-notify fast gate, sourced by the bash and zsh hooks (POSIX sh; no external commands).
+#
+# `__cmd_notify_gate <command_text> <duration_seconds>` returns 0 when the command MIGHT notify and
+# 1 when `cmd_notify.notify.should_notify` would certainly say no. The hooks only launch
+# ~/.local/bin/cmd-notify on 0, so the common sub-threshold command costs a few shell builtins
+# instead of a `uv run` + interpreter start. Python still makes the final call; this only has to
+# never reject something `should_notify` would accept.
+#
+# Keep in sync with notify.py (BLOCKLIST, DEFAULT_THRESHOLD_SECONDS, command_base) and the nu copy
+# in .chezmoitemplates/config.nu — tests/test_gate.py checks all three agree.
+
+__CMD_NOTIFY_BLOCKLIST=" hx vim nvim nano emacs less more man htop top btop bash zsh fish nu ssh claude "
+__CMD_NOTIFY_DEFAULT_THRESHOLD=60
+
+__cmd_notify_gate() {
+  # POSIX sh has no `local`: scratch variables carry the __cmd_notify_ prefix instead.
+  [ "${CMD_NOTIFY_DISABLE:-}" = 1 ] && return 1
+  # Duration must be a non-negative integer string.
+  case $2 in '' | *[!0-9]*) return 1 ;; esac
+  __cmd_notify_threshold=${CMD_NOTIFY_THRESHOLD:-}
+  case $__cmd_notify_threshold in
+    '' | *[!0-9]*) __cmd_notify_threshold=$__CMD_NOTIFY_DEFAULT_THRESHOLD ;;
+  esac
+  [ "$2" -ge "$__cmd_notify_threshold" ] || return 1
+  # command_base: first whitespace-delimited token, path-stripped.
+  __cmd_notify_base=${1#"${1%%[![:space:]]*}"}
+  __cmd_notify_base=${__cmd_notify_base%%[[:space:]]*}
+  __cmd_notify_base=${__cmd_notify_base##*/}
+  [ -n "$__cmd_notify_base" ] || return 1
+  case $__CMD_NOTIFY_BLOCKLIST in *" $__cmd_notify_base "*) return 1 ;; esac
+  return 0
+}
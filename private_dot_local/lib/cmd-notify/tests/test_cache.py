@@ -0,0 +1,217 @@
+"""Tests for icon cache management: expiring misses, LRU eviction under a byte cap, and stats.
+
+Time-dependent behavior is exercised by back-dating files with os.utime (or passing `now=`), so
+nothing sleeps. Downloads use file:// URLs, as in test_icons.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+
+from cmd_notify import cache, cli, icons
+
+PNG = b"\x89PNG\r\n\x1a\n fake"
+
+
+def _age(path, seconds, *, atime_only=False):
+    """Back-date `path` by `seconds` (its atime, or both atime and mtime)."""
+    st = os.stat(path)
+    then = time.time_ns() - int(seconds * 1_000_000_000)
+    os.utime(path, ns=(then, st.st_mtime_ns if atime_only else then))
+
+
+# --- negative entries ---------------------------------------------------------------------
+
+
+def test_miss_ttl_backs_off_exponentially_and_caps():
+    assert cache.miss_ttl(1) == cache.MISS_TTL_BASE_SECONDS
+    assert cache.miss_ttl(2) == 2 * cache.MISS_TTL_BASE_SECONDS
+    assert cache.miss_ttl(3) == 4 * cache.MISS_TTL_BASE_SECONDS
+    assert cache.miss_ttl(50) == cache.MISS_TTL_MAX_SECONDS
+
+
+def test_legacy_empty_miss_counts_as_one_failure(tmp_path):
+    miss = tmp_path / "cargo.miss"
+    miss.write_text("", encoding="utf-8")
+    assert cache.miss_failures(str(miss)) == 1
+    assert cache.miss_active(str(miss))
+    _age(miss, cache.MISS_TTL_BASE_SECONDS + 1)
+    assert not cache.miss_active(str(miss))
+
+
+def test_record_miss_counts_failures(tmp_path):
+    miss = str(tmp_path / "cargo.miss")
+    assert cache.miss_failures(miss) == 0
+    cache.record_miss(miss)
+    cache.record_miss(miss)
+    assert cache.miss_failures(miss) == 2
+    # The second failure doubles the TTL, measured from the latest failure.
+    assert cache.miss_active(miss, now=time.time() + cache.MISS_TTL_BASE_SECONDS + 1)
+    assert not cache.miss_active(miss, now=time.time() + 2 * cache.MISS_TTL_BASE_SECONDS + 1)
+
+
+def test_expired_miss_is_retried_and_cleared_on_success(tmp_path):
+    src = tmp_path / "src.png"
+    src.write_bytes(PNG)
+    icons_file = tmp_path / "icons.txt"
+    icons_file.write_text(f"cargo={src.as_uri()}\n", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    miss = cache_dir / "cargo.miss"
+    miss.write_text("1\n", encoding="utf-8")
+    _age(miss, cache.MISS_TTL_BASE_SECONDS + 1)
+
+    icon = icons.resolve(
+        "cargo", cache_dir=str(cache_dir), icons_file=str(icons_file), background=False
+    )
+    assert icon == str(cache_dir / "cargo.png")
+    assert not miss.exists()
+
+
+def test_expired_miss_failing_again_backs_off(tmp_path):
+    icons_file = tmp_path / "icons.txt"
+    icons_file.write_text(f"cargo={(tmp_path / 'gone.png').as_uri()}\n", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    miss = cache_dir / "cargo.miss"
+    miss.write_text("1\n", encoding="utf-8")
+    _age(miss, cache.MISS_TTL_BASE_SECONDS + 1)
+
+    assert (
+        icons.resolve("cargo", cache_dir=str(cache_dir), icons_file=str(icons_file), background=False)
+        is None
+    )
+    assert cache.miss_failures(str(miss)) == 2
+    assert cache.miss_active(str(miss))
+
+
+# --- hits and LRU eviction ----------------------------------------------------------------
+
+
+def test_record_hit_refreshes_atime_and_counts(tmp_path):
+    icon = tmp_path / "cargo.png"
+    icon.write_bytes(PNG)
+    _age(icon, 3600)
+    mtime_before = os.stat(icon).st_mtime_ns
+
+    assert cache.record_hit(str(icon))
+    st = os.stat(icon)
+    assert time.time() - st.st_atime < 60
+    assert st.st_mtime_ns == mtime_before  # mtime stays the download time
+    assert cache.read_stats(str(tmp_path))["hits"] == 1
+    assert not cache.record_hit(str(tmp_path / "gone.png"))
+
+
+def test_hits_on_a_recently_touched_icon_are_batched(tmp_path):
+    icon = tmp_path / "cargo.png"
+    icon.write_bytes(PNG)
+    stats = tmp_path / cache.STATS_NAME
+    for _ in range(3):
+        assert cache.record_hit(str(icon))
+    assert not stats.exists()  # atime is fresh: no touch, so no .stats write either
+
+    _age(icon, 3600)
+    assert cache.record_hit(str(icon))
+    assert json.loads(stats.read_text(encoding="utf-8"))["hits"] == 4
+
+    cache.record_hit(str(icon))
+    cache.flush_hits()
+    assert json.loads(stats.read_text(encoding="utf-8"))["hits"] == 5
+
+
+def test_gc_evicts_least_recently_used_first(tmp_path):
+    for age, name in ((300, "old"), (200, "mid"), (100, "new")):
+        path = tmp_path / f"{name}.png"
+        path.write_bytes(b"x" * 100)
+        _age(path, age, atime_only=True)
+    # A hit makes the oldest download the most recently used.
+    cache.record_hit(str(tmp_path / "old.png"))
+
+    result = cache.gc(str(tmp_path), limit=200)
+    assert (result.evicted, result.evicted_bytes, result.remaining_bytes) == (1, 100, 200)
+    assert sorted(p.name for p in tmp_path.glob("*.png")) == ["new.png", "old.png"]
+    stats = cache.read_stats(str(tmp_path))
+    assert (stats["evictions"], stats["evicted_bytes"]) == (1, 100)
+
+
+def test_gc_drops_expired_misses_and_stale_temps_but_not_locks(tmp_path):
+    (tmp_path / "fresh.miss").write_text("1\n", encoding="utf-8")
+    expired = tmp_path / "old.miss"
+    expired.write_text("1\n", encoding="utf-8")
+    _age(expired, cache.MISS_TTL_BASE_SECONDS + 1)
+    stale = tmp_path / ".fetch.abc"
+    stale.write_bytes(b"partial")
+    _age(stale, cache.STALE_TEMP_SECONDS + 1)
+    (tmp_path / ".fetch.live").write_bytes(b"in progress")
+    (tmp_path / "cargo.lock").write_text("", encoding="utf-8")
+
+    result = cache.gc(str(tmp_path))
+    assert (result.expired_misses, result.stale_temps) == (1, 1)
+    remaining = sorted(p.name for p in tmp_path.iterdir())
+    assert remaining == [".fetch.live", "cargo.lock", "fresh.miss"]
+
+
+def test_download_enforces_cap(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    old = cache_dir / "old.png"
+    old.write_bytes(b"x" * 100)
+    _age(old, 600, atime_only=True)
+    src = tmp_path / "src.png"
+    src.write_bytes(PNG + b"y" * (100 - len(PNG)))
+    monkeypatch.setenv("CMD_NOTIFY_ICON_CACHE_MAX_BYTES", "150")
+
+    assert icons.fetch_icon("cargo", src.as_uri(), str(cache_dir)) == str(cache_dir / "cargo.png")
+    assert not old.exists()
+
+
+# --- stats --------------------------------------------------------------------------------
+
+
+def test_resolve_counts_hits_and_misses(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    (cache_dir / "cargo.png").write_bytes(PNG)
+    (cache_dir / "gh.miss").write_text("1\n", encoding="utf-8")
+    url_map = {"cargo": "http://x/c.png", "gh": "http://x/gh.png"}
+    for base in ("cargo", "cargo", "gh", "unmapped"):
+        icons.resolve(base, cache_dir=str(cache_dir), icons_file="", url_map=url_map)
+
+    stats = cache.read_stats(str(cache_dir))
+    # Unmapped commands have no icon to miss, so they don't count against the hit rate.
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_concurrent_bumps_are_not_lost(tmp_path):
+    def worker():
+        for _ in range(50):
+            cache.bump(str(tmp_path), hits=1)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.read_stats(str(tmp_path))["hits"] == 200
+
+
+def test_cli_stats_and_gc(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    cache_dir = tmp_path / "cmd-notify" / "icons"
+    cache_dir.mkdir(parents=True)
+    for name in ("a", "b"):
+        (cache_dir / f"{name}.png").write_bytes(b"x" * 600)
+    _age(cache_dir / "a.png", 100, atime_only=True)
+    cache.bump(str(cache_dir), hits=3, misses=1)
+
+    cli.main(["icons", "stats"])
+    out = capsys.readouterr().out
+    assert "1.2 KiB of 16.0 MiB (2 icons)" in out
+    assert "hit rate:  75.0% (3 hits, 1 misses)" in out
+
+    cli.main(["icons", "gc", "--max-bytes", "1000"])
+    assert capsys.readouterr().out.startswith("evicted 1 icons (600 B)")
+    assert not (cache_dir / "a.png").exists()
@@ -0,0 +1,189 @@
+"""Tests for the daemon path: datagram format, client fallback, and a live daemon round-trip.
+
+The live tests run `daemon.serve` in a thread on a short-lived socket and point the notifier at a
+fake `notify-send` script on PATH that records its argv, so the assertions see exactly what a real
+notification would have carried. No mocking framework.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+
+from cmd_notify import cli, client, daemon
+
+
+@pytest.fixture()
+def sock_dir():
+    # AF_UNIX paths are capped at ~104 bytes, which pytest's tmp_path can exceed.
+    path = tempfile.mkdtemp(prefix="cn-")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture()
+def fake_notifier(tmp_path, monkeypatch):
+    """A `notify-send` on PATH that appends its argv (one line per call) to a log file."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "notify.log"
+    script = bin_dir / "notify-send"
+    script.write_text(f'#!/bin/sh\necho "$*" >> "{log}"\n', encoding="utf-8")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:{os.environ['PATH']}")
+    monkeypatch.setenv("CMD_NOTIFY_PLATFORM", "Linux")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    icons_file = tmp_path / "icons.txt"
+    icons_file.write_text("", encoding="utf-8")
+    monkeypatch.setenv("CMD_NOTIFY_ICONS", str(icons_file))
+    for var in ("CMD_NOTIFY_DISABLE", "CMD_NOTIFY_THRESHOLD"):
+        monkeypatch.delenv(var, raising=False)
+    return log
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture()
+def running_daemon(sock_dir):
+    path = os.path.join(sock_dir, "d.sock")
+    thread = threading.Thread(target=daemon.serve, args=(path,), kwargs={"idle_timeout": 0.5})
+    thread.start()
+    assert _wait_for(lambda: os.path.exists(path))
+    yield path
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+# --- datagram format ------------------------------------------------------------------------
+
+
+def test_event_round_trip():
+    payload = client.encode_event(["cargo build", "120", "0", "/tmp/w"], "30")
+    assert client.decode_event(payload) == (["cargo build", "120", "0", "/tmp/w"], "30")
+
+
+def test_event_too_large_is_not_encoded():
+    assert client.encode_event(["x" * 4096, "120", "0", "/tmp"], None) is None
+
+
+def test_decode_rejects_garbage():
+    assert client.decode_event(b"\xff\xfe") is None
+    assert client.decode_event(b'{"v": 999, "argv": []}') is None
+    assert client.decode_event(b'{"v": 1, "argv": [1, 2]}') is None
+
+
+def test_send_without_daemon_reports_failure(sock_dir):
+    assert client.send_event(["cargo", "120", "0", "/"], None, path=f"{sock_dir}/none.sock") is False
+
+
+# --- live daemon ----------------------------------------------------------------------------
+
+
+def test_daemon_dispatches_qualifying_event(fake_notifier, running_daemon):
+    assert client.send_event(["sleep 90", "120", "0", "/tmp/work"], None, path=running_daemon)
+    assert _wait_for(fake_notifier.exists)
+    line = fake_notifier.read_text(encoding="utf-8").strip()
+    assert line.endswith("sleep 90 succeeded in 2m 0s · work")
+
+
+def test_daemon_applies_callers_threshold(fake_notifier, running_daemon):
+    # Below the sender's threshold: dropped. Then a qualifying one proves the daemon is alive.
+    assert client.send_event(["cargo build", "120", "0", "/tmp"], "300", path=running_daemon)
+    assert client.send_event(["cargo test", "400", "0", "/tmp"], "300", path=running_daemon)
+    assert _wait_for(fake_notifier.exists)
+    time.sleep(0.1)
+    lines = fake_notifier.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1 and "cargo test" in lines[0]
+
+
+def test_second_daemon_exits_while_first_holds_lock(fake_notifier, running_daemon):
+    started = time.monotonic()
+    daemon.serve(running_daemon, idle_timeout=30)
+    assert time.monotonic() - started < 1
+    # The first daemon still owns the socket.
+    assert client.send_event(["make", "120", "0", "/"], None, path=running_daemon)
+
+
+def test_daemon_exits_once_its_package_changes(fake_notifier, sock_dir, tmp_path, monkeypatch):
+    package = tmp_path / "pkg"
+    package.mkdir()
+    (package / "notify.py").write_text("OLD = 1\n", encoding="utf-8")
+    monkeypatch.setattr(daemon, "PACKAGE_DIR", str(package))
+    path = os.path.join(sock_dir, "d.sock")
+    # Busy enough never to idle out: only the update can end it.
+    thread = threading.Thread(target=daemon.serve, args=(path,), kwargs={"idle_timeout": 30})
+    thread.start()
+    assert _wait_for(lambda: os.path.exists(path))
+    assert client.send_event(["make", "120", "0", "/"], None, path=path)
+    assert _wait_for(fake_notifier.exists)
+    assert thread.is_alive()
+
+    (package / "notify.py").write_text("NEW = 2 # updated\n", encoding="utf-8")
+    # The check after the first event may already see the update; else this one is the last.
+    client.send_event(["make", "120", "0", "/"], None, path=path)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert not client.send_event(["make", "120", "0", "/"], None, path=path)
+
+
+# --- warm state -----------------------------------------------------------------------------
+
+
+def test_warm_state_reloads_changed_icon_map(tmp_path):
+    icons_file = tmp_path / "icons.txt"
+    icons_file.write_text("cargo=http://a/c.png\n", encoding="utf-8")
+    state = daemon.WarmState(cache_dir=str(tmp_path / "cache"), icons_file=str(icons_file))
+    assert state.url_map() == {"cargo": "http://a/c.png"}
+    icons_file.write_text("cargo=http://b/c.png\ngh=http://b/gh.png\n", encoding="utf-8")
+    os.utime(icons_file, ns=(0, 0))  # force a different mtime even on coarse clocks
+    assert state.url_map() == {"cargo": "http://b/c.png", "gh": "http://b/gh.png"}
+
+
+def test_warm_state_remembers_resolved_icon(tmp_path):
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    (cache / "cargo.png").write_bytes(b"png")
+    state = daemon.WarmState(cache_dir=str(cache), icons_file=str(tmp_path / "none.txt"))
+    assert state.resolve_icon("cargo") == str(cache / "cargo.png")
+    (cache / "cargo.png").unlink()
+    assert state.resolve_icon("cargo") is None
+
+
+# --- cli fallback ---------------------------------------------------------------------------
+
+
+def test_cli_falls_back_to_one_shot_without_daemon(fake_notifier, sock_dir, monkeypatch):
+    monkeypatch.setenv("CMD_NOTIFY_SOCKET", f"{sock_dir}/none.sock")
+    monkeypatch.setenv("CMD_NOTIFY_DAEMON", "0")
+    cli.main(["cargo build", "120", "1", "/tmp/w"])
+    assert _wait_for(fake_notifier.exists)
+    assert "cargo build failed (exit 1) in 2m 0s · w" in fake_notifier.read_text(encoding="utf-8")
+
+
+def test_cli_dry_run_never_uses_daemon(fake_notifier, running_daemon, monkeypatch, capsys):
+    monkeypatch.setenv("CMD_NOTIFY_SOCKET", running_daemon)
+    cli.main(["--dry-run", "cargo build", "120", "0", "/tmp"])
+    assert capsys.readouterr().out.startswith("notify-send ")
+
+
+def test_cli_hands_event_to_daemon(fake_notifier, running_daemon, monkeypatch):
+    monkeypatch.setenv("CMD_NOTIFY_SOCKET", running_daemon)
+    cli.main(["cargo build", "120", "0", "/tmp/w"])
+    assert _wait_for(fake_notifier.exists)
+
+
+def test_is_subcommand_ignores_hook_calls():
+    assert cli.is_subcommand(["daemon"], "daemon")
+    assert not cli.is_subcommand(["daemon", "120", "0", "/tmp"], "daemon")
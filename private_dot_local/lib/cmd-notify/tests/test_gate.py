@@ -0,0 +1,126 @@
+"""Parity tests for the in-shell fast gate (gate.sh) against `should_notify`.
+
+The gate runs in the bash/zsh hooks before the helper is launched, so it must agree with the
+Python gating on every input: a gate that's too strict silently drops notifications, one that's
+too loose just costs a process launch. Each available POSIX-ish shell sources the real gate.sh and
+evaluates the whole input matrix in a single process; the nu copy's constants are checked by parse.
+"""
+
+from __future__ import annotations
+
+import itertools
+import re
+import shlex
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from cmd_notify.notify import (
+    BLOCKLIST,
+    DEFAULT_THRESHOLD_SECONDS,
+    parse_threshold,
+    should_notify,
+)
+
+GATE_SH = Path(__file__).resolve().parent.parent / "gate.sh"
+CONFIG_NU = Path(__file__).resolve().parents[4] / ".chezmoitemplates" / "config.nu"
+
+COMMANDS = [
+    "cargo build",
+    "sleep 90",
+    "vim notes.md",
+    "/usr/bin/vim notes.md",
+    "  nvim",
+    "\tclaude --resume",
+    "vim\nfoo",
+    "npm run x | less",
+    "./script.sh --flag",
+    "ssh-keygen -t ed25519",
+    "nushell",
+    "nu",
+    "~/bin/htop",
+    "echo 'vim'",
+    "foo/",
+    "a/b/",
+    "",
+    "   ",
+    "\n",
+]
+DURATIONS = ["0", "5", "59", "60", "61", "600", "0060", "", "abc", "-1", "1.5", " 60"]
+# (CMD_NOTIFY_DISABLE, CMD_NOTIFY_THRESHOLD); None = unset.
+ENVS = [
+    (None, None),
+    ("1", None),
+    ("0", None),
+    (None, "300"),
+    (None, "0"),
+    (None, ""),
+    (None, "abc"),
+    (None, "-5"),
+]
+CASES = list(itertools.product(COMMANDS, DURATIONS, ENVS))
+
+
+def _expected(cmd, duration, env):
+    disable, threshold = env
+    return should_notify(
+        cmd, duration, disabled=disable == "1", threshold=parse_threshold(threshold)
+    )
+
+
+def _gate_script(cases):
+    """One shell script that sources gate.sh and prints 1/0 per case, in order."""
+    lines = [f". {shlex.quote(str(GATE_SH))}"]
+    for cmd, duration, (disable, threshold) in cases:
+        lines.append("unset CMD_NOTIFY_DISABLE CMD_NOTIFY_THRESHOLD")
+        if disable is not None:
+            lines.append(f"CMD_NOTIFY_DISABLE={shlex.quote(disable)}")
+        if threshold is not None:
+            lines.append(f"CMD_NOTIFY_THRESHOLD={shlex.quote(threshold)}")
+        lines.append(
+            f"if __cmd_notify_gate {shlex.quote(cmd)} {shlex.quote(duration)}; "
+            "then echo 1; else echo 0; fi"
+        )
+    return "\n".join(lines) + "\n"
+
+
+@pytest.mark.parametrize("shell", ["bash", "zsh", "sh"])
+def test_gate_matches_should_notify(shell):
+    if not shutil.which(shell):
+        pytest.skip(f"{shell} not installed")
+    result = subprocess.run(
+        [shell, "-s"],
+        input=_gate_script(CASES),
+        capture_output=True,
+        text=True,
+        check=True,
+        env={"PATH": "/usr/bin:/bin", "LC_ALL": "C"},
+    )
+    got = result.stdout.split()
+    assert len(got) == len(CASES)
+    mismatches = [
+        (case, verdict)
+        for case, verdict in zip(CASES, got)
+        if (verdict == "1") != _expected(*case)
+    ]
+    assert mismatches == []
+
+
+def test_gate_sh_blocklist_matches_python():
+    match = re.search(r'^__CMD_NOTIFY_BLOCKLIST="([^"]*)"', GATE_SH.read_text(), re.MULTILINE)
+    assert match and frozenset(match.group(1).split()) == BLOCKLIST
+
+
+def test_gate_sh_default_threshold_matches_python():
+    match = re.search(r"^__CMD_NOTIFY_DEFAULT_THRESHOLD=(\d+)$", GATE_SH.read_text(), re.MULTILINE)
+    assert match and int(match.group(1)) == DEFAULT_THRESHOLD_SECONDS
+
+
+def test_nu_gate_constants_match_python():
+    text = CONFIG_NU.read_text(encoding="utf-8")
+    blocklist = re.search(r"^const cmd_notify_blocklist = \[([^\]]*)\]", text, re.MULTILINE)
+    threshold = re.search(r"^const cmd_notify_default_threshold = (\d+)$", text, re.MULTILINE)
+    assert blocklist and frozenset(blocklist.group(1).split()) == BLOCKLIST
+    assert threshold and int(threshold.group(1)) == DEFAULT_THRESHOLD_SECONDS
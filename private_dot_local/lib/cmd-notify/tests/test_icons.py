@@ -1,12 +1,17 @@
 """Unit tests for icon cache lookup + fetch.
 
 No live network: cache-hit and .miss cases need none; the fetch-success path uses a local file://
-URL (deterministic, mirrors the no-mock philosophy); the fetch-failure path uses an unreachable
-.invalid URL with a short timeout.
+URL (deterministic, mirrors the no-mock philosophy); the fetch-failure path uses a file:// URL to a
+nonexistent path. Background-fetch tests poll the cache dir for the worker's result.
 """
 
 from __future__ import annotations
 
+import os
+import time
+
+import pytest
+
 from cmd_notify import icons
 
 
@@ -16,6 +21,15 @@ def _icons_file(tmp_path, contents):
     return str(path)
 
 
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
 # --- lookup_url -----------------------------------------------------------------------------
 
 
@@ -38,6 +52,73 @@ def test_lookup_url_missing_file(tmp_path):
     assert icons.lookup_url("cargo", str(tmp_path / "nope.txt")) is None
 
 
+# --- compiled URL index ---------------------------------------------------------------------
+
+# Exercises every parsing rule: comments, blanks, duplicates (first wins), an empty URL that
+# must not shadow a later entry, stray whitespace, and `=` inside the URL.
+TRICKY_ICONS = """\
+# header comment
+   # indented comment
+
+cargo=http://first/cargo.png
+cargo=http://second/cargo.png
+gh=
+gh=http://later/gh.png
+  docker=http://spaced/docker.png  
+npm =http://key-has-space/npm.png
+bun=http://q/logo.png?size=64&x=1
+=http://empty-key/x.png
+noequals
+"""
+
+
+def test_url_index_matches_lookup_url(tmp_path):
+    f = _icons_file(tmp_path, TRICKY_ICONS)
+    index_dir = str(tmp_path / "cache")
+    for key in ("cargo", "gh", "docker", "npm", "npm ", "bun", "", "noequals", "absent", "#"):
+        expected = icons.lookup_url(key, f)
+        assert icons.lookup_url(key, f, index_dir=index_dir) == expected, key
+        # Second pass is served from the persisted index.
+        assert icons.lookup_url(key, f, index_dir=index_dir) == expected, key
+
+
+def test_url_index_hit_does_not_reparse(tmp_path, monkeypatch):
+    f = _icons_file(tmp_path, "cargo=http://a/c.png\n")
+    index_dir = str(tmp_path / "cache")
+    assert icons.lookup_url("cargo", f, index_dir=index_dir) == "http://a/c.png"
+
+    def fail(_):
+        raise AssertionError("index hit should not re-read icons.txt")
+
+    monkeypatch.setattr(icons, "read_url_map", fail)
+    assert icons.lookup_url("cargo", f, index_dir=index_dir) == "http://a/c.png"
+
+
+def test_url_index_rebuilt_when_file_changes(tmp_path):
+    f = _icons_file(tmp_path, "cargo=http://a/c.png\n")
+    index_dir = str(tmp_path / "cache")
+    assert icons.lookup_url("cargo", f, index_dir=index_dir) == "http://a/c.png"
+    # Same size, different content: only the mtime differs.
+    _icons_file(tmp_path, "cargo=http://b/c.png\n")
+    os.utime(f, ns=(0, 0))
+    assert icons.lookup_url("cargo", f, index_dir=index_dir) == "http://b/c.png"
+    # Size change.
+    _icons_file(tmp_path, "cargo=http://longer/c.png\n")
+    assert icons.lookup_url("cargo", f, index_dir=index_dir) == "http://longer/c.png"
+
+
+def test_url_index_corrupt_is_rebuilt(tmp_path):
+    f = _icons_file(tmp_path, "cargo=http://a/c.png\n")
+    index_dir = tmp_path / "cache"
+    index_dir.mkdir()
+    (index_dir / icons.URL_INDEX_NAME).write_bytes(b"not marshal data")
+    assert icons.lookup_url("cargo", f, index_dir=str(index_dir)) == "http://a/c.png"
+
+
+def test_url_index_missing_icons_file(tmp_path):
+    assert icons.lookup_url("cargo", str(tmp_path / "nope.txt"), index_dir=str(tmp_path)) is None
+
+
 # --- resolve --------------------------------------------------------------------------------
 
 
@@ -71,11 +152,50 @@ def test_resolve_fetch_success_caches(tmp_path):
     cache = tmp_path / "cache"
     f = _icons_file(tmp_path, f"cargo={src.as_uri()}")
 
-    result = icons.resolve("cargo", cache_dir=str(cache), icons_file=f)
+    result = icons.resolve("cargo", cache_dir=str(cache), icons_file=f, background=False)
     assert result == str(cache / "cargo.png")
     assert (cache / "cargo.png").read_bytes() == b"\x89PNG\r\n\x1a\n fake"
 
 
+def test_resolve_first_sighting_returns_immediately_and_fetches_in_background(tmp_path):
+    src = tmp_path / "src-cargo.png"
+    src.write_bytes(b"\x89PNG\r\n\x1a\n fake")
+    cache = tmp_path / "cache"
+    f = _icons_file(tmp_path, f"cargo={src.as_uri()}")
+
+    # No icon yet: the download is handed to a detached worker.
+    assert icons.resolve("cargo", cache_dir=str(cache), icons_file=f) is None
+    assert _wait_for((cache / "cargo.png").is_file)
+    # The next notification picks up the cached PNG.
+    assert icons.resolve("cargo", cache_dir=str(cache), icons_file=f) == str(cache / "cargo.png")
+
+
+def test_resolve_background_failure_writes_miss(tmp_path):
+    cache = tmp_path / "cache"
+    f = _icons_file(tmp_path, f"cargo={(tmp_path / 'does-not-exist.png').as_uri()}")
+
+    assert icons.resolve("cargo", cache_dir=str(cache), icons_file=f) is None
+    assert _wait_for((cache / "cargo.miss").is_file)
+    assert not (cache / "cargo.png").exists()
+
+
+def test_fetch_icon_skips_while_key_is_locked(tmp_path):
+    import fcntl
+
+    src = tmp_path / "src-cargo.png"
+    src.write_bytes(b"\x89PNG\r\n\x1a\n fake")
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    with open(cache / "cargo.lock", "w") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        assert icons.fetch_in_progress("cargo", str(cache))
+        # A second downloader of the same key backs off instead of fetching concurrently.
+        assert icons.fetch_icon("cargo", src.as_uri(), str(cache)) is None
+        assert not (cache / "cargo.png").exists()
+    assert not icons.fetch_in_progress("cargo", str(cache))
+    assert icons.fetch_icon("cargo", src.as_uri(), str(cache)) == str(cache / "cargo.png")
+
+
 def test_ssl_context_returns_a_context():
     # Whether or not truststore is importable, we get a usable SSLContext (no exception).
     import ssl
@@ -88,7 +208,84 @@ def test_resolve_fetch_failure_writes_miss(tmp_path):
     # file:// to a nonexistent path fails fast (no network/timeout wait).
     f = _icons_file(tmp_path, f"cargo={(tmp_path / 'does-not-exist.png').as_uri()}")
 
-    assert icons.resolve("cargo", cache_dir=str(cache), icons_file=f) is None
+    assert icons.resolve("cargo", cache_dir=str(cache), icons_file=f, background=False) is None
     assert (cache / "cargo.miss").is_file()
     # A second call sees the sentinel and stays None without retrying.
     assert icons.resolve("cargo", cache_dir=str(cache), icons_file=f) is None
+
+
+# --- streaming save_body --------------------------------------------------------------------
+
+
+class _ChunkedBody:
+    """A response stand-in that serves `body` in pieces and records the read sizes requested."""
+
+    def __init__(self, body, content_type=None):
+        self._body = body
+        self.reads = []
+        self.headers = {"Content-Type": content_type} if content_type else {}
+
+    def read(self, amt=-1):
+        self.reads.append(amt)
+        if amt is None or amt < 0:
+            amt = len(self._body)
+        chunk, self._body = self._body[:amt], self._body[amt:]
+        return chunk
+
+
+def test_save_body_streams_in_bounded_chunks(tmp_path):
+    body = b"\x89PNG\r\n\x1a\n" + b"x" * 200_000
+    response = _ChunkedBody(body, "image/png")
+    dest = tmp_path / "cargo.png"
+
+    icons.save_body(response, str(dest))
+    assert dest.read_bytes() == body
+    assert all(0 < amt <= 64 * 1024 for amt in response.reads)
+
+
+def test_save_body_accepts_jpeg(tmp_path):
+    dest = tmp_path / "cargo.png"
+    icons.save_body(_ChunkedBody(b"\xff\xd8\xff\xe0 jpeg"), str(dest))
+    assert dest.is_file()
+
+
+def _assert_rejected(tmp_path, response, **kwargs):
+    dest = tmp_path / "cargo.png"
+    with pytest.raises(icons.IconRejected):
+        icons.save_body(response, str(dest), **kwargs)
+    assert list(tmp_path.iterdir()) == []  # no temp file, no partial dest
+
+
+def test_save_body_rejects_svg_content_type_without_reading(tmp_path):
+    response = _ChunkedBody(b"<svg/>", "image/svg+xml; charset=utf-8")
+    _assert_rejected(tmp_path, response)
+    assert response.reads == []
+
+
+def test_save_body_rejects_non_image_bytes(tmp_path):
+    _assert_rejected(tmp_path, _ChunkedBody(b"<!doctype html><p>moved</p>", "image/png"))
+    _assert_rejected(tmp_path, _ChunkedBody(b"\x00\x00\x01\x00 ico"))
+    _assert_rejected(tmp_path, _ChunkedBody(b""))
+
+
+def test_save_body_enforces_byte_budget(tmp_path):
+    response = _ChunkedBody(b"\x89PNG\r\n\x1a\n" + b"x" * 1_000_000)
+    _assert_rejected(tmp_path, response, max_bytes=100_000)
+    # It stopped reading soon after the budget, not at the end of the body.
+    assert len(response.reads) <= 3
+
+
+def test_save_body_enforces_deadline(tmp_path):
+    response = _ChunkedBody(b"\x89PNG\r\n\x1a\n fake")
+    _assert_rejected(tmp_path, response, deadline=time.monotonic() - 1)
+
+
+def test_resolve_svg_url_becomes_miss(tmp_path):
+    src = tmp_path / "logo.svg"
+    src.write_text("<svg xmlns='http://www.w3.org/2000/svg'/>", encoding="utf-8")
+    cache = tmp_path / "cache"
+    f = _icons_file(tmp_path, f"cargo={src.as_uri()}")
+
+    assert icons.resolve("cargo", cache_dir=str(cache), icons_file=f, background=False) is None
+    assert (cache / "cargo.miss").is_file()
+    assert not (cache / "cargo.png").exists()
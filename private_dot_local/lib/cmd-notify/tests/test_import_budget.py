@@ -0,0 +1,100 @@
+"""Import-time guard for cmd-notify's entry points.
+
+Every shell prompt runs `cmd-notify`, so what its modules import at load time is paid on every
+command. The gate is `FORBIDDEN`: each entry point, imported in a fresh interpreter, must not pull
+in the network stack or the writers' `tempfile` (icon-fetch path only), nor, short of the daemon,
+the notifier-launch modules.
+
+`BUDGET_MS` times the same imports. Wall-clock numbers depend on the machine and its load, so that
+test is opt-in: set IMPORT_BUDGET_TIMING=1 (`mise run test-import-timing`).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 3
+
+# The icon-fetch / notifier-launch stack, none of which a gated-out prompt should load.
+FETCH_STACK = {"ssl", "urllib.request", "urllib.error", "http.client", "email", "tempfile"}
+LAUNCH_STACK = {"subprocess", "shutil"}
+
+FORBIDDEN = {
+    "cmd_notify.cli": FETCH_STACK | LAUNCH_STACK,
+    "cmd_notify.client": FETCH_STACK | LAUNCH_STACK,
+    "cmd_notify.notify": FETCH_STACK | LAUNCH_STACK,
+    # The daemon launches notifiers, but still only fetches on an icon cache miss.
+    "cmd_notify.daemon": FETCH_STACK,
+}
+
+# Milliseconds of summed self import time over a bare `python -c pass`, best of `RUNS`: a few
+# times what a laptop measures, so only a real regression trips them.
+BUDGET_MS = {
+    "cmd_notify.cli": 35,
+    "cmd_notify.client": 35,
+    "cmd_notify.notify": 15,
+    "cmd_notify.daemon": 60,
+}
+
+# The harness below is shared with aerospace-workspaces' tests/test_import_budget.py; the packages
+# install and test separately, so each carries its own copy.
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)")
+
+
+def import_times(code: str) -> dict[str, int]:
+    """{module: self µs} for every module `python -X importtime -c code` imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PACKAGE_ROOT,
+        env={**os.environ, "PYTHONPATH": PACKAGE_ROOT},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {
+        match[2]: int(match[1])
+        for match in map(_IMPORTTIME_LINE.match, result.stderr.splitlines())
+        if match
+    }
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return set(import_times("pass"))
+
+
+# --- forbidden modules ---------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("module", sorted(FORBIDDEN))
+def test_entry_point_does_not_load_heavy_modules(module):
+    loaded = set(import_times(f"import {module}"))
+    assert not loaded & FORBIDDEN[module], f"{module} loads {sorted(loaded & FORBIDDEN[module])}"
+
+
+def test_fetch_stack_still_loads_on_the_fetch_path():
+    # Guards the guard: the names above are real modules that the icon fetch does import.
+    loaded = set(import_times("from cmd_notify import icons; icons._fetch('file:///absent', '/')"))
+    assert {"ssl", "urllib.request", "tempfile"} <= loaded
+
+
+# --- time budget ---------------------------------------------------------------------------
+
+
+@pytest.mark.skipif(
+    not os.environ.get("IMPORT_BUDGET_TIMING"), reason="timing is opt-in: IMPORT_BUDGET_TIMING=1"
+)
+@pytest.mark.parametrize("module", sorted(BUDGET_MS))
+def test_entry_point_import_time_within_budget(module, baseline):
+    best = min(
+        sum(us for name, us in import_times(f"import {module}").items() if name not in baseline)
+        for _ in range(RUNS)
+    )
+    assert best / 1000 <= BUDGET_MS[module], f"{module}: {best / 1000:.1f} ms"
@@ -7,6 +7,8 @@ HOME, XDG_CACHE_HOME) are set per-test; no mocking framework.
 
 from __future__ import annotations
 
+import time
+
 import pytest
 
 from cmd_notify import notify
@@ -234,3 +236,42 @@ def test_should_notify_gating():
     assert should_notify("vim x", "120", disabled=False, threshold=60) is False
     assert should_notify("", "120", disabled=False, threshold=60) is False
     assert should_notify("cargo", "nope", disabled=False, threshold=60) is False
+
+
+# --- detached dispatch ----------------------------------------------------------------------
+
+
+def test_dispatch_does_not_wait_for_notifier(tmp_path, monkeypatch):
+    # A notifier that takes a while to hand off (like notify-send on a loaded box) and then
+    # records its argv: dispatch must return long before it finishes, and it must still run.
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "notify.log"
+    script = bin_dir / "notify-send"
+    script.write_text(f'#!/bin/sh\nsleep 1\necho "$*" > "{log}"\n', encoding="utf-8")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+
+    started = time.monotonic()
+    notify.dispatch("Linux", "t", "b", "cmd-notify:cargo", None, dry_run=False)
+    assert time.monotonic() - started < 0.5
+    assert not log.exists()
+
+    deadline = time.monotonic() + 5
+    while not log.exists() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert log.read_text(encoding="utf-8").strip() == (
+        "-h string:x-canonical-private-synchronous:cmd-notify-cargo t b"
+    )
+
+
+def test_dispatch_missing_notifier_is_noop(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", str(tmp_path))
+    notify.dispatch("Darwin", "t", "b", "cmd-notify:cargo", None, dry_run=False)
+
+
+def test_dry_run_output_is_render_dispatch(capsys):
+    notify.dispatch("Darwin", "t", "b", "cmd-notify:cargo", "/i.png", dry_run=True)
+    assert capsys.readouterr().out.strip() == render_dispatch(
+        "Darwin", "t", "b", "cmd-notify:cargo", "/i.png"
+    )
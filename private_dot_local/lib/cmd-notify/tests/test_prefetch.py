@@ -0,0 +1,161 @@
+"""Tests for `cmd-notify icons prefetch`, served from a local http.server (no live network).
+
+The server speaks HTTP/1.1 keep-alive and counts both requests and TCP connections, so the tests
+can assert that downloads actually reuse connections rather than just that the files appear.
+"""
+
+from __future__ import annotations
+
+import http.server
+import threading
+
+import pytest
+
+from cmd_notify import cli, prefetch
+
+PNG = b"\x89PNG\r\n\x1a\n fake"
+
+
+class _CountingHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append(self.path)
+        if self.path == "/moved.png":
+            self.send_response(302)
+            self.send_header("Location", "/cargo.png")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/missing"):
+            body = b"not found"
+            self.send_response(404)
+        elif self.path.startswith("/page"):
+            body = b"<!doctype html>" + b"x" * 100_000
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")  # lies; the body's signature doesn't
+        else:
+            body = PNG + self.path.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def icon_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _CountingHandler)
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _icons_file(tmp_path, base_url, keys, extra=""):
+    path = tmp_path / "icons.txt"
+    lines = [f"{key}={base_url}/{key}.png" for key in keys]
+    path.write_text("# icons\n" + "\n".join(lines) + "\n" + extra, encoding="utf-8")
+    return str(path)
+
+
+def test_prefetch_downloads_all_missing(tmp_path, icon_server):
+    server, base = icon_server
+    keys = [f"tool{n}" for n in range(12)]
+    f = _icons_file(tmp_path, base, keys)
+    cache = tmp_path / "cache"
+
+    results = prefetch.prefetch(f, str(cache), jobs=3)
+
+    assert [result.key for result in results] == keys  # file order
+    assert {result.status for result in results} == {"fetched"}
+    for key in keys:
+        assert (cache / f"{key}.png").read_bytes() == PNG + f"/{key}.png".encode()
+    assert len(server.requests) == 12
+    # Keep-alive: at most one connection per worker thread, not one per icon.
+    assert server.connections <= 3
+
+
+def test_prefetch_records_miss_and_skips_it_next_time(tmp_path, icon_server):
+    server, base = icon_server
+    f = _icons_file(tmp_path, base, ["cargo"], extra=f"gone={base}/missing.png\n")
+    cache = tmp_path / "cache"
+
+    statuses = {r.key: r.status for r in prefetch.prefetch(f, str(cache))}
+    assert statuses == {"cargo": "fetched", "gone": "failed"}
+    assert (cache / "gone.miss").is_file() and not (cache / "gone.png").exists()
+
+    server.requests.clear()
+    statuses = {r.key: r.status for r in prefetch.prefetch(f, str(cache))}
+    assert statuses == {"cargo": "cached", "gone": "skipped"}
+    assert server.requests == []
+
+
+def test_prefetch_rejects_non_image_body(tmp_path, icon_server):
+    _, base = icon_server
+    f = _icons_file(tmp_path, base, ["cargo"], extra=f"web={base}/page.png\ngh={base}/gh.png\n")
+    cache = tmp_path / "cache"
+
+    statuses = {r.key: r.status for r in prefetch.prefetch(f, str(cache), jobs=1)}
+    assert statuses == {"cargo": "fetched", "web": "failed", "gh": "fetched"}
+    assert sorted(p.name for p in cache.glob("*.png")) == ["cargo.png", "gh.png"]
+
+
+def test_prefetch_retry_misses(tmp_path, icon_server):
+    _, base = icon_server
+    f = _icons_file(tmp_path, base, ["cargo"])
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    (cache / "cargo.miss").write_text("", encoding="utf-8")
+
+    results = prefetch.prefetch(f, str(cache), retry_misses=True)
+    assert [r.status for r in results] == ["fetched"]
+    assert not (cache / "cargo.miss").exists()
+
+
+def test_prefetch_follows_redirects(tmp_path, icon_server):
+    _, base = icon_server
+    path = tmp_path / "icons.txt"
+    path.write_text(f"cargo={base}/moved.png\n", encoding="utf-8")
+    cache = tmp_path / "cache"
+
+    assert [r.status for r in prefetch.prefetch(str(path), str(cache))] == ["fetched"]
+    assert (cache / "cargo.png").read_bytes() == PNG + b"/cargo.png"
+
+
+def test_prefetch_file_url(tmp_path):
+    src = tmp_path / "src.png"
+    src.write_bytes(PNG)
+    path = tmp_path / "icons.txt"
+    path.write_text(f"cargo={src.as_uri()}\n", encoding="utf-8")
+    cache = tmp_path / "cache"
+
+    assert [r.status for r in prefetch.prefetch(str(path), str(cache))] == ["fetched"]
+    assert (cache / "cargo.png").read_bytes() == PNG
+
+
+def test_cli_prefetch_prints_summary(tmp_path, icon_server, monkeypatch, capsys):
+    _, base = icon_server
+    monkeypatch.setenv("CMD_NOTIFY_ICONS", _icons_file(tmp_path, base, ["cargo", "gh"]))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+
+    cli.main(["icons", "prefetch", "--jobs", "2"])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split()[:2] == ["cargo", "fetched"] and lines[0].endswith(" ms")
+    assert lines[1].split()[:2] == ["gh", "fetched"]
+    assert lines[2].startswith("2 icons: 2 fetched in ")
+    assert (tmp_path / "xdg" / "cmd-notify" / "icons" / "gh.png").is_file()
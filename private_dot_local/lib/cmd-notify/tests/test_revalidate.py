@@ -0,0 +1,224 @@
+"""Tests for cached-icon revalidation: stored validators, conditional GETs, and URL invalidation.
+
+A local http.server plays an origin with ETag / Last-Modified support: it answers a matching
+If-None-Match or If-Modified-Since with a bodyless 304 and counts full (200) and conditional
+(304) responses separately, so the tests can tell a header round-trip from a re-download.
+"""
+
+from __future__ import annotations
+
+import http.server
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from cmd_notify import cache, icons, prefetch
+
+PNG_V1 = b"\x89PNG\r\n\x1a\n v1"
+PNG_V2 = b"\x89PNG\r\n\x1a\n v2"
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class _OriginHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body, etag = self.server.body, self.server.etag
+        if self.headers.get("If-None-Match") == etag or (
+            self.headers.get("If-None-Match") is None
+            and self.headers.get("If-Modified-Since") == LAST_MODIFIED
+        ):
+            with self.server.lock:
+                self.server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        with self.server.lock:
+            self.server.full += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def origin():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _OriginHandler)
+    server.lock = threading.Lock()
+    server.body, server.etag = PNG_V1, '"v1"'
+    server.full = server.not_modified = 0
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("CMD_NOTIFY_ICON_MAX_AGE_SECONDS", raising=False)
+    return str(tmp_path / "cache")
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _expire(cache_dir, key="cargo"):
+    """Back-date the entry's last validation past the max-age."""
+    meta_path = os.path.join(cache_dir, f"{key}.meta")
+    with open(meta_path, encoding="utf-8") as handle:
+        meta = json.load(handle)
+    meta["validated_at"] -= cache.max_age_seconds() + 1
+    with open(meta_path, "w", encoding="utf-8") as handle:
+        json.dump(meta, handle)
+
+
+def _resolve(cache_dir, url_map, **kwargs):
+    return icons.resolve("cargo", cache_dir=cache_dir, icons_file="", url_map=url_map, **kwargs)
+
+
+def test_download_records_validators(origin, cache_dir):
+    _, base = origin
+    assert _resolve(cache_dir, {"cargo": f"{base}/c.png"}, background=False)
+    meta = icons.read_meta("cargo", cache_dir)
+    assert meta["url"] == f"{base}/c.png"
+    assert (meta["etag"], meta["last_modified"]) == ('"v1"', LAST_MODIFIED)
+
+
+def test_fresh_hit_makes_no_request(origin, cache_dir):
+    server, base = origin
+    url_map = {"cargo": f"{base}/c.png"}
+    icon = _resolve(cache_dir, url_map, background=False)
+    assert _resolve(cache_dir, url_map, wait=1) == icon
+    assert (server.full, server.not_modified) == (1, 0)
+
+
+def test_stale_hit_is_served_and_revalidated_with_a_304(origin, cache_dir):
+    server, base = origin
+    url_map = {"cargo": f"{base}/c.png"}
+    icon = _resolve(cache_dir, url_map, background=False)
+    mtime = os.stat(icon).st_mtime_ns
+    _expire(cache_dir)
+    before = icons.read_meta("cargo", cache_dir)["validated_at"]
+
+    # The stale icon is returned at once; a background worker revalidates it.
+    assert _resolve(cache_dir, url_map) == icon
+    assert _wait_for(lambda: not icons.fetch_in_progress("cargo", cache_dir))
+    assert server.not_modified == 1
+    assert server.full == 1
+    assert os.stat(icon).st_mtime_ns == mtime  # body untouched
+    assert icons.read_meta("cargo", cache_dir)["validated_at"] > before
+    assert icons.freshness("cargo", url_map["cargo"], cache_dir) == "fresh"
+    assert cache.read_stats(cache_dir)["revalidated"] == 1
+
+
+def test_stale_hit_picks_up_a_changed_logo(origin, cache_dir):
+    server, base = origin
+    url_map = {"cargo": f"{base}/c.png"}
+    icon = _resolve(cache_dir, url_map, background=False)
+    server.body, server.etag = PNG_V2, '"v2"'
+    _expire(cache_dir)
+
+    assert icons.fetch_icon("cargo", url_map["cargo"], cache_dir) == icon
+    assert open(icon, "rb").read() == PNG_V2
+    assert icons.read_meta("cargo", cache_dir)["etag"] == '"v2"'
+
+
+def test_last_modified_alone_revalidates(origin, cache_dir):
+    server, base = origin
+    url_map = {"cargo": f"{base}/c.png"}
+    _resolve(cache_dir, url_map, background=False)
+    meta_path = os.path.join(cache_dir, "cargo.meta")
+    meta = icons.read_meta("cargo", cache_dir)
+    meta["etag"] = None
+    with open(meta_path, "w", encoding="utf-8") as handle:
+        json.dump(meta, handle)
+    _expire(cache_dir)
+
+    assert icons.fetch_icon("cargo", url_map["cargo"], cache_dir)
+    assert (server.full, server.not_modified) == (1, 1)
+
+
+def test_changed_url_invalidates_entry(origin, cache_dir):
+    server, base = origin
+    _resolve(cache_dir, {"cargo": f"{base}/old.png"}, background=False)
+    server.body, server.etag = PNG_V2, '"v2"'
+
+    icon = _resolve(cache_dir, {"cargo": f"{base}/new.png"}, background=False)
+    assert open(icon, "rb").read() == PNG_V2
+    assert icons.read_meta("cargo", cache_dir)["url"] == f"{base}/new.png"
+    assert server.full == 2
+
+
+def test_changed_url_is_not_served_while_refetching(origin, cache_dir):
+    _, base = origin
+    _resolve(cache_dir, {"cargo": f"{base}/old.png"}, background=False)
+    # Without waiting, the old logo must not be shown for the new mapping.
+    assert _resolve(cache_dir, {"cargo": f"{base}/new.png"}) is None
+
+
+def test_removed_mapping_drops_entry(origin, cache_dir):
+    _, base = origin
+    _resolve(cache_dir, {"cargo": f"{base}/c.png"}, background=False)
+    assert _resolve(cache_dir, {}) is None
+    assert not os.path.exists(os.path.join(cache_dir, "cargo.png"))
+
+
+def test_legacy_entry_without_meta_is_refetched_in_background(origin, cache_dir):
+    server, base = origin
+    os.makedirs(cache_dir)
+    icon = os.path.join(cache_dir, "cargo.png")
+    with open(icon, "wb") as handle:
+        handle.write(PNG_V1)
+
+    assert _resolve(cache_dir, {"cargo": f"{base}/c.png"}) == icon
+    assert _wait_for(lambda: icons.read_meta("cargo", cache_dir) is not None)
+    assert server.full == 1
+
+
+def test_hand_placed_icon_for_unmapped_key_is_kept(cache_dir):
+    os.makedirs(cache_dir)
+    icon = os.path.join(cache_dir, "cargo.png")
+    with open(icon, "wb") as handle:
+        handle.write(PNG_V1)
+    assert _resolve(cache_dir, {}) == icon
+
+
+def test_prefetch_revalidates_stale_entries_over_keep_alive(origin, cache_dir, tmp_path):
+    server, base = origin
+    icons_file = tmp_path / "icons.txt"
+    icons_file.write_text(
+        "".join(f"k{n}={base}/k{n}.png\n" for n in range(4)), encoding="utf-8"
+    )
+    assert {r.status for r in prefetch.prefetch(str(icons_file), cache_dir)} == {"fetched"}
+    assert {r.status for r in prefetch.prefetch(str(icons_file), cache_dir)} == {"cached"}
+    for n in range(4):
+        _expire(cache_dir, f"k{n}")
+
+    results = prefetch.prefetch(str(icons_file), cache_dir, jobs=1)
+    assert {r.status for r in results} == {"refreshed"}
+    assert (server.full, server.not_modified) == (4, 4)
+
+
+def test_gc_drops_orphaned_meta(cache_dir):
+    os.makedirs(cache_dir)
+    for name in ("kept.png", "kept.meta", "gone.meta"):
+        open(os.path.join(cache_dir, name), "w").close()
+    cache.gc(cache_dir)
+    assert sorted(os.listdir(cache_dir)) == ["kept.meta", "kept.png"]
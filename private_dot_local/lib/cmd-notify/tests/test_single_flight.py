@@ -0,0 +1,153 @@
+"""Multi-process stress tests for single-flight icon downloads.
+
+A dozen separate Python processes resolve the same key at the same instant against a local HTTP
+server that counts requests and answers slowly, so every racer overlaps the download. Exactly one
+request may reach the server whatever the mode; the waiting modes must also hand every racer the
+icon. Real processes (not threads) because the lease is an flock on a shared lock file.
+"""
+
+from __future__ import annotations
+
+import http.server
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from cmd_notify import icons
+
+PNG = b"\x89PNG\r\n\x1a\n fake"
+RACERS = 12
+SERVER_DELAY_SECONDS = 0.4
+
+LIB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Sleep until a shared start time so all racers call resolve together, then print the result.
+_RACER = """
+import sys, time
+from cmd_notify import icons
+start, cache_dir, icons_file, background, wait = sys.argv[1:]
+time.sleep(max(0.0, float(start) - time.time()))
+icon = icons.resolve(
+    "cargo", cache_dir=cache_dir, icons_file=icons_file, background=background == "1",
+    wait=float(wait),
+)
+print(icon or "-")
+"""
+
+
+class _SlowHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(SERVER_DELAY_SECONDS)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(PNG)))
+        self.end_headers()
+        self.wfile.write(PNG)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def slow_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _race(tmp_path, server, *, background, wait):
+    icons_file = tmp_path / "icons.txt"
+    icons_file.write_text(
+        f"cargo=http://127.0.0.1:{server.server_address[1]}/cargo.png\n", encoding="utf-8"
+    )
+    cache_dir = tmp_path / "cache"
+    start = time.time() + 1.0  # enough for every interpreter to start first
+    env = dict(os.environ, PYTHONPATH=LIB_DIR)
+    procs = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                _RACER,
+                str(start),
+                str(cache_dir),
+                str(icons_file),
+                "1" if background else "0",
+                str(wait),
+            ],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(RACERS)
+    ]
+    results = [proc.communicate(timeout=30)[0].strip() for proc in procs]
+    # Let a background download finish before counting.
+    deadline = time.monotonic() + 10
+    while icons.fetch_in_progress("cargo", str(cache_dir)) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return results, str(cache_dir / "cargo.png")
+
+
+def test_background_racers_share_one_download_and_wait_for_it(tmp_path, slow_server):
+    results, icon = _race(tmp_path, slow_server, background=True, wait=5)
+    assert slow_server.requests == 1
+    assert results == [icon] * RACERS
+
+
+def test_background_racers_without_wait_go_ahead_without_icon(tmp_path, slow_server):
+    started = time.monotonic()
+    results, icon = _race(tmp_path, slow_server, background=True, wait=0)
+    assert slow_server.requests == 1
+    assert set(results) == {"-"}
+    assert os.path.isfile(icon)
+    assert time.monotonic() - started < 10
+
+
+def test_inline_racers_share_one_download(tmp_path, slow_server):
+    results, icon = _race(tmp_path, slow_server, background=False, wait=5)
+    assert slow_server.requests == 1
+    assert results == [icon] * RACERS
+
+
+def test_await_icon_returns_none_when_nothing_is_in_flight(tmp_path):
+    started = time.monotonic()
+    assert icons.await_icon("cargo", str(tmp_path), timeout=5) is None
+    assert time.monotonic() - started < 1
+
+
+def test_lease_is_exclusive_until_closed(tmp_path):
+    lease = icons.acquire_lease("cargo", str(tmp_path))
+    assert lease is not None
+    assert icons.acquire_lease("cargo", str(tmp_path)) is None
+    assert icons.fetch_in_progress("cargo", str(tmp_path))
+    lease.close()
+    assert not icons.fetch_in_progress("cargo", str(tmp_path))
+    again = icons.acquire_lease("cargo", str(tmp_path))
+    assert again is not None
+    again.close()
+
+
+def test_spawner_hands_its_lease_to_the_worker(tmp_path, slow_server):
+    icons_file = tmp_path / "icons.txt"
+    icons_file.write_text(
+        f"cargo=http://127.0.0.1:{slow_server.server_address[1]}/cargo.png\n", encoding="utf-8"
+    )
+    cache_dir = str(tmp_path / "cache")
+
+    assert icons.resolve("cargo", cache_dir=cache_dir, icons_file=str(icons_file)) is None
+    # No gap between our release and the worker's start: the worker already holds the lease.
+    assert icons.fetch_in_progress("cargo", cache_dir)
+    assert icons.await_icon("cargo", cache_dir, timeout=5) == os.path.join(cache_dir, "cargo.png")
+    assert slow_server.requests == 1